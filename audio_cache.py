@@ -0,0 +1,314 @@
+import os
+import glob
+import time
+import sqlite3
+import asyncio
+import threading
+import concurrent.futures
+from typing import Dict, Any, Optional, Tuple
+
+import yt_dlp
+
+import metrics
+from track_cache import extract_youtube_id
+
+# ⚙️ НАСТРОЙКИ ЛОКАЛЬНОГО КЕША АУДИО - ЛЮБИМЫЕ ТРЕКИ ИГРАЮТ С ДИСКА!!! ⚙️
+AUDIO_CACHE_ENABLED = os.getenv('AUDIO_CACHE_ENABLED', 'true').lower() == 'true'
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR', 'audio_cache')
+# Максимальный размер кеша (в мегабайтах)
+AUDIO_CACHE_MAX_MB = int(os.getenv('AUDIO_CACHE_MAX_MB', '2048'))
+# После скольких воспроизведений трек скачивается в кеш
+AUDIO_CACHE_MIN_PLAYS = int(os.getenv('AUDIO_CACHE_MIN_PLAYS', '3'))
+# Что вытесняется первым: lru - давно не игравшие, lfu - реже всего игравшие
+AUDIO_CACHE_EVICTION = os.getenv('AUDIO_CACHE_EVICTION', 'lfu').lower()
+# Сколько треков скачивать одновременно
+AUDIO_CACHE_DOWNLOADS = int(os.getenv('AUDIO_CACHE_DOWNLOADS', '1'))
+
+# Opus в исходном контейнере (webm) - без перекодирования ни при скачивании, ни при воспроизведении
+DOWNLOAD_FORMAT = 'bestaudio[acodec=opus]/bestaudio'
+# Префикс незаконченных загрузок - такие файлы никогда не отдаются плееру
+TEMP_PREFIX = '.tmp-'
+
+EVICTION_ORDER = {
+    'lru': 'last_played ASC',
+    'lfu': 'plays ASC, last_played ASC',
+}
+
+
+def track_cache_key(track_info: Dict[str, Any]) -> Optional[str]:
+    """Ключ трека в кеше - ID видео YouTube
+
+    Args:
+        track_info: Информация о треке
+
+    Returns:
+        ID видео или None, если трек не с YouTube (радио, Lavalink)
+    """
+    if track_info.get('source') == 'stream':
+        return None
+    for field in ('webpage_url', 'url'):
+        value = track_info.get(field)
+        if value:
+            video_id = extract_youtube_id(value)
+            if video_id:
+                return video_id
+    return None
+
+
+def _download(video_id: str, directory: str) -> Dict[str, Any]:
+    """Скачивает аудио во временный файл (выполняется в потоке загрузок)
+
+    Returns:
+        Словарь с путем к временному файлу и кодеком
+    """
+    options = {
+        'format': DOWNLOAD_FORMAT,
+        'outtmpl': os.path.join(directory, f'{TEMP_PREFIX}{video_id}.%(ext)s'),
+        'noplaylist': True,
+        'quiet': True,
+        'no_warnings': True,
+        'overwrites': True,
+    }
+    with yt_dlp.YoutubeDL(options) as ytdl:
+        info = ytdl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=True)
+        downloads = info.get('requested_downloads') or []
+        path = downloads[0].get('filepath') if downloads else ytdl.prepare_filename(info)
+    return {'path': path, 'acodec': info.get('acodec'), 'ext': info.get('ext')}
+
+
+class AudioCache:
+    """Ограниченный по размеру кеш аудиофайлов на диске
+
+    Считает воспроизведения всех треков YouTube и скачивает те, что
+    сыграли не меньше min_plays раз. Загрузка идет во временный файл и
+    переименовывается в итоговый только целиком (os.replace атомарен),
+    поэтому плеер никогда не получит недокачанный файл. При превышении
+    размера вытесняются давно не игравшие (lru) или редко игравшие (lfu) треки.
+    """
+
+    def __init__(self, directory: str = AUDIO_CACHE_DIR, max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024,
+                 min_plays: int = AUDIO_CACHE_MIN_PLAYS, eviction: str = AUDIO_CACHE_EVICTION,
+                 downloads: int = AUDIO_CACHE_DOWNLOADS):
+        """Инициализация кеша
+
+        Args:
+            directory: Каталог для файлов и индекса
+            max_bytes: Максимальный суммарный размер файлов
+            min_plays: Порог воспроизведений для скачивания
+            eviction: Политика вытеснения: 'lru' или 'lfu'
+            downloads: Сколько треков скачивать одновременно
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = max(1, min_plays)
+        self.eviction = eviction if eviction in EVICTION_ORDER else 'lfu'
+        self.downloads = max(1, downloads)
+        self._executor = None
+        self._in_progress = set()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.hits = metrics.counter('audio_cache_hits')
+        self.misses = metrics.counter('audio_cache_misses')
+        self.stored = metrics.counter('audio_cache_stored')
+        self.evicted = metrics.counter('audio_cache_evicted')
+        self.download_failures = metrics.counter('audio_cache_download_failures')
+        self.size_bytes = metrics.gauge('audio_cache_bytes')
+
+    def _db(self) -> sqlite3.Connection:
+        """Соединение с индексом (каталог создается лениво при первом обращении)"""
+        if self._conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.directory, 'index.db'), check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tracks ('
+                'video_id TEXT PRIMARY KEY, '
+                'plays INTEGER NOT NULL DEFAULT 0, '
+                'last_played REAL NOT NULL, '
+                'path TEXT, '
+                'size INTEGER, '
+                'acodec TEXT)'
+            )
+            self._conn.commit()
+            self._remove_stale_files()
+            self.size_bytes.set(self._total_size())
+        return self._conn
+
+    def _remove_stale_files(self, video_id: str = '') -> None:
+        # Временные файлы остаются после падения посреди загрузки
+        for path in glob.glob(os.path.join(self.directory, f'{TEMP_PREFIX}{video_id}*')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _total_size(self) -> int:
+        return self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM tracks WHERE path IS NOT NULL').fetchone()[0]
+
+    async def local_path(self, track_info: Dict[str, Any]) -> Optional[str]:
+        """Локальный файл трека, если он есть в кеше (без учета в статистике попаданий)"""
+        video_id = track_cache_key(track_info)
+        if video_id is None:
+            return None
+        row = await asyncio.to_thread(self._find, video_id)
+        return row[0] if row else None
+
+    async def lookup(self, track_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Поиск трека в кеше (запрос к индексу - в отдельном потоке)
+
+        Args:
+            track_info: Информация о треке
+
+        Returns:
+            Словарь с path (локальный файл) и acodec или None
+        """
+        video_id = track_cache_key(track_info)
+        if video_id is None:
+            return None
+
+        row = await asyncio.to_thread(self._find, video_id)
+        if row is None:
+            self.misses.inc()
+            return None
+        self.hits.inc()
+        return {'path': row[0], 'acodec': row[1]}
+
+    def _find(self, video_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """Путь и кодек файла трека (выполняется в отдельном потоке)"""
+        with self._lock:
+            row = self._db().execute(
+                'SELECT path, acodec FROM tracks WHERE video_id = ? AND path IS NOT NULL', (video_id,)
+            ).fetchone()
+            if row is not None and not os.path.exists(row[0]):
+                # Файл удалили вручную - забываем его
+                self._conn.execute('UPDATE tracks SET path = NULL, size = NULL WHERE video_id = ?', (video_id,))
+                self._conn.commit()
+                self.size_bytes.set(self._total_size())
+                row = None
+        return row
+
+    def record_play(self, track_info: Dict[str, Any]) -> None:
+        """Учет воспроизведения; трек, достигший порога, скачивается в фоне
+
+        Должна вызываться из цикла событий (запись в индекс идет в отдельном потоке).
+
+        Args:
+            track_info: Информация о треке
+        """
+        video_id = track_cache_key(track_info)
+        if video_id is None:
+            return
+        asyncio.get_running_loop().create_task(self._record_play(video_id))
+
+    async def _record_play(self, video_id: str) -> None:
+        try:
+            plays, path = await asyncio.to_thread(self._count_play, video_id)
+        except sqlite3.Error as e:
+            print(f"Ошибка при учете воспроизведения трека {video_id}: {e}")
+            return
+
+        if path is None and plays >= self.min_plays and video_id not in self._in_progress:
+            self._in_progress.add(video_id)
+            await self._store(video_id)
+
+    def _count_play(self, video_id: str) -> Tuple[int, Optional[str]]:
+        """Увеличивает счетчик воспроизведений (выполняется в отдельном потоке)"""
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT INTO tracks (video_id, plays, last_played) VALUES (?, 1, ?) '
+                'ON CONFLICT(video_id) DO UPDATE SET plays = plays + 1, last_played = excluded.last_played',
+                (video_id, time.time())
+            )
+            conn.commit()
+            return conn.execute(
+                'SELECT plays, path FROM tracks WHERE video_id = ?', (video_id,)
+            ).fetchone()
+
+    async def _store(self, video_id: str) -> None:
+        """Скачивание трека в кеш с атомарным переносом в итоговый файл"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.downloads,
+                thread_name_prefix='audio-cache'
+            )
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor, _download, video_id, self.directory)
+            await asyncio.to_thread(self._save, video_id, result)
+            self.stored.inc()
+        except Exception as e:
+            self.download_failures.inc()
+            print(f"Ошибка при сохранении трека {video_id} в кеш: {e}")
+            await asyncio.to_thread(self._remove_stale_files, video_id)
+        finally:
+            self._in_progress.discard(video_id)
+
+    def _save(self, video_id: str, result: Dict[str, Any]) -> None:
+        """Перенос скачанного файла на место и запись в индекс (выполняется в отдельном потоке)"""
+        final_path = os.path.join(self.directory, f"{video_id}.{result['ext'] or 'audio'}")
+        os.replace(result['path'], final_path)
+        size = os.path.getsize(final_path)
+
+        with self._lock:
+            self._conn.execute(
+                'UPDATE tracks SET path = ?, size = ?, acodec = ? WHERE video_id = ?',
+                (final_path, size, result['acodec'], video_id)
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self) -> None:
+        """Вытеснение файлов сверх лимита (вызывается под блокировкой)
+
+        Запись удаляется из индекса только после удаления файла: файл, который
+        не удалось удалить (например, он открыт), остается в учете размера и
+        вытесняется при следующем проходе.
+        """
+        total = self._total_size()
+        if total > self.max_bytes:
+            rows = self._conn.execute(
+                f'SELECT video_id, path, size FROM tracks WHERE path IS NOT NULL '
+                f'ORDER BY {EVICTION_ORDER[self.eviction]}'
+            ).fetchall()
+            for video_id, path, size in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Не удалось удалить файл кеша {path}: {e}")
+                    continue
+                self._conn.execute('UPDATE tracks SET path = NULL, size = NULL WHERE video_id = ?', (video_id,))
+                total -= size or 0
+                self.evicted.inc()
+            self._conn.commit()
+        self.size_bytes.set(total)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика кеша
+
+        Returns:
+            Словарь с количеством файлов, размером, попаданиями и промахами
+        """
+        with self._lock:
+            conn = self._db()
+            files = conn.execute('SELECT COUNT(*) FROM tracks WHERE path IS NOT NULL').fetchone()[0]
+            size = self._total_size()
+        return {
+            'files': files,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'eviction': self.eviction,
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'downloading': len(self._in_progress)
+        }
+
+
+# 💾 ОБЩИЙ КЕШ АУДИО ДЛЯ ВСЕХ СЕРВЕРОВ!!! 💾
+audio_cache = AudioCache()
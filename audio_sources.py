@@ -0,0 +1,322 @@
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Callable, Tuple
+
+import discord
+
+from pcm_dsp import PCMProcessor, CrossfadeMixer
+
+# Длительность одного аудиокадра Discord (в секундах)
+FRAME_DURATION = 0.02
+
+# Результаты ffprobe для потоков без метаданных yt-dlp (радио): url -> (кодек, битрейт)
+_probe_cache: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+_probes_in_progress = set()
+
+
+def get_cached_probe(url: str) -> Optional[Tuple[Optional[str], Optional[int]]]:
+    """Возвращает закешированный результат ffprobe для ссылки
+
+    Args:
+        url: Ссылка на поток
+
+    Returns:
+        Кортеж (кодек, битрейт) или None, если поток еще не проверялся
+    """
+    return _probe_cache.get(url)
+
+
+async def probe_in_background(url: str) -> None:
+    """Проверяет кодек потока через ffprobe и кеширует результат
+
+    Запускается в фоне, чтобы не задерживать старт воспроизведения:
+    результат пригодится при следующем запуске того же потока.
+
+    Args:
+        url: Ссылка на поток
+    """
+    if url in _probe_cache or url in _probes_in_progress:
+        return
+    _probes_in_progress.add(url)
+    try:
+        _probe_cache[url] = await discord.FFmpegOpusAudio.probe(url)
+    except Exception as e:
+        print(f"Ошибка при проверке кодека потока {url}: {e}")
+    finally:
+        _probes_in_progress.discard(url)
+
+
+def create_opus_source(url: str, codec: Optional[str], bitrate: int, before_options: str,
+                       options: str, allow_copy: bool = True) -> discord.FFmpegOpusAudio:
+    """Создает Opus-источник: копирование без перекодирования для Opus-потоков,
+    иначе кодирование в libopus внутри процесса FFmpeg (а не в потоках Python)
+
+    Args:
+        url: Ссылка на поток
+        codec: Кодек исходного потока, если известен
+        bitrate: Битрейт кодирования (кбит/с)
+        before_options: Параметры FFmpeg до -i
+        options: Параметры FFmpeg после -i
+        allow_copy: False, если в options есть аудиофильтры (с копированием они не работают)
+
+    Returns:
+        Источник звука, отдающий готовые Opus-пакеты
+    """
+    if not allow_copy:
+        codec = None
+    elif codec is None:
+        probe = get_cached_probe(url)
+        if probe:
+            codec = probe[0]
+        else:
+            asyncio.get_running_loop().create_task(probe_in_background(url))
+
+    return discord.FFmpegOpusAudio(
+        url,
+        bitrate=bitrate,
+        codec='opus' if codec == 'opus' else None,
+        before_options=before_options,
+        options=options
+    )
+
+
+class GaplessSource(discord.AudioSource):
+    """Обертка над источником звука с бесшовной сменой трека
+
+    Считает отправленные кадры (позиция воспроизведения) и, если заранее
+    подготовлен следующий источник, переключается на него на границе кадра,
+    не возвращая пустой кадр - поэтому discord.py не вызывает after= и не
+    возникает пауза на запуск FFmpeg.
+
+    С crossfade_seconds > 0 последние секунды трека смешиваются с началом
+    подготовленного (только если оба источника PCM).
+    """
+
+    def __init__(self, source: discord.AudioSource, track_info: Dict[str, Any],
+                 on_transition: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 on_first_frame: Optional[Callable[[], None]] = None,
+                 crossfade_seconds: float = 0.0, start_offset: float = 0.0):
+        """Инициализация обертки
+
+        Args:
+            source: Источник текущего трека
+            track_info: Информация о текущем треке
+            on_transition: Вызывается из аудиопотока при переходе на подготовленный трек
+            on_first_frame: Вызывается из аудиопотока при первом непустом кадре
+            crossfade_seconds: Длительность перекрестного затухания (0 - переход встык)
+            start_offset: Позиция, с которой начат текущий трек (после перемотки или восстановления)
+        """
+        self.current = source
+        self.track_info = track_info
+        self.on_transition = on_transition
+        self.on_first_frame = on_first_frame
+        self.frames = 0
+        self.start_offset = start_offset
+        self.finished = False
+        self.next_source: Optional[discord.AudioSource] = None
+        self.next_track: Optional[Dict[str, Any]] = None
+        self._first_frame_sent = False
+        self._lock = threading.Lock()
+        self.crossfade_seconds = crossfade_seconds
+        self._mixer = CrossfadeMixer(crossfade_seconds) if crossfade_seconds > 0 else None
+        self._incoming_frames = 0
+
+    @property
+    def position(self) -> float:
+        """Позиция воспроизведения текущего трека (в секундах)"""
+        return self.start_offset + self.frames * FRAME_DURATION
+
+    def prepare_next(self, source: discord.AudioSource, track_info: Dict[str, Any]) -> bool:
+        """Подготовка следующего трека (его FFmpeg уже запущен и буферизует данные)
+
+        Закончившаяся или закрытая обертка источник не принимает и сразу
+        закрывает его - иначе FFmpeg остался бы висеть без читателя.
+
+        Args:
+            source: Заранее созданный источник следующего трека
+            track_info: Информация о следующем треке
+
+        Returns:
+            True, если источник принят
+        """
+        with self._lock:
+            accepted = not self.finished
+            if accepted:
+                previous, self.next_source = self.next_source, source
+                self.next_track = track_info
+                self._reset_crossfade()
+        if not accepted:
+            source.cleanup()
+            return False
+        if previous is not None:
+            previous.cleanup()
+        return True
+
+    def take_next(self) -> Optional[Dict[str, Any]]:
+        """Забирает подготовленный трек обратно (источник при этом закрывается)
+
+        Returns:
+            Информация о подготовленном треке или None
+        """
+        with self._lock:
+            track_info = self.next_track
+            if self.next_source is not None:
+                self.next_source.cleanup()
+            self.next_source = None
+            self.next_track = None
+            self._reset_crossfade()
+            return track_info
+
+    def _reset_crossfade(self) -> None:
+        self._incoming_frames = 0
+        if self._mixer is not None:
+            self._mixer.reset()
+
+    def _crossfade_due(self) -> bool:
+        """Пора смешивать: подготовлен PCM-трек и до конца текущего осталось не больше длины перехода"""
+        if self._mixer is None or self.next_source is None:
+            return False
+        if self._mixer.position:
+            return True
+        duration = self.track_info.get('duration')
+        if not duration or duration - self.position > self.crossfade_seconds:
+            return False
+        return not self.current.is_opus() and not self.next_source.is_opus()
+
+    def _read_crossfade(self) -> bytes:
+        """Кадр перехода: уходящий и входящий треки смешиваются (вызывается под блокировкой)"""
+        outgoing = self.current.read()
+        incoming = self.next_source.read()
+        if incoming:
+            self._incoming_frames += 1
+
+        if outgoing and not self._mixer.done:
+            self.frames += 1
+            return self._mixer.mix(outgoing, incoming)
+
+        # Уходящий трек закончился или затих - дальше играет входящий
+        self.current.cleanup()
+        self.current = self.next_source
+        self.track_info = self.next_track
+        self.next_source = None
+        self.next_track = None
+        self.frames = self._incoming_frames
+        self.start_offset = 0.0
+        self._first_frame_sent = False
+        self._reset_crossfade()
+        if self.on_transition:
+            self.on_transition(self.track_info)
+        if not incoming:
+            incoming = self.current.read()
+            if not incoming:
+                self.finished = True
+        return incoming
+
+    def read(self) -> bytes:
+        with self._lock:
+            crossfade = self._crossfade_due()
+            if crossfade:
+                data = self._read_crossfade()
+        if crossfade:
+            if data:
+                self._mark_first_frame()
+            return data
+
+        data = self.current.read()
+
+        if not data:
+            with self._lock:
+                next_source, next_track = self.next_source, self.next_track
+                self.next_source = None
+                self.next_track = None
+
+            if next_source is None:
+                self.finished = True
+                return data
+
+            # Переход на подготовленный трек на границе кадра
+            self.current.cleanup()
+            self.current = next_source
+            self.track_info = next_track
+            self.frames = 0
+            self.start_offset = 0.0
+            self._first_frame_sent = False
+            if self.on_transition:
+                self.on_transition(next_track)
+
+            data = self.current.read()
+            if not data:
+                self.finished = True
+                return data
+
+        self.frames += 1
+        self._mark_first_frame()
+        return data
+
+    def _mark_first_frame(self) -> None:
+        """Сообщает о первом кадре трека (после перехода - о первом кадре нового трека)"""
+        if not self._first_frame_sent:
+            self._first_frame_sent = True
+            if self.on_first_frame:
+                self.on_first_frame()
+
+    def is_opus(self) -> bool:
+        return self.current.is_opus()
+
+    def cleanup(self) -> None:
+        self.finished = True
+        self.current.cleanup()
+        with self._lock:
+            if self.next_source is not None:
+                self.next_source.cleanup()
+                self.next_source = None
+            self.next_track = None
+
+
+class DSPSource(discord.AudioSource):
+    """PCM-источник с обработкой кадров на NumPy: громкость, затухания, мягкое ограничение
+
+    Замена discord.PCMVolumeTransformer, который зависит от модуля audioop
+    (удален в Python 3.13).
+    """
+
+    def __init__(self, original: discord.AudioSource, volume: float = 1.0):
+        """Инициализация обертки
+
+        Args:
+            original: PCM-источник (например, FFmpegPCMAudio)
+            volume: Громкость (1.0 - без изменений)
+        """
+        if original.is_opus():
+            raise ValueError('DSPSource работает только с PCM-источниками')
+        self.original = original
+        self.processor = PCMProcessor(volume=volume)
+
+    @property
+    def volume(self) -> float:
+        return self.processor.volume
+
+    @volume.setter
+    def volume(self, value: float) -> None:
+        # Новая громкость применяется плавно со следующего кадра
+        self.processor.volume = max(0.0, value)
+
+    def fade_in(self, seconds: float) -> None:
+        self.processor.fade_in(seconds)
+
+    def fade_out(self, seconds: float, stop: bool = True) -> None:
+        self.processor.fade_out(seconds, stop)
+
+    def read(self) -> bytes:
+        if self.processor.finished:
+            return b''
+        data = self.original.read()
+        if not data:
+            return data
+        return self.processor.process(data)
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        self.original.cleanup()
@@ -6,6 +6,10 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 from music_player import MusicPlayer
+from spotify_client import spotify_client
+from station_health import station_prober, STATION_PROBE_ENABLED
+from rest_scheduler import rest_scheduler, PRIORITY_PRESENCE, PRESENCE_ROUTE
+from idle_manager import idle_manager
 
 # 🌐 ИМПОРТ ВЕБ-СЕРВЕРА - БЕЗ НЕГО НИЧЕГО НЕ РАБОТАЕТ!!! 🌐
 try:
@@ -77,7 +81,8 @@ intents.members = True
 bot = commands.Bot(
     command_prefix=os.getenv('COMMAND_PREFIX', '/'),
     intents=intents,
-    application_id=APP_ID  # Используем переменную вместо прямого обращения к os.getenv
+    application_id=APP_ID,  # Используем переменную вместо прямого обращения к os.getenv
+    http_trace=rest_scheduler.trace_config()  # Планировщик запросов видит лимиты из каждого ответа Discord
 )
 
 # 🎵 СЛОВАРЬ ДЛЯ ХРАНЕНИЯ МУЗЫКАЛЬНЫХ ПЛЕЕРОВ - КАЖДОМУ СЕРВЕРУ СВОЙ!!! 🎵
@@ -103,6 +108,19 @@ def switch_radio(radio_key):
 # 💾 СОХРАНЕНИЕ ФУНКЦИИ ПЕРЕКЛЮЧЕНИЯ РАДИОСТАНЦИЙ В ЭКЗЕМПЛЯРЕ БОТА!!! 💾
 bot.switch_radio = switch_radio
 
+# 🎭 ОБНОВЛЕНИЕ СТАТУСА БОТА - ЧЕРЕЗ ОБЩИЙ ПЛАНИРОВЩИК, УСТАРЕВШИЕ СТАТУСЫ НЕ ОТПРАВЛЯЮТСЯ!!! 🎭
+async def update_presence(status):
+    """🎭 СМЕНА СТАТУСА БОТА - НЕ ЖДЕТ ОТПРАВКИ, ИЗ ЧАСТЫХ СМЕН УЙДЕТ ПОСЛЕДНЯЯ!!! 🎭"""
+    activity = discord.Activity(type=discord.ActivityType.listening, name=f"/help | {status}")
+    rest_scheduler.post(
+        lambda: bot.change_presence(activity=activity),
+        PRIORITY_PRESENCE,
+        route=PRESENCE_ROUTE,
+        key='presence'
+    )
+
+bot.update_presence = update_presence
+
 @bot.event
 async def on_ready():
     """✅ ВЫЗЫВАЕТСЯ ПРИ УСПЕШНОМ ЗАПУСКЕ БОТА - САМЫЙ ВАЖНЫЙ МОМЕНТ!!! ✅"""
@@ -122,6 +140,13 @@ async def on_ready():
         )
     )
 
+    # 🩺 ФОНОВАЯ ПРОВЕРКА РАДИОСТАНЦИЙ - МЕРТВЫЕ ЗЕРКАЛА ОТСЕИВАЮТСЯ ЗАРАНЕЕ!!! 🩺
+    if STATION_PROBE_ENABLED:
+        station_prober.start(lambda: list(bot.available_radios.values()))
+
+    # 💤 ОСВОБОЖДЕНИЕ ПЛЕЕРОВ В ПУСТЫХ КАНАЛАХ - FFMPEG НЕ ИГРАЕТ В ПУСТОТУ!!! 💤
+    idle_manager.start(bot)
+
     # 🌐 ЗАПУСК ВЕБ-СЕРВЕРА - ДЛЯ УДОБНОГО УПРАВЛЕНИЯ!!! 🌐
     if WEB_ENABLED:
         initialize_web_server(bot)
@@ -137,12 +162,17 @@ async def on_voice_state_update(member, before, after):
         # 🔌 ЕСЛИ БОТ ОТКЛЮЧИЛСЯ ОТ ГОЛОСОВОГО КАНАЛА!!! 🔌
         if before.channel and not after.channel:
             guild_id = before.channel.guild.id
-            # 🗑️ УДАЛЯЕМ ПЛЕЕР ДЛЯ ЭТОЙ ГИЛЬДИИ, ЕСЛИ ОН СУЩЕСТВУЕТ!!! 🗑️
-            if guild_id in bot.players:
-                player = bot.players[guild_id]
-                await player.cleanup()
-                del bot.players[guild_id]
+            # 🗑️ УДАЛЯЕМ ПЛЕЕР ДЛЯ ЭТОЙ ГИЛЬДИИ, ЕСЛИ ОН СУЩЕСТВУЕТ (И ИЗ БОТА, И ИЗ КОГА)!!! 🗑️
+            if await idle_manager.release(guild_id, 'бот отключен от канала'):
                 logger.info(f'🧹 ПЛЕЕР УДАЛЕН ДЛЯ СЕРВЕРА {guild_id} ПОСЛЕ ОТКЛЮЧЕНИЯ ОТ КАНАЛА!!! 🧹')
+            return
+    
+    # 👂 СЛУШАТЕЛИ ПРИШЛИ, УШЛИ ИЛИ ЗАГЛУШИЛИ ЗВУК - В ПУСТОМ КАНАЛЕ ПОТОК НЕ КАЧАЕТСЯ!!! 👂
+    if before.channel != after.channel or before.self_deaf != after.self_deaf or before.deaf != after.deaf:
+        try:
+            await idle_manager.listeners_changed(member.guild)
+        except Exception as e:
+            logger.error(f'❌ ОШИБКА ПРИ ПРИОСТАНОВКЕ/ВОЗОБНОВЛЕНИИ ПОТОКА: {e}!!! ❌')
 
 # 📚 ЗАГРУЗКА КОГОВ С КОМАНДАМИ - МНОЖЕСТВО УДОБНЫХ ФУНКЦИЙ!!! 📚
 async def load_extensions():
@@ -263,7 +293,11 @@ async def main():
     
     # 🚀 ЗАПУСК БОТА - ПОЕХАЛИ!!! 🚀
     async with bot:
-        await bot.start(TOKEN)
+        try:
+            await bot.start(TOKEN)
+        finally:
+            # 🔌 ЗАКРЫВАЕМ ОБЩИЙ ПУЛ СОЕДИНЕНИЙ SPOTIFY!!! 🔌
+            await spotify_client.close()
 
 # 🏁 ЗАПУСК БОТА - ПОЕХАЛИ!!! 🏁
 if __name__ == "__main__":
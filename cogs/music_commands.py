@@ -2,11 +2,13 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from music_player import MusicPlayer
+from rest_scheduler import rest_scheduler, route_key, PRIORITY_INTERACTION, PRIORITY_COSMETIC
 import os
 from dotenv import load_dotenv
 import asyncio
 import time
 import datetime
+import math
 
 # 📝 ЗАГРУЗКА ПЕРЕМЕННЫХ ОКРУЖЕНИЯ - КРИТИЧЕСКИ ВАЖНО!!! 📝
 load_dotenv()
@@ -233,8 +235,14 @@ class MusicCommands(commands.Cog):
                 inline=False
             )
             
-            # Обновление сообщения с новой информацией
-            await self.admin_panel_message.edit(embed=embed)
+            # Обновление сообщения с новой информацией (устаревшее, еще не отправленное обновление заменяется)
+            message = self.admin_panel_message
+            await rest_scheduler.run(
+                lambda: message.edit(embed=embed),
+                PRIORITY_COSMETIC,
+                route=route_key('PATCH', f'/channels/{message.channel.id}/messages/{message.id}')[0],
+                key='admin_panel'
+            )
         except Exception as e:
             print(f"Ошибка при обновлении админ-панели: {e}")
             # При ошибке пробуем создать панель заново
@@ -388,6 +396,38 @@ class MusicCommands(commands.Cog):
         else:
             await interaction.response.send_message("Музыкальный плеер не запущен.", ephemeral=True)
     
+    @app_commands.command(name="seek", description="Перемотать текущий трек (секунды или мм:сс)")
+    async def seek_command(self, interaction: discord.Interaction, позиция: str):
+        """Перемотка текущего трека"""
+        if interaction.guild_id not in self.players:
+            await interaction.response.send_message("Музыкальный плеер не запущен.", ephemeral=True)
+            return
+        
+        player = self.players[interaction.guild_id]
+        if not hasattr(player, 'seek'):
+            await interaction.response.send_message("Перемотка недоступна в этом режиме плеера.", ephemeral=True)
+            return
+        
+        try:
+            seconds = 0
+            for part in позиция.strip().split(':'):
+                seconds = seconds * 60 + float(part)
+        except ValueError:
+            seconds = None
+        # float() принимает и "inf"/"nan" - такую позицию FFmpeg не поймет
+        if seconds is None or not math.isfinite(seconds):
+            await interaction.response.send_message("Укажите позицию в секундах или в формате мм:сс.", ephemeral=True)
+            return
+        
+        # Перезапуск FFmpeg и разрешение ссылки могут не уложиться в 3 секунды на ответ
+        await interaction.response.defer(ephemeral=True)
+        position = await player.seek(seconds)
+        if position is not None:
+            minutes, rest = divmod(int(position), 60)
+            await interaction.followup.send(f"Перемотано на {minutes}:{rest:02d}.", ephemeral=True)
+        else:
+            await interaction.followup.send("Сейчас нечего перематывать.", ephemeral=True)
+    
     @app_commands.command(name="radio", description="Включить радио")
     async def radio_command(self, interaction: discord.Interaction):
         """Переключение плеера в режим радио"""
@@ -513,6 +553,14 @@ class MusicCommands(commands.Cog):
         """Добавление трека в очередь воспроизведения"""
         # ... existing code ...
 
+async def send_followup(interaction: discord.Interaction, embed: discord.Embed):
+    """Ответ на нажатие кнопки через общий планировщик запросов (с наивысшим приоритетом)"""
+    await rest_scheduler.run(
+        lambda: interaction.followup.send(embed=embed, ephemeral=True),
+        PRIORITY_INTERACTION,
+        route=route_key('POST', f'/webhooks/{interaction.application_id}/{interaction.token}')[0]
+    )
+
 # Класс для кнопок голосования за плейлист
 class PlaylistVotingView(discord.ui.View):
     def __init__(self, playlist_manager, guild_id, playlist_name):
@@ -541,7 +589,7 @@ class PlaylistVotingView(discord.ui.View):
             color=discord.Color.green() if success else discord.Color.red()
         )
         
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        await send_followup(interaction, embed)
     
     @discord.ui.button(label="👎 Против", style=discord.ButtonStyle.red, custom_id="playlist_vote_down")
     async def vote_down(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -563,7 +611,7 @@ class PlaylistVotingView(discord.ui.View):
             color=discord.Color.green() if success else discord.Color.red()
         )
         
-        await interaction.followup.send(embed=embed, ephemeral=True)
+        await send_followup(interaction, embed)
     
     @discord.ui.button(label="ℹ️ Информация", style=discord.ButtonStyle.blurple, custom_id="playlist_info")
     async def playlist_info(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -4,6 +4,8 @@
 """
 
 # 📻 ДОСТУПНЫЕ РАДИОСТАНЦИИ - ВСЕ САМЫЕ ЛУЧШИЕ!!! НЕ ДОБАВЛЯЙ ПЛОХИЕ!!! 📻
+# 🪞 У СТАНЦИИ МОЖНО УКАЗАТЬ ЗЕРКАЛА: 'mirrors': ['https://...', ...] - 
+# БОТ САМ ВЫБЕРЕТ САМЫЙ ЗДОРОВЫЙ АДРЕС ПО РЕЗУЛЬТАТАМ ФОНОВЫХ ПРОВЕРОК!!! 🪞
 radios = {
     'relax': {
         'name': 'Relax FM',
@@ -0,0 +1,190 @@
+import os
+import asyncio
+import threading
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+import yt_dlp
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ ПУЛА ИЗВЛЕЧЕНИЯ - ПОИСК НЕ ДОЛЖЕН МЕШАТЬ ЗВУКУ!!! ⚙️
+# thread = пул потоков (по умолчанию), process = пул процессов без борьбы за GIL
+EXTRACTION_MODE = os.getenv('EXTRACTION_MODE', 'thread').lower()
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '4'))
+# Сколько извлечений один сервер может выполнять одновременно
+EXTRACTION_PER_GUILD = int(os.getenv('EXTRACTION_PER_GUILD', '2'))
+
+# Экземпляр YoutubeDL внутри воркера (свой у каждого потока/процесса)
+_worker_state = threading.local()
+
+
+def _warm_worker(options: Dict[str, Any]) -> None:
+    """Создает экземпляр YoutubeDL заранее, чтобы первый запрос не ждал инициализации"""
+    _worker_state.ytdl = yt_dlp.YoutubeDL(options)
+
+
+def _extract_in_worker(options: Dict[str, Any], query: str) -> Optional[Dict[str, Any]]:
+    """Выполняет extract_info внутри воркера
+
+    Возвращает только нужные плееру поля, чтобы не гонять полный ответ
+    yt-dlp между процессами.
+
+    Args:
+        options: Настройки YoutubeDL
+        query: Ссылка или поисковый запрос
+
+    Returns:
+        Сокращенная информация о треке или None
+    """
+    ytdl = getattr(_worker_state, 'ytdl', None)
+    if ytdl is None:
+        _warm_worker(options)
+        ytdl = _worker_state.ytdl
+
+    data = ytdl.extract_info(query, download=False)
+    if not data:
+        return None
+
+    if 'entries' in data:
+        # Берем первый результат из плейлиста/поиска
+        entries = [entry for entry in data['entries'] if entry]
+        if not entries:
+            return None
+        data = entries[0]
+
+    return {
+        'id': data.get('id'),
+        'title': data.get('title'),
+        'url': data.get('url'),
+        'webpage_url': data.get('webpage_url'),
+        'thumbnail': data.get('thumbnail'),
+        'duration': data.get('duration'),
+        'acodec': data.get('acodec'),
+        'abr': data.get('abr'),
+        'ext': data.get('ext')
+    }
+
+
+class ExtractionPool:
+    """Выделенный ограниченный пул для yt-dlp с лимитами на сервер"""
+
+    def __init__(self, ytdl_options: Dict[str, Any], mode: str = EXTRACTION_MODE,
+                 workers: int = EXTRACTION_WORKERS, per_guild: int = EXTRACTION_PER_GUILD):
+        """Инициализация пула
+
+        Пул создается лениво при первом запросе, чтобы импорт модуля
+        не порождал процессы.
+
+        Args:
+            ytdl_options: Настройки YoutubeDL
+            mode: 'thread' или 'process'
+            workers: Количество воркеров
+            per_guild: Максимум одновременных извлечений на сервер
+        """
+        self.ytdl_options = dict(ytdl_options)
+        self.mode = mode if mode in ('thread', 'process') else 'thread'
+        self.workers = max(1, workers)
+        self.per_guild = max(1, per_guild)
+        self._executor = None
+        self._slots = None
+        self._guild_slots: Dict[Any, asyncio.Semaphore] = {}
+
+        self.queue_depth = metrics.gauge('extraction_queue_depth')
+        self.in_flight = metrics.gauge('extraction_in_flight')
+        self.completed = metrics.counter('extraction_completed')
+        self.failed = metrics.counter('extraction_failed')
+
+    def _get_executor(self):
+        """Возвращает (или создает) исполнитель нужного типа"""
+        if self._executor is None:
+            if self.mode == 'process':
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_warm_worker,
+                    initargs=(self.ytdl_options,)
+                )
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='ytdl',
+                    initializer=_warm_worker,
+                    initargs=(self.ytdl_options,)
+                )
+        return self._executor
+
+    def _get_guild_slots(self, guild_id) -> asyncio.Semaphore:
+        slots = self._guild_slots.get(guild_id)
+        if slots is None:
+            slots = asyncio.Semaphore(self.per_guild)
+            self._guild_slots[guild_id] = slots
+        return slots
+
+    async def extract(self, query: str, guild_id=None) -> Optional[Dict[str, Any]]:
+        """Извлечение информации о треке в пуле
+
+        Запросы ждут своей очереди в asyncio, а не внутри исполнителя,
+        поэтому глубина очереди видна точно.
+
+        Args:
+            query: Ссылка или поисковый запрос
+            guild_id: ID сервера для лимита одновременных запросов
+
+        Returns:
+            Сокращенная информация о треке или None
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        loop = asyncio.get_running_loop()
+        self.queue_depth.inc()
+        started = False
+        try:
+            async with self._get_guild_slots(guild_id):
+                async with self._slots:
+                    self.queue_depth.dec()
+                    started = True
+                    self.in_flight.inc()
+                    try:
+                        result = await loop.run_in_executor(
+                            self._get_executor(), _extract_in_worker, self.ytdl_options, query
+                        )
+                    except BrokenProcessPool:
+                        # Воркер упал - пересоздаем пул, чтобы следующие запросы работали
+                        self._executor = None
+                        raise
+                    finally:
+                        self.in_flight.dec()
+            self.completed.inc()
+            return result
+        except Exception:
+            self.failed.inc()
+            raise
+        finally:
+            if not started:
+                self.queue_depth.dec()
+
+    def forget_guild(self, guild_id) -> None:
+        """Удаляет лимитер сервера (когда плеер сервера уничтожен)"""
+        self._guild_slots.pop(guild_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика пула
+
+        Returns:
+            Словарь с режимом, размером пула и текущей нагрузкой
+        """
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'per_guild': self.per_guild,
+            'queue_depth': self.queue_depth.value,
+            'in_flight': self.in_flight.value
+        }
+
+    def shutdown(self) -> None:
+        """Останавливает воркеры пула"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
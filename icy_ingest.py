@@ -0,0 +1,215 @@
+import os
+import socket
+import threading
+from typing import Optional, Callable
+
+import discord
+
+import metrics
+from stream_http import open_stream
+
+# ⚙️ ЧТЕНИЕ РАДИОПОТОКА САМИМ БОТОМ - НАЗВАНИЕ ПЕСНИ В ЭФИРЕ БЕЗ ВТОРОГО СОЕДИНЕНИЯ!!! ⚙️
+RADIO_ICY_METADATA = os.getenv('RADIO_ICY_METADATA', 'true').lower() == 'true'
+# Таймаут подключения и чтения потока (в секундах)
+RADIO_ICY_TIMEOUT = float(os.getenv('RADIO_ICY_TIMEOUT', '15'))
+
+# Длина блока метаданных хранится в одном байте в единицах по 16 байт
+METADATA_BLOCK_UNIT = 16
+# Кодировки названий: большинство станций шлет UTF-8, старые русские серверы - cp1251
+TITLE_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
+titles_received = metrics.counter('radio_icy_titles')
+
+
+def parse_stream_title(block: bytes) -> Optional[str]:
+    """Извлекает StreamTitle из блока ICY-метаданных
+
+    Args:
+        block: Блок метаданных, например b"StreamTitle='Artist - Song';StreamUrl='';"
+
+    Returns:
+        Название или None, если его нет (пустое название тоже None)
+    """
+    text = None
+    block = block.rstrip(b'\x00')
+    for encoding in TITLE_ENCODINGS:
+        try:
+            text = block.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+
+    marker = "StreamTitle='"
+    start = text.find(marker)
+    if start == -1:
+        return None
+    start += len(marker)
+    # Апострофы внутри названия встречаются, поэтому ищем именно "';" или конец блока
+    end = text.find("';", start)
+    if end == -1:
+        end = text.rfind("'")
+    title = text[start:end if end >= start else None].strip()
+    return title or None
+
+
+class IcyStream:
+    """Радиопоток с вырезанными ICY-метаданными
+
+    Файлоподобный объект для FFmpeg с pipe=True: discord.py в своем потоке
+    вызывает read() и пишет байты в stdin FFmpeg. Соединение со станцией
+    одно - из него же берутся названия песен (StreamTitle), которые
+    передаются в on_title при каждой смене.
+
+    Если сервер не поддерживает метаданные (нет icy-metaint), поток
+    просто передается как есть.
+    """
+
+    def __init__(self, url: str, on_title: Optional[Callable[[str], None]] = None,
+                 timeout: float = RADIO_ICY_TIMEOUT):
+        """Инициализация (подключение откладывается до первого чтения, чтобы не блокировать цикл событий)
+
+        Args:
+            url: Адрес потока станции
+            on_title: Вызывается из потока чтения с новым названием песни
+            timeout: Таймаут подключения и чтения
+        """
+        self.url = url
+        self.on_title = on_title
+        self.timeout = timeout
+        self.title: Optional[str] = None
+        self.metaint = 0
+        self.closed = False
+        self._sock = None
+        self._reader = None
+        self._until_metadata = 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> None:
+        sock, reader, status, headers = open_stream(self.url, self.timeout, icy_metadata=True)
+        if status != 200:
+            sock.close()
+            raise ConnectionError(f"HTTP {status}")
+
+        metaint = headers.get('icy-metaint', '')
+        self.metaint = int(metaint) if metaint.isdigit() else 0
+        self._until_metadata = self.metaint
+
+        with self._lock:
+            if self.closed:
+                sock.close()
+                raise ConnectionError('поток закрыт')
+            self._sock, self._reader = sock, reader
+
+    def _read_metadata(self) -> None:
+        length = self._reader.read(1)
+        if not length:
+            raise EOFError
+        size = length[0] * METADATA_BLOCK_UNIT
+        if not size:
+            return
+        block = self._reader.read(size)
+        if len(block) < size:
+            raise EOFError
+
+        title = parse_stream_title(block)
+        if title and title != self.title:
+            self.title = title
+            titles_received.inc()
+            if self.on_title:
+                try:
+                    self.on_title(title)
+                except Exception as e:
+                    print(f"Ошибка при обработке названия песни {self.url}: {e}")
+
+    def read(self, size: int = -1) -> bytes:
+        """Очередная порция аудио без метаданных (b'' - поток закончился)
+
+        Args:
+            size: Максимальный размер порции
+
+        Returns:
+            Байты аудио
+        """
+        if self.closed:
+            return b''
+        try:
+            if self._reader is None:
+                self._open()
+            if size is None or size < 0:
+                size = 8192
+
+            if self.metaint:
+                if self._until_metadata == 0:
+                    self._read_metadata()
+                    self._until_metadata = self.metaint
+                size = min(size, self._until_metadata)
+
+            # read1 отдает то, что уже пришло, не дожидаясь полной порции
+            data = self._reader.read1(size)
+            if self.metaint:
+                self._until_metadata -= len(data)
+            return data
+        except Exception as e:
+            # Исключение убило бы поток записи discord.py, и FFmpeg ждал бы stdin вечно
+            if not self.closed:
+                print(f"Поток станции {self.url} прерван: {e or type(e).__name__}")
+            return b''
+
+    def close(self) -> None:
+        """Закрывает соединение (можно вызывать из любого потока)"""
+        with self._lock:
+            self.closed = True
+            sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                # shutdown будит поток, ждущий данных в recv
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+
+class IcyOpusAudio(discord.FFmpegOpusAudio):
+    """Opus-источник, читающий станцию через IcyStream"""
+
+    def __init__(self, stream: IcyStream, **kwargs):
+        self.stream = stream
+        super().__init__(stream, pipe=True, **kwargs)
+
+    def cleanup(self) -> None:
+        super().cleanup()
+        self.stream.close()
+
+
+class IcyPCMAudio(discord.FFmpegPCMAudio):
+    """PCM-источник, читающий станцию через IcyStream"""
+
+    def __init__(self, stream: IcyStream, **kwargs):
+        self.stream = stream
+        super().__init__(stream, pipe=True, **kwargs)
+
+    def cleanup(self) -> None:
+        super().cleanup()
+        self.stream.close()
+
+
+def create_icy_source(url: str, on_title: Optional[Callable[[str], None]], options: str,
+                      bitrate: Optional[int] = None) -> discord.AudioSource:
+    """Создает источник звука станции с разбором названий песен
+
+    Параметры переподключения FFmpeg (-reconnect) не передаются: FFmpeg
+    читает stdin, а оборванное соединение обрабатывают автоматы станций.
+
+    Args:
+        url: Адрес потока станции
+        on_title: Вызывается из потока чтения с новым названием песни
+        options: Параметры FFmpeg после -i
+        bitrate: Битрейт кодирования в Opus (кбит/с) или None для PCM
+
+    Returns:
+        Opus-источник (если указан битрейт) или PCM-источник
+    """
+    stream = IcyStream(url, on_title)
+    if bitrate is None:
+        return IcyPCMAudio(stream, options=options)
+    return IcyOpusAudio(stream, bitrate=bitrate, options=options)
@@ -0,0 +1,218 @@
+import os
+import gc
+import time
+import asyncio
+from typing import Dict, Any, Optional
+
+import metrics
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# ⚙️ НАСТРОЙКИ ОСВОБОЖДЕНИЯ ПРОСТАИВАЮЩИХ ПЛЕЕРОВ - НЕ ИГРАЕМ В ПУСТОЙ КАНАЛ!!! ⚙️
+# Сколько минут канал может быть без слушателей, прежде чем плеер освобождается (0 - никогда)
+INACTIVE_TIMEOUT = float(os.getenv('INACTIVE_TIMEOUT', '30'))
+# Закрывать поток (FFmpeg, соединение с источником), пока в канале нет слушателей, оставаясь в канале
+LISTENER_AUTO_PAUSE = os.getenv('LISTENER_AUTO_PAUSE', 'true').lower() == 'true'
+# Сколько секунд ждать после ухода последнего слушателя - короткий перезаход ничего не стоит
+LISTENER_PAUSE_DELAY = float(os.getenv('LISTENER_PAUSE_DELAY', '15'))
+
+# Как часто проверять каналы (в секундах)
+IDLE_CHECK_INTERVAL = 30.0
+# Сколько ждать после освобождения перед замером: FFmpeg станции останавливается в своем потоке
+RECLAIM_SETTLE_SECONDS = 1.0
+
+reclaimed_players = metrics.counter('idle_reclaimed_players')
+reclaimed_processes = metrics.counter('idle_reclaimed_ffmpeg_processes')
+reclaimed_tracks = metrics.counter('idle_reclaimed_tracks')
+
+
+def human_listeners(guild) -> int:
+    """Количество людей (не ботов и не заглушивших звук) в голосовом канале бота на сервере
+
+    Args:
+        guild: Сервер Discord (или None)
+
+    Returns:
+        Число слушателей (0, если бот не в голосовом канале)
+    """
+    voice = guild.voice_client if guild else None
+    channel = getattr(voice, 'channel', None)
+    if channel is None:
+        return 0
+    return sum(
+        1 for member in channel.members
+        if not member.bot and not (member.voice and (member.voice.self_deaf or member.voice.deaf))
+    )
+
+
+def resource_usage() -> Optional[Dict[str, int]]:
+    """Память и число процессов FFmpeg всего бота (None без psutil)"""
+    if psutil is None:
+        return None
+    process = psutil.Process()
+    ffmpeg = 0
+    for child in process.children(recursive=True):
+        try:
+            if 'ffmpeg' in child.name().lower():
+                ffmpeg += 1
+        except psutil.Error:
+            pass
+    return {'rss': process.memory_info().rss, 'ffmpeg': ffmpeg}
+
+
+class IdleManager:
+    """Фоновая задача, освобождающая плееры серверов без слушателей
+
+    Если в голосовом канале бота нет ни одного человека дольше таймаута
+    (или плеер вообще не подключен), плеер полностью освобождается:
+    останавливается воспроизведение, FFmpeg убивается, бот выходит из
+    канала, очередь очищается, а плеер удаляется из bot.players и из
+    кога MusicCommands. Команда /start создаст новый плеер.
+
+    До этого, через pause_delay после ухода последнего слушателя, плеер
+    только закрывает поток (suspend_stream), оставаясь в канале, и
+    продолжает его, когда слушатель возвращается.
+    """
+
+    def __init__(self, timeout: float = INACTIVE_TIMEOUT * 60, interval: float = IDLE_CHECK_INTERVAL,
+                 pause_delay: float = LISTENER_PAUSE_DELAY):
+        """Инициализация
+
+        Args:
+            timeout: Допустимое время без слушателей (в секундах, 0 - не освобождать)
+            interval: Период проверки (в секундах)
+            pause_delay: Задержка закрытия потока после ухода слушателей (в секундах)
+        """
+        self.timeout = timeout
+        self.interval = interval
+        self.pause_delay = pause_delay
+        self.bot = None
+        self._idle_since: Dict[int, float] = {}
+        self._pause_tasks: Dict[int, asyncio.Task] = {}
+        self._task = None
+
+    def start(self, bot) -> None:
+        """Запускает фоновые проверки, если они еще не запущены
+
+        Args:
+            bot: Экземпляр бота
+        """
+        self.bot = bot
+        if self.timeout <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает фоновые проверки"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_once()
+            except Exception as e:
+                print(f"Ошибка при проверке простаивающих плееров: {e}")
+
+    async def check_once(self) -> None:
+        """Одна проверка всех плееров"""
+        now = time.monotonic()
+        for guild_id in list(self.bot.players):
+            if human_listeners(self.bot.get_guild(guild_id)) > 0:
+                self._idle_since.pop(guild_id, None)
+                continue
+            since = self._idle_since.setdefault(guild_id, now)
+            if now - since >= self.timeout:
+                minutes = (now - since) / 60
+                await self.release(guild_id, f"нет слушателей {minutes:.0f} мин")
+
+    async def listeners_changed(self, guild) -> None:
+        """Реакция на вход, выход или заглушение участника голосового канала
+
+        Args:
+            guild: Сервер, на котором изменилось голосовое состояние
+        """
+        player = self.bot.players.get(guild.id) if self.bot else None
+        if not LISTENER_AUTO_PAUSE or player is None or not hasattr(player, 'suspend_stream'):
+            return
+
+        if human_listeners(guild) > 0:
+            task = self._pause_tasks.pop(guild.id, None)
+            if task is not None:
+                task.cancel()
+            if player.suspended and await player.resume_stream():
+                print(f"▶️ Слушатели вернулись на сервер {guild.id} - поток возобновлен")
+        elif guild.id not in self._pause_tasks and not player.suspended:
+            self._pause_tasks[guild.id] = asyncio.get_running_loop().create_task(
+                self._suspend_later(guild.id, player)
+            )
+
+    async def _suspend_later(self, guild_id: int, player) -> None:
+        try:
+            await asyncio.sleep(self.pause_delay)
+            if self.bot.players.get(guild_id) is not player:
+                return
+            if human_listeners(self.bot.get_guild(guild_id)) == 0 and await player.suspend_stream():
+                print(f"💤 В канале сервера {guild_id} нет слушателей - поток закрыт до их возвращения")
+        finally:
+            if self._pause_tasks.get(guild_id) is asyncio.current_task():
+                del self._pause_tasks[guild_id]
+
+    async def release(self, guild_id: int, reason: str) -> Optional[Dict[str, Any]]:
+        """Полное освобождение плеера сервера
+
+        Args:
+            guild_id: ID сервера
+            reason: Причина (для лога)
+
+        Returns:
+            Отчет об освобожденных ресурсах или None, если плеера не было
+        """
+        self._idle_since.pop(guild_id, None)
+        task = self._pause_tasks.pop(guild_id, None)
+        if task is not None:
+            task.cancel()
+        player = self.bot.players.pop(guild_id, None)
+        cog = self.bot.get_cog('MusicCommands')
+        if cog is not None:
+            player = cog.players.pop(guild_id, None) or player
+        if player is None:
+            return None
+
+        before = resource_usage()
+        tracks = await player.cleanup()
+        player = None
+        gc.collect()
+        await asyncio.sleep(RECLAIM_SETTLE_SECONDS)
+        after = resource_usage()
+
+        report = {'guild_id': guild_id, 'reason': reason, 'tracks': tracks}
+        reclaimed_players.inc()
+        reclaimed_tracks.inc(tracks)
+        if before is not None and after is not None:
+            # Замеры по всему процессу: другие серверы в это время тоже могли запустить или остановить FFmpeg
+            report['ffmpeg_processes'] = max(0, before['ffmpeg'] - after['ffmpeg'])
+            report['memory_bytes'] = before['rss'] - after['rss']
+            reclaimed_processes.inc(report['ffmpeg_processes'])
+            print(
+                f"🧹 Плеер сервера {guild_id} освобожден ({reason}): "
+                f"FFmpeg: -{report['ffmpeg_processes']}, треков: {tracks}, "
+                f"память: {before['rss'] / 1048576:.1f} -> {after['rss'] / 1048576:.1f} МБ"
+            )
+        else:
+            print(f"🧹 Плеер сервера {guild_id} освобожден ({reason}): треков: {tracks}")
+        return report
+
+
+# 💤 ОБЩИЙ МЕНЕДЖЕР ПРОСТОЯ ДЛЯ ВСЕХ СЕРВЕРОВ!!! 💤
+idle_manager = IdleManager()
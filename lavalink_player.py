@@ -3,18 +3,20 @@ import discord
 import wavelink
 import os
 import pkg_resources
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 from dotenv import load_dotenv
 from typing import Optional, Dict, List, Union, Set
+from track_queue import TrackQueue
+from track_record import TrackRecord
+from prefetcher import QueuePrefetcher
+from spotify_client import spotify_client
+from spotify_import import parse_spotify_url, spotify_track_to_info, import_spotify_collection
+from match_index import match_index, youtube_watch_url
+from track_cache import ResolverCache, extract_youtube_id, resolve_flights, normalize_query
+from now_playing import NowPlayingMessage
 
 # 🔑 ЗАГРУЗКА ПЕРЕМЕННЫХ ОКРУЖЕНИЯ - КРИТИЧЕСКИ ВАЖНО!!! 🔑
 load_dotenv()
 
-# 🎵 НАСТРОЙКА SPOTIFY API - ДЛЯ РАБОТЫ С ПЛЕЙЛИСТАМИ SPOTIFY!!! 🎵
-SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
-SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
-
 # 📻 НАСТРОЙКИ РАДИО ИЗ .ENV - НАСТРОЙ КАК ХОЧЕШЬ!!! 📻
 RADIO_STREAM_URL = os.getenv('RADIO_STREAM_URL', 'https://rusradio.hostingradio.ru/rusradio96.aacp')
 RADIO_NAME = os.getenv('RADIO_NAME', 'Русское Радио')
@@ -40,6 +42,12 @@ except Exception as e:
     print(f"⚠️ Ошибка при определении версии Wavelink: {e}")
     WAVELINK_MAJOR = 1  # По умолчанию предполагаем версию 1.x
 
+# Обложка для треков без собственной
+DEFAULT_THUMBNAIL = 'https://i.ytimg.com/vi/default/hqdefault.jpg'
+
+# 🌍 ОБЩИЙ КЕШ ПОИСКА LAVALINK ДЛЯ ВСЕХ СЕРВЕРОВ (ЗАПИСИ С ENCODED, БЕЗ ССЫЛОК НА ПОТОК YT-DLP)!!! 🌍
+lavalink_cache = ResolverCache()
+
 class LavalinkPlayer:
     def __init__(self, bot, guild_id):
         self.bot = bot
@@ -48,22 +56,26 @@ class LavalinkPlayer:
         self.text_channel_id = None
         self.player = None
         self.current_track = None
-        self.queue = []
+        self.queue = TrackQueue()  # 📜 ОЧЕРЕДЬ С ПЕРЕХОДОМ К СЛЕДУЮЩЕМУ ТРЕКУ ЗА O(1)!!! 📜
         self.is_playing = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
         self.is_paused = False
         self.skip_votes = set()  # 🗳️ МНОЖЕСТВО ID ПОЛЬЗОВАТЕЛЕЙ, ПРОГОЛОСОВАВШИХ ЗА ПРОПУСК!!! 🗳️
         self.votes_required = 3  # 🔢 КОЛИЧЕСТВО ГОЛОСОВ, НЕОБХОДИМОЕ ДЛЯ ПРОПУСКА!!! ДЕМОКРАТИЯ!!! 🔢
+        self.prefetcher = QueuePrefetcher(self)  # ⏩ ДЕРЖИТ СЛЕДУЮЩИЕ ТРЕКИ ГОТОВЫМИ!!! ⏩
+        self.suspended = False  # 💤 LAVALINK ПОСТАВЛЕН НА ПАУЗУ, ПОТОМУ ЧТО В КАНАЛЕ НЕТ СЛУШАТЕЛЕЙ!!! 💤
+        # 📌 ОДНО СООБЩЕНИЕ "СЕЙЧАС ИГРАЕТ", КОТОРОЕ РЕДАКТИРУЕТСЯ, А НЕ ПЕРЕСОЗДАЕТСЯ!!! 📌
+        self.now_playing = NowPlayingMessage(
+            bot,
+            lambda: self.text_channel_id,
+            self._build_now_playing_embed,
+            lambda: MusicControlView(self)
+        )
         
         # 🎵 НАСТРОЙКА SPOTIFY КЛИЕНТА - ДЛЯ ВОСПРОИЗВЕДЕНИЯ С SPOTIFY!!! 🎵
-        if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
-            self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-                client_id=SPOTIFY_CLIENT_ID,
-                client_secret=SPOTIFY_CLIENT_SECRET
-            ))
-        else:
-            self.sp = None
+        # Общий асинхронный клиент: один пул соединений и один токен на весь бот
+        self.sp = spotify_client if spotify_client.configured else None
     
     async def connect(self):
         """🔌 ПОДКЛЮЧЕНИЕ К ГОЛОСОВОМУ КАНАЛУ - ПЕРВЫЙ ШАГ К ИДЕАЛЬНОЙ МУЗЫКЕ!!! 🔌"""
@@ -124,6 +136,60 @@ class LavalinkPlayer:
             except Exception as e:
                 print(f"⚠️ ОШИБКА ПРИ ОТКЛЮЧЕНИИ ОТ ГОЛОСОВОГО КАНАЛА: {e}!!! ⚠️")
     
+    async def cleanup(self):
+        """🧹 ПОЛНОЕ ОСВОБОЖДЕНИЕ РЕСУРСОВ ПЛЕЕРА - ГОЛОСОВОЕ СОЕДИНЕНИЕ, ОЧЕРЕДЬ, ОБРАБОТЧИКИ!!! 🧹
+        
+        После вызова плеер больше не используется.
+        
+        Returns:
+            Количество освобожденных треков (очередь и текущий)
+        """
+        self.now_playing.close()
+        await self.prefetcher.stop()
+        if WAVELINK_MAJOR >= 3:
+            # Обработчик, добавленный при подключении, держал бы плеер в памяти
+            self.bot.remove_listener(self._on_wavelink_track_end, 'on_wavelink_track_end')
+        await self.disconnect()
+        self.player = None
+        
+        released = len(self.queue) + (1 if self.current_track else 0)
+        self.queue.clear()
+        self.current_track = None
+        self.is_playing = False
+        self.is_paused = False
+        self.skip_votes.clear()
+        self.suspended = False
+        return released
+    
+    async def suspend_stream(self):
+        """💤 В КАНАЛЕ НИКОГО - LAVALINK ПЕРЕСТАЕТ ЧИТАТЬ ИСТОЧНИК, БОТ ОСТАЕТСЯ В КАНАЛЕ!!! 💤
+        
+        Returns:
+            True, если воспроизведение было приостановлено
+        """
+        if self.suspended or not self.player or not self.is_playing or self.is_paused:
+            return False
+        await self.player.pause()
+        await self.prefetcher.stop()
+        self.suspended = True
+        return True
+    
+    async def resume_stream(self):
+        """▶️ СЛУШАТЕЛЬ ВЕРНУЛСЯ - РАДИО С ПРЯМОГО ЭФИРА, ТРЕК С ТОГО ЖЕ МЕСТА!!! ▶️
+        
+        Returns:
+            True, если воспроизведение возобновлено
+        """
+        if not self.suspended or not self.player:
+            return False
+        self.suspended = False
+        self.prefetcher.start()
+        if self.current_track and self.current_track['source'] == 'stream':
+            # Пауза живого потока продолжила бы с отставанием - запускаем станцию заново
+            return await self.play_default_radio()
+        await self.player.resume()
+        return True
+    
     async def play_default_radio(self):
         """📻 ВОСПРОИЗВЕДЕНИЕ РАДИО ПО УМОЛЧАНИЮ - ЛУЧШАЯ МУЗЫКА БЕЗ ПРОБЛЕМ!!! 📻"""
         if not self.player:
@@ -132,12 +198,12 @@ class LavalinkPlayer:
                 return False
         
         try:
-            self.current_track = {
-                'title': RADIO_NAME,
-                'url': RADIO_STREAM_URL,
-                'thumbnail': RADIO_THUMBNAIL,
-                'source': 'stream'
-            }
+            self.current_track = TrackRecord(
+                title=RADIO_NAME,
+                url=RADIO_STREAM_URL,
+                thumbnail=RADIO_THUMBNAIL,
+                source='stream'
+            )
             
             # 🗑️ СБРАСЫВАЕМ ГОЛОСА ПРИ ВОЗВРАТЕ К РАДИО!!! 🗑️
             self.skip_votes.clear()
@@ -230,7 +296,7 @@ class LavalinkPlayer:
         try:
             if self.queue:
                 # Воспроизведение следующего трека из очереди
-                next_track = self.queue.pop(0)
+                next_track = self.queue.popleft()
                 await self.play_track(next_track)
             else:
                 # Возврат к радио по умолчанию
@@ -255,7 +321,7 @@ class LavalinkPlayer:
             
             if self.queue:
                 # Воспроизведение следующего трека из очереди
-                next_track = self.queue.pop(0)
+                next_track = self.queue.popleft()
                 await self.play_track(next_track)
             else:
                 # Возврат к радио по умолчанию
@@ -298,25 +364,11 @@ class LavalinkPlayer:
             # Сбрасываем голоса при смене трека
             self.skip_votes.clear()
             
-            # Если URL уже есть, используем его, иначе ищем через Wavelink
-            if 'wavelink_track' in track_info:
-                track = track_info['wavelink_track']
-            else:
-                # Поиск трека в зависимости от версии Wavelink
-                if WAVELINK_MAJOR >= 3:
-                    tracks = await wavelink.Playable.search(track_info['url'])
-                    if not tracks:
-                        print(f"⚠️ Не удалось найти трек по URL: {track_info['url']}")
-                        return False
-                else:
-                    tracks = await wavelink.Playable.search(track_info['url'])
-                
-                if isinstance(tracks, wavelink.Playlist):
-                    track = tracks.tracks[0]
-                elif isinstance(tracks, list) and tracks:
-                    track = tracks[0]
-                else:
-                    track = tracks
+            # Живой объект wavelink создается только сейчас - в очереди хранится закодированный трек
+            track = await self._materialize_wavelink_track(track_info)
+            if not track:
+                print(f"⚠️ Не удалось найти трек по URL: {track_info['url']}")
+                return False
             
             # Обновляем информацию о треке
             if hasattr(track, 'uri'):
@@ -327,6 +379,9 @@ class LavalinkPlayer:
             self.is_playing = True
             self.is_paused = False
             
+            # Очередь сдвинулась - готовим следующие треки
+            self.prefetcher.wake()
+            
             # Отправка информации о текущем треке
             await self.send_now_playing_embed()
             return True
@@ -334,6 +389,65 @@ class LavalinkPlayer:
             print(f"Ошибка при воспроизведении трека: {e}")
             return False
     
+    async def _materialize_wavelink_track(self, track_info):
+        """Создание объекта wavelink для воспроизведения из записи о треке"""
+        encoded = track_info.get('encoded')
+        if encoded and WAVELINK_MAJOR >= 3:
+            try:
+                # Декодирование на узле Lavalink - без повторного поиска на YouTube
+                data = await wavelink.Pool.get_node().send('GET', path='v4/decodetrack', params={'encodedTrack': encoded})
+                return wavelink.Playable(data)
+            except Exception as e:
+                print(f"Ошибка при декодировании трека {track_info.get('title')}: {e}")
+        
+        return await self._load_queue_track(track_info)
+    
+    async def _load_queue_track(self, track_info):
+        """Загрузка трека очереди по ссылке (недоступное совпадение Spotify ищется заново)"""
+        track = await self._search_wavelink_track(track_info['url'])
+        if track is None and track_info.get('spotify_id'):
+            # Сохраненное совпадение больше не загружается (видео удалено или закрыто)
+            track = await self._rematch_spotify_track(track_info)
+        return track
+    
+    def _record_from_wavelink(self, track, source, fallback_url):
+        """Компактная запись о треке Lavalink (сам объект wavelink не сохраняется)"""
+        length = getattr(track, 'length', None)
+        return TrackRecord(
+            title=track.title,
+            url=track.uri if hasattr(track, 'uri') else fallback_url,
+            thumbnail=getattr(track, 'artwork', None) or DEFAULT_THUMBNAIL,
+            duration=length / 1000 if length else None,
+            encoded=getattr(track, 'encoded', None),
+            source=source
+        )
+    
+    async def _search_wavelink_track(self, query):
+        """Поиск одного трека через Lavalink (одинаковые одновременные запросы выполняются один раз)"""
+        return await resolve_flights.do('lavalink:' + normalize_query(query), lambda: self._load_wavelink_track(query))
+    
+    async def _load_wavelink_track(self, query):
+        """Загрузка одного трека через Lavalink"""
+        tracks = await wavelink.Playable.search(query)
+        if not tracks:
+            return None
+        
+        if isinstance(tracks, wavelink.Playlist):
+            return tracks.tracks[0]
+        elif isinstance(tracks, list):
+            return tracks[0]
+        return tracks
+    
+    async def _needs_prefetch(self, track_info):
+        """Проверка, нужно ли разрешить трек перед воспроизведением"""
+        return track_info.get('source') != 'stream' and 'encoded' not in track_info
+    
+    async def _prefetch_entry(self, track_info):
+        """Разрешение трека очереди заранее (обновляет словарь на месте)"""
+        track = await self._load_queue_track(track_info)
+        if track:
+            track_info['encoded'] = getattr(track, 'encoded', None)
+    
     async def add_to_queue(self, query):
         """Добавление трека в очередь"""
         try:
@@ -342,142 +456,219 @@ class LavalinkPlayer:
                 if not self.sp:
                     return False, "Spotify API не настроен. Проверьте ваши учетные данные Spotify."
                 
-                track_info = await self._get_spotify_track_info(query)
-                if not track_info:
+                # Плейлисты и альбомы импортируются в фоне - первый трек заиграет сразу после поиска
+                kind, collection_id = parse_spotify_url(query)
+                if kind in ('playlist', 'album'):
+                    self.bot.loop.create_task(self._import_spotify_collection(kind, collection_id))
+                    return True, "Импорт из Spotify начат. Треки будут добавляться в очередь по мере поиска."
+                
+                spotify_info = await self._get_spotify_track_info(query)
+                if not spotify_info:
                     return False, "Не удалось получить информацию о треке Spotify."
                 
                 # Поиск трека через Lavalink (Wavelink)
-                search_query = f"{track_info['title']} {track_info['artist']}"
+                track_info = await self._match_spotify_track(spotify_info)
                 
-                if WAVELINK_MAJOR >= 3:
-                    tracks = await wavelink.Playable.search(search_query)
-                else:
-                    tracks = await wavelink.Playable.search(search_query)
-                
-                if not tracks:
+                if not track_info:
                     return False, "Не удалось найти трек."
                 
-                if isinstance(tracks, wavelink.Playlist):
-                    wavelink_track = tracks.tracks[0]
-                elif isinstance(tracks, list) and tracks:
-                    wavelink_track = tracks[0]
-                else:
-                    wavelink_track = tracks
-                
-                # Объединение информации
-                track_info.update({
-                    'wavelink_track': wavelink_track,
-                    'url': wavelink_track.uri if hasattr(wavelink_track, 'uri') else search_query,
-                    'source': 'spotify'
-                })
-                
                 self.queue.append(track_info)
                 
+                self.prefetcher.start()
+                self.prefetcher.wake()
+                
                 # Если ничего не воспроизводится, начать воспроизведение
                 if not self.is_playing:
-                    await self.play_track(self.queue.pop(0))
+                    await self.play_track(self.queue.popleft())
                 
                 return True, f"Трек {track_info['title']} добавлен в очередь."
             
             elif 'youtube.com' in query or 'youtu.be' in query or 'soundcloud.com' in query:
-                # Поиск через Lavalink в зависимости от версии Wavelink
-                if WAVELINK_MAJOR >= 3:
-                    tracks = await wavelink.Playable.search(query)
-                else:
-                    tracks = await wavelink.Playable.search(query)
+                records, is_playlist = await self._resolve_query(
+                    query,
+                    'youtube' if 'youtube' in query else 'soundcloud'
+                )
                 
-                if not tracks:
+                if not records:
                     return False, "Не удалось найти трек."
                 
-                if isinstance(tracks, wavelink.Playlist):
+                if is_playlist:
                     # Это плейлист, добавляем все треки
-                    for track in tracks.tracks:
-                        track_info = {
-                            'title': track.title,
-                            'url': track.uri if hasattr(track, 'uri') else query,
-                            'thumbnail': getattr(track, 'artwork', None) or 'https://i.ytimg.com/vi/default/hqdefault.jpg',
-                            'wavelink_track': track,
-                            'source': 'youtube' if 'youtube' in query else 'soundcloud'
-                        }
-                        self.queue.append(track_info)
+                    self.queue.extend(records)
+                    
+                    self.prefetcher.start()
+                    self.prefetcher.wake()
                     
                     # Если ничего не воспроизводится, начать воспроизведение
                     if not self.is_playing and self.queue:
-                        await self.play_track(self.queue.pop(0))
+                        await self.play_track(self.queue.popleft())
                     
-                    return True, f"Плейлист с {len(tracks.tracks)} треками добавлен в очередь."
-                
-                elif isinstance(tracks, list) and tracks:
-                    track = tracks[0]
-                else:
-                    track = tracks
+                    return True, f"Плейлист с {len(records)} треками добавлен в очередь."
                 
-                track_info = {
-                    'title': track.title,
-                    'url': track.uri if hasattr(track, 'uri') else query,
-                    'thumbnail': getattr(track, 'artwork', None) or 'https://i.ytimg.com/vi/default/hqdefault.jpg',
-                    'wavelink_track': track,
-                    'source': 'youtube' if 'youtube' in query else 'soundcloud'
-                }
+                track_info = records[0]
                 
                 self.queue.append(track_info)
                 
+                self.prefetcher.start()
+                self.prefetcher.wake()
+                
                 # Если ничего не воспроизводится, начать воспроизведение
                 if not self.is_playing:
-                    await self.play_track(self.queue.pop(0))
+                    await self.play_track(self.queue.popleft())
                 
                 return True, f"Трек {track_info['title']} добавлен в очередь."
             
             else:
-                # Обработка поискового запроса
-                if WAVELINK_MAJOR >= 3:
-                    tracks = await wavelink.Playable.search(query)
-                else:
-                    tracks = await wavelink.Playable.search(query)
+                # Обработка поискового запроса (по умолчанию предполагаем, что это YouTube)
+                records, _ = await self._resolve_query(query, 'youtube')
                 
-                if not tracks:
+                if not records:
                     return False, "Не удалось найти трек."
                 
-                if isinstance(tracks, list) and tracks:
-                    track = tracks[0]
-                else:
-                    track = tracks
-                
-                track_info = {
-                    'title': track.title,
-                    'url': track.uri if hasattr(track, 'uri') else query,
-                    'thumbnail': getattr(track, 'artwork', None) or 'https://i.ytimg.com/vi/default/hqdefault.jpg',
-                    'wavelink_track': track,
-                    'source': 'youtube'  # По умолчанию предполагаем, что это YouTube
-                }
+                track_info = records[0]
                 
                 self.queue.append(track_info)
                 
+                self.prefetcher.start()
+                self.prefetcher.wake()
+                
                 # Если ничего не воспроизводится, начать воспроизведение
                 if not self.is_playing:
-                    await self.play_track(self.queue.pop(0))
+                    await self.play_track(self.queue.popleft())
                 
                 return True, f"Трек {track_info['title']} добавлен в очередь."
         except Exception as e:
             print(f"Ошибка при добавлении трека в очередь: {e}")
             return False, f"Произошла ошибка: {str(e)}"
     
+    async def _resolve_query(self, query, source):
+        """Поиск запроса пользователя через Lavalink с общим кешем
+        
+        Найденный трек кешируется в lavalink_cache - тот же запрос с другого
+        сервера не идет в Lavalink. Плейлист не кешируется (его состав
+        меняется), но одновременные одинаковые запросы и плейлистов, и треков
+        выполняются один раз.
+        
+        Args:
+            query: Ссылка или поисковый запрос
+            source: Источник для записей о треках ('youtube', 'soundcloud')
+        
+        Returns:
+            (записи о треках, это плейлист); пустой список, если ничего не найдено
+        """
+        cached = lavalink_cache.get(query)
+        if cached:
+            return [TrackRecord.from_dict(cached)], False
+        
+        # Ключ отличается от _search_wavelink_track: здесь результат - записи, а не объект wavelink
+        records, is_playlist = await resolve_flights.do(
+            'lavalink-query:' + normalize_query(query),
+            lambda: self._load_query(query, source)
+        )
+        # Каждый получает свои записи - они меняются на месте при предзагрузке
+        return [record.copy() for record in records], is_playlist
+    
+    async def _load_query(self, query, source):
+        """Загрузка запроса через Lavalink с сохранением одиночного трека в кеш"""
+        tracks = await wavelink.Playable.search(query)
+        if not tracks:
+            return [], False
+        
+        if isinstance(tracks, wavelink.Playlist):
+            return [self._record_from_wavelink(track, source, query) for track in tracks.tracks], True
+        
+        track = tracks[0] if isinstance(tracks, list) else tracks
+        record = self._record_from_wavelink(track, source, query)
+        lavalink_cache.put(query, record)
+        return [record], False
+    
+    async def _match_spotify_track(self, spotify_info):
+        """Поиск трека Spotify через Lavalink и объединение информации"""
+        track_info = TrackRecord.from_dict(spotify_info)
+        
+        # Трек уже сопоставлялся раньше - Lavalink загрузит видео по ссылке при предзагрузке
+        match = await match_index.lookup(spotify_info.get('spotify_id'), spotify_info.get('isrc'))
+        if match:
+            track_info.update({
+                'url': youtube_watch_url(match['video_id']),
+                'duration': match['duration'] or spotify_info.get('duration'),
+                'source': 'spotify'
+            })
+            return track_info
+        
+        wavelink_track = await self._search_spotify_match(track_info)
+        return track_info if wavelink_track else None
+    
+    async def _search_spotify_match(self, track_info):
+        """Поиск трека Spotify через Lavalink с сохранением совпадения (обновляет запись на месте)"""
+        search_query = f"{track_info['title']} {track_info['artist']}"
+        wavelink_track = await self._search_wavelink_track(search_query)
+        
+        if not wavelink_track:
+            return None
+        
+        url = wavelink_track.uri if hasattr(wavelink_track, 'uri') else search_query
+        
+        # Запоминаем только совпадения с YouTube - их можно загрузить по ID
+        video_id = extract_youtube_id(url) if url else None
+        if video_id:
+            length = getattr(wavelink_track, 'length', None)
+            await match_index.store(
+                track_info.get('spotify_id'),
+                track_info.get('isrc'),
+                video_id,
+                length / 1000 if length else None
+            )
+        
+        track_info.update({
+            'encoded': getattr(wavelink_track, 'encoded', None),
+            'url': url,
+            'source': 'spotify'
+        })
+        return wavelink_track
+    
+    async def _rematch_spotify_track(self, track_info):
+        """Замена недоступного совпадения Spotify результатом нового поиска"""
+        await match_index.invalidate(track_info['spotify_id'], track_info.get('isrc'))
+        return await self._search_spotify_match(track_info)
+    
+    async def _enqueue_imported_track(self, track_info):
+        """Добавление трека, найденного при импорте, в очередь"""
+        self.queue.append(track_info)
+        self.prefetcher.start()
+        self.prefetcher.wake()
+        
+        # Если ничего не воспроизводится, начать воспроизведение
+        if not self.is_playing:
+            await self.play_track(self.queue.popleft())
+    
+    async def _import_spotify_collection(self, kind, collection_id):
+        """Фоновый импорт плейлиста или альбома Spotify"""
+        try:
+            added = await import_spotify_collection(
+                self.sp,
+                kind,
+                collection_id,
+                self._match_spotify_track,
+                self._enqueue_imported_track
+            )
+            print(f"Импорт из Spotify завершен: добавлено {added} треков")
+        except Exception as e:
+            print(f"Ошибка при импорте из Spotify: {e}")
+    
     async def _get_spotify_track_info(self, spotify_url):
         """Получение информации о треке Spotify"""
         try:
             # Извлечение ID трека из URL
-            track_id = spotify_url.split('/')[-1].split('?')[0]
+            kind, track_id = parse_spotify_url(spotify_url)
+            if kind != 'track':
+                return None
             
             # Получение информации о треке через API Spotify
-            track = self.sp.track(track_id)
+            track = await self.sp.track(track_id)
             
             # Формирование информации о треке
-            return {
-                'title': track['name'],
-                'artist': ', '.join([artist['name'] for artist in track['artists']]),
-                'thumbnail': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                'duration': track['duration_ms'] / 1000  # Конвертация в секунды
-            }
+            return spotify_track_to_info(track)
         except Exception as e:
             print(f"Ошибка при получении информации о треке Spotify: {e}")
             return None
@@ -536,6 +727,7 @@ class LavalinkPlayer:
     async def resume(self):
         """Возобновление воспроизведения"""
         if self.player and self.is_playing and self.is_paused:
+            self.suspended = False
             await self.player.resume()
             self.is_paused = False
             return True
@@ -547,69 +739,88 @@ class LavalinkPlayer:
             self.is_playing = False
             self.is_paused = False
             self.queue.clear()
+            await self.prefetcher.stop()
             await self.player.disconnect()
             self.player = None
             return True
         return False
     
+    async def remove_track(self, index, from_web=False):
+        """Удаление трека из очереди по индексу
+        
+        Args:
+            index: Позиция трека в очереди (0 - следующий)
+            from_web: Запрос пришел из веб-интерфейса
+        
+        Returns:
+            Удаленный трек или None, если индекс вне очереди
+        """
+        track_info = self.queue.remove_at(index)
+        if track_info:
+            # Начало очереди могло сдвинуться - готовим новые следующие треки
+            self.prefetcher.wake()
+        return track_info
+    
+    async def move_track(self, source, destination):
+        """Перемещение трека в очереди
+        
+        Args:
+            source: Текущая позиция трека
+            destination: Новая позиция трека
+        
+        Returns:
+            True, если трек перемещен
+        """
+        moved = self.queue.move(source, destination)
+        if moved:
+            self.prefetcher.wake()
+        return moved
+    
+    async def shuffle_queue(self):
+        """Перемешивание очереди"""
+        self.queue.shuffle()
+        self.prefetcher.wake()
+    
     async def send_now_playing_embed(self):
-        """Отправка эмбеда с информацией о текущем треке"""
-        try:
-            text_channel = self.bot.get_channel(self.text_channel_id)
-            if not text_channel:
-                guild = self.bot.get_guild(self.guild_id)
-                if guild:
-                    text_channel = guild.get_channel(self.text_channel_id)
-            
-            if not text_channel:
-                print(f"Не удалось найти текстовый канал с ID {self.text_channel_id}")
-                return
-            
-            embed = discord.Embed(
-                title="Сейчас играет:",
-                description=f"**{self.current_track['title']}**",
-                color=discord.Color.blue()
-            )
-            
-            if 'artist' in self.current_track:
-                embed.add_field(name="Исполнитель", value=self.current_track['artist'], inline=True)
-            
-            if 'source' in self.current_track:
-                if self.current_track['source'] == 'stream':
-                    embed.add_field(name="Источник", value="📻 Радиостанция", inline=True)
-                elif self.current_track['source'] == 'spotify':
-                    embed.add_field(name="Источник", value="Spotify", inline=True)
-                elif self.current_track['source'] == 'youtube':
-                    embed.add_field(name="Источник", value="YouTube", inline=True)
-                elif self.current_track['source'] == 'soundcloud':
-                    embed.add_field(name="Источник", value="SoundCloud", inline=True)
-            
-            if 'thumbnail' in self.current_track and self.current_track['thumbnail']:
-                embed.set_thumbnail(url=self.current_track['thumbnail'])
-            
-            # Добавление информации о следующих треках в очереди
-            if self.queue:
-                next_tracks = "\n".join([f"{i+1}. {track['title']}" for i, track in enumerate(self.queue[:3])])
-                if len(self.queue) > 3:
-                    next_tracks += f"\n...и еще {len(self.queue) - 3} трек(ов)"
-                embed.add_field(name="В очереди:", value=next_tracks, inline=False)
-            
-            # Добавление кнопок управления
-            view = MusicControlView(self)
-            
-            # Отправка или обновление сообщения
-            try:
-                # Попытка очистить предыдущие сообщения бота в канале
-                async for message in text_channel.history(limit=10):
-                    if message.author == self.bot.user and message.embeds:
-                        await message.delete()
-            except Exception as e:
-                print(f"Ошибка при очистке предыдущих сообщений: {e}")
-            
-            await text_channel.send(embed=embed, view=view)
-            
-        except Exception as e:
-            print(f"Ошибка при отправке информации о текущем треке: {e}")
+        """Обновление сообщения "Сейчас играет" (одно сообщение, редактируется на месте)"""
+        if self.current_track:
+            self.now_playing.request()
+    
+    def _build_now_playing_embed(self):
+        """Эмбед с информацией о текущем треке и ближайших треках очереди"""
+        if not self.current_track:
+            return None
+        
+        embed = discord.Embed(
+            title="Сейчас играет:",
+            description=f"**{self.current_track['title']}**",
+            color=discord.Color.blue()
+        )
+        
+        if 'artist' in self.current_track:
+            embed.add_field(name="Исполнитель", value=self.current_track['artist'], inline=True)
+        
+        if 'source' in self.current_track:
+            if self.current_track['source'] == 'stream':
+                embed.add_field(name="Источник", value="📻 Радиостанция", inline=True)
+            elif self.current_track['source'] == 'spotify':
+                embed.add_field(name="Источник", value="Spotify", inline=True)
+            elif self.current_track['source'] == 'youtube':
+                embed.add_field(name="Источник", value="YouTube", inline=True)
+            elif self.current_track['source'] == 'soundcloud':
+                embed.add_field(name="Источник", value="SoundCloud", inline=True)
+        
+        if 'thumbnail' in self.current_track and self.current_track['thumbnail']:
+            embed.set_thumbnail(url=self.current_track['thumbnail'])
+        
+        # Добавление информации о следующих треках в очереди
+        if self.queue:
+            next_tracks = "\n".join([f"{i+1}. {track['title']}" for i, track in enumerate(self.queue[:3])])
+            if len(self.queue) > 3:
+                next_tracks += f"\n...и еще {len(self.queue) - 3} трек(ов)"
+            embed.add_field(name="В очереди:", value=next_tracks, inline=False)
+        
+        return embed
     
     def get_queue(self):
         """Получение текущей очереди воспроизведения"""
@@ -625,7 +836,7 @@ class LavalinkPlayer:
             'is_playing': self.is_playing,
             'is_paused': self.is_paused,
             'current_track': self.current_track,
-            'queue': self.queue,
+            'queue': self.queue.snapshot(),
             'connected': self.player is not None and self.player.is_connected() if self.player else False
         }
 
@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+import metrics
+from audio_cache import track_cache_key
+
+# ⚙️ НАСТРОЙКИ ВЫРАВНИВАНИЯ ГРОМКОСТИ - АНАЛИЗ ОДИН РАЗ, ДАЛЬШЕ ФИКСИРОВАННОЕ УСИЛЕНИЕ!!! ⚙️
+LOUDNESS_NORMALIZATION = os.getenv('LOUDNESS_NORMALIZATION', 'true').lower() == 'true'
+# Целевая интегральная громкость (LUFS)
+LOUDNESS_TARGET_LUFS = float(os.getenv('LOUDNESS_TARGET_LUFS', '-14'))
+# Максимальное усиление/ослабление (в дБ)
+LOUDNESS_MAX_GAIN_DB = float(os.getenv('LOUDNESS_MAX_GAIN_DB', '12'))
+# Усиление меньше этого значения не применяется - трек остается без перекодирования
+LOUDNESS_MIN_GAIN_DB = float(os.getenv('LOUDNESS_MIN_GAIN_DB', '1'))
+# Сколько треков анализировать одновременно
+LOUDNESS_ANALYSIS_CONCURRENCY = int(os.getenv('LOUDNESS_ANALYSIS_CONCURRENCY', '1'))
+# Путь к локальной базе SQLite с результатами анализа
+LOUDNESS_INDEX_PATH = os.getenv('LOUDNESS_INDEX_PATH', 'loudness.db')
+
+# Запас до 0 dBFS по истинному пику, чтобы усиление не вызывало клиппинг
+TRUE_PEAK_CEILING = -1.0
+_LOUDNORM_JSON_RE = re.compile(r'\{[^{}]*"input_i"[^{}]*\}')
+
+
+def compute_gain(integrated: float, true_peak: Optional[float] = None,
+                 target: float = LOUDNESS_TARGET_LUFS, max_gain: float = LOUDNESS_MAX_GAIN_DB) -> float:
+    """Фиксированное усиление, приводящее трек к целевой громкости
+
+    Args:
+        integrated: Интегральная громкость трека (LUFS)
+        true_peak: Истинный пик трека (dBTP), если известен
+        target: Целевая громкость (LUFS)
+        max_gain: Ограничение усиления по модулю (дБ)
+
+    Returns:
+        Усиление в дБ (отрицательное - ослабление)
+    """
+    gain = max(-max_gain, min(max_gain, target - integrated))
+    if true_peak is not None and gain > 0:
+        # Тихий трек с резкими пиками поднимаем только до потолка
+        gain = min(gain, max(0.0, TRUE_PEAK_CEILING - true_peak))
+    return gain
+
+
+def parse_loudnorm_output(stderr: str) -> Optional[Dict[str, float]]:
+    """Разбор JSON-отчета фильтра loudnorm из вывода FFmpeg
+
+    Returns:
+        Словарь integrated (LUFS) и true_peak (dBTP) или None
+    """
+    matches = _LOUDNORM_JSON_RE.findall(stderr)
+    if not matches:
+        return None
+    try:
+        report = json.loads(matches[-1])
+        integrated = float(report['input_i'])
+        true_peak = float(report['input_tp'])
+    except (ValueError, KeyError):
+        return None
+    # Тишина дает -inf, такой результат бесполезен
+    if integrated != integrated or integrated in (float('inf'), float('-inf')):
+        return None
+    return {'integrated': integrated, 'true_peak': true_peak}
+
+
+class LoudnessIndex:
+    """Постоянный индекс: ID видео YouTube -> измеренная громкость
+
+    База открывается при первом обращении, а запросы к ней выполняются в
+    отдельном потоке - цикл событий не ждет диск.
+    """
+
+    def __init__(self, path: str = LOUDNESS_INDEX_PATH):
+        """Инициализация индекса
+
+        Args:
+            path: Путь к файлу базы SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self) -> sqlite3.Connection:
+        """Соединение с базой (вызывается под блокировкой)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS loudness ('
+                'video_id TEXT PRIMARY KEY, '
+                'integrated REAL NOT NULL, '
+                'true_peak REAL, '
+                'measured_at REAL NOT NULL)'
+            )
+            self._conn.commit()
+        return self._conn
+
+    async def lookup(self, video_id: str) -> Optional[Dict[str, float]]:
+        """Результат анализа трека
+
+        Returns:
+            Словарь integrated и true_peak или None
+        """
+        try:
+            row = await asyncio.to_thread(self._lookup, video_id)
+        except sqlite3.Error as e:
+            print(f"Ошибка при чтении громкости трека {video_id}: {e}")
+            return None
+        if row is None:
+            return None
+        return {'integrated': row[0], 'true_peak': row[1]}
+
+    def _lookup(self, video_id: str) -> Optional[Tuple[float, Optional[float]]]:
+        with self._lock:
+            return self._db().execute(
+                'SELECT integrated, true_peak FROM loudness WHERE video_id = ?', (video_id,)
+            ).fetchone()
+
+    async def store(self, video_id: str, integrated: float, true_peak: Optional[float]) -> None:
+        """Сохранение результата анализа"""
+        try:
+            await asyncio.to_thread(self._store, video_id, integrated, true_peak)
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении громкости трека {video_id}: {e}")
+
+    def _store(self, video_id: str, integrated: float, true_peak: Optional[float]) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT OR REPLACE INTO loudness (video_id, integrated, true_peak, measured_at) '
+                'VALUES (?, ?, ?, ?)',
+                (video_id, integrated, true_peak, time.time())
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Количество проанализированных треков"""
+        with self._lock:
+            return {'size': self._db().execute('SELECT COUNT(*) FROM loudness').fetchone()[0]}
+
+
+class LoudnessAnalyzer:
+    """Фоновый анализ громкости треков через фильтр loudnorm FFmpeg
+
+    Трек анализируется один раз, после первого воспроизведения, в отдельном
+    процессе FFmpeg с ограничением параллельности. Результат сохраняется в
+    индексе и в поле loudness записи о треке (и вместе с ней в плейлистах),
+    поэтому при следующих воспроизведениях остается только применить
+    фиксированное усиление.
+    """
+
+    def __init__(self, index: LoudnessIndex, concurrency: int = LOUDNESS_ANALYSIS_CONCURRENCY):
+        """Инициализация анализатора
+
+        Args:
+            index: Индекс для результатов
+            concurrency: Максимум одновременных анализов
+        """
+        self.index = index
+        self.concurrency = max(1, concurrency)
+        self._slots = None
+        self._pending = set()
+
+        self.analyzed = metrics.counter('loudness_analyzed')
+        self.failures = metrics.counter('loudness_analysis_failures')
+        self.duration = metrics.latency('loudness_analysis_seconds')
+
+    async def gain_for(self, track_info: Dict[str, Any]) -> float:
+        """Усиление для трека (0, если анализа нет или усиление незначительно)
+
+        Найденная в индексе громкость сохраняется в записи о треке.
+
+        Returns:
+            Усиление в дБ
+        """
+        video_id = track_cache_key(track_info)
+        stored = await self.index.lookup(video_id) if video_id else None
+        if stored is not None:
+            track_info['loudness'] = stored['integrated']
+            gain = compute_gain(stored['integrated'], stored['true_peak'])
+        elif 'loudness' in track_info:
+            # Трек из плейлиста, проанализированный на другой машине
+            gain = compute_gain(track_info['loudness'])
+        else:
+            return 0.0
+        return gain if abs(gain) >= LOUDNESS_MIN_GAIN_DB else 0.0
+
+    def schedule(self, track_info: Dict[str, Any], source: str, before_options: str = '') -> None:
+        """Запуск анализа в фоне, если трек еще не анализировался
+
+        Должна вызываться из цикла событий.
+
+        Args:
+            track_info: Информация о треке (в нее будет записан результат)
+            source: Локальный файл или ссылка на поток
+            before_options: Параметры FFmpeg до -i (для сетевых потоков)
+        """
+        video_id = track_cache_key(track_info)
+        if video_id is None or video_id in self._pending or 'loudness' in track_info:
+            return
+        self._pending.add(video_id)
+        asyncio.get_running_loop().create_task(self._analyze(video_id, track_info, source, before_options))
+
+    async def _analyze(self, video_id: str, track_info: Dict[str, Any], source: str, before_options: str) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        try:
+            # Трек мог быть проанализирован раньше (индекс проверяется здесь, а не в schedule - не на цикле событий)
+            if await self.index.lookup(video_id) is not None:
+                return
+            async with self._slots:
+                started = time.perf_counter()
+                process = await asyncio.create_subprocess_exec(
+                    'ffmpeg', '-hide_banner', '-nostats', '-nostdin', *before_options.split(),
+                    '-i', source, '-vn', '-af', 'loudnorm=print_format=json', '-f', 'null', '-',
+                    stdout=asyncio.subprocess.DEVNULL,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                _, stderr = await process.communicate()
+                self.duration.observe(time.perf_counter() - started)
+
+            result = parse_loudnorm_output(stderr.decode('utf-8', 'replace'))
+            if result is None:
+                self.failures.inc()
+                return
+            await self.index.store(video_id, result['integrated'], result['true_peak'])
+            track_info['loudness'] = result['integrated']
+            self.analyzed.inc()
+        except Exception as e:
+            self.failures.inc()
+            print(f"Ошибка при анализе громкости трека {video_id}: {e}")
+        finally:
+            self._pending.discard(video_id)
+
+
+# 🔊 ОБЩИЙ АНАЛИЗАТОР ГРОМКОСТИ ДЛЯ ВСЕХ СЕРВЕРОВ!!! 🔊
+loudness_index = LoudnessIndex()
+loudness_analyzer = LoudnessAnalyzer(loudness_index)
@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import asyncio
+import threading
+import time
+from typing import Dict, Any, Optional, Tuple
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ ИНДЕКСА СОВПАДЕНИЙ SPOTIFY -> YOUTUBE - ИЩЕМ ОДИН РАЗ!!! ⚙️
+# Путь к локальной базе SQLite
+SPOTIFY_MATCH_INDEX_PATH = os.getenv('SPOTIFY_MATCH_INDEX_PATH', 'spotify_matches.db')
+
+
+def youtube_watch_url(video_id: str) -> str:
+    """Ссылка на страницу видео YouTube по его ID"""
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+class SpotifyMatchIndex:
+    """Постоянный индекс: ID трека Spotify и ISRC -> выбранное видео YouTube
+
+    Одна и та же запись (ISRC) часто встречается в разных релизах Spotify
+    под разными ID, поэтому при промахе по ID индекс проверяет ISRC.
+    """
+
+    def __init__(self, path: str = SPOTIFY_MATCH_INDEX_PATH):
+        """Инициализация индекса (база открывается лениво при первом обращении)
+
+        Args:
+            path: Путь к файлу базы SQLite
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+        self.hits = metrics.counter('spotify_match_index_hits')
+        self.misses = metrics.counter('spotify_match_index_misses')
+        self.invalidated = metrics.counter('spotify_match_index_invalidated')
+
+    def _db(self) -> sqlite3.Connection:
+        """Соединение с базой (вызывается под блокировкой)"""
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS matches ('
+                'spotify_id TEXT PRIMARY KEY, '
+                'isrc TEXT, '
+                'video_id TEXT NOT NULL, '
+                'duration REAL, '
+                'updated_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS matches_isrc ON matches (isrc)')
+            self._conn.commit()
+        return self._conn
+
+    async def lookup(self, spotify_id: Optional[str], isrc: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Поиск сохраненного совпадения (запрос к базе - в отдельном потоке)
+
+        Args:
+            spotify_id: ID трека Spotify
+            isrc: Международный код записи (ISRC), если известен
+
+        Returns:
+            Словарь с video_id и duration или None
+        """
+        if not spotify_id and not isrc:
+            return None
+        try:
+            row = await asyncio.to_thread(self._lookup, spotify_id, isrc)
+        except sqlite3.Error as e:
+            print(f"Ошибка при поиске совпадения Spotify {spotify_id}: {e}")
+            row = None
+
+        if row is None:
+            self.misses.inc()
+            return None
+
+        self.hits.inc()
+        return {'video_id': row[0], 'duration': row[1]}
+
+    def _lookup(self, spotify_id: Optional[str], isrc: Optional[str]) -> Optional[Tuple[str, Optional[float]]]:
+        row = None
+        with self._lock:
+            conn = self._db()
+            if spotify_id:
+                row = conn.execute(
+                    'SELECT video_id, duration FROM matches WHERE spotify_id = ?',
+                    (spotify_id,)
+                ).fetchone()
+            if row is None and isrc:
+                row = conn.execute(
+                    'SELECT video_id, duration FROM matches WHERE isrc = ? ORDER BY updated_at DESC LIMIT 1',
+                    (isrc,)
+                ).fetchone()
+        return row
+
+    async def store(self, spotify_id: Optional[str], isrc: Optional[str], video_id: Optional[str],
+                    duration: Optional[float] = None) -> None:
+        """Сохранение совпадения (запись в базу - в отдельном потоке)
+
+        Args:
+            spotify_id: ID трека Spotify
+            isrc: Международный код записи (ISRC)
+            video_id: ID выбранного видео YouTube
+            duration: Длительность видео (в секундах)
+        """
+        if not spotify_id or not video_id:
+            return
+        try:
+            await asyncio.to_thread(self._store, spotify_id, isrc, video_id, duration)
+        except sqlite3.Error as e:
+            print(f"Ошибка при сохранении совпадения Spotify {spotify_id}: {e}")
+
+    def _store(self, spotify_id: str, isrc: Optional[str], video_id: str, duration: Optional[float]) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute(
+                'INSERT OR REPLACE INTO matches (spotify_id, isrc, video_id, duration, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (spotify_id, isrc, video_id, duration, time.time())
+            )
+            conn.commit()
+
+    async def invalidate(self, spotify_id: Optional[str], isrc: Optional[str] = None) -> None:
+        """Удаление совпадения (например, если видео стало недоступно)
+
+        Удаляются и записи с тем же ISRC - иначе следующий поиск по ISRC
+        вернул бы то же недоступное видео.
+
+        Args:
+            spotify_id: ID трека Spotify
+            isrc: Международный код записи (ISRC), если известен
+        """
+        if not spotify_id and not isrc:
+            return
+        try:
+            await asyncio.to_thread(self._invalidate, spotify_id, isrc)
+            self.invalidated.inc()
+        except sqlite3.Error as e:
+            print(f"Ошибка при удалении совпадения Spotify {spotify_id}: {e}")
+
+    def _invalidate(self, spotify_id: Optional[str], isrc: Optional[str]) -> None:
+        with self._lock:
+            conn = self._db()
+            conn.execute('DELETE FROM matches WHERE spotify_id = ? OR isrc = ?', (spotify_id, isrc))
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика индекса
+
+        Returns:
+            Словарь с количеством записей, попаданий, промахов и удаленных совпадений
+        """
+        with self._lock:
+            size = self._db().execute('SELECT COUNT(*) FROM matches').fetchone()[0]
+        return {
+            'size': size,
+            'hits': self.hits.value,
+            'misses': self.misses.value,
+            'invalidated': self.invalidated.value
+        }
+
+# 🗂️ ОБЩИЙ ИНДЕКС ДЛЯ ВСЕХ СЕРВЕРОВ И ОБОИХ ПЛЕЕРОВ!!! 🗂️
+match_index = SpotifyMatchIndex()
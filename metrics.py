@@ -0,0 +1,201 @@
+import os
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, Union
+
+# Сколько последних измерений хранит гистограмма
+HISTOGRAM_WINDOW = int(os.getenv('HISTOGRAM_WINDOW', '200'))
+
+
+class Counter:
+    """Монотонно растущий счетчик"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        """Увеличивает счетчик
+
+        Args:
+            amount: На сколько увеличить
+        """
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> int:
+        return self.value
+
+
+class Gauge:
+    """Текущее значение величины (глубина очереди, число активных задач и т.д.)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value: Union[int, float]) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: Union[int, float] = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: Union[int, float] = 1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def snapshot(self) -> Union[int, float]:
+        return self.value
+
+
+class LatencyStat:
+    """Статистика длительностей (последнее, среднее, максимум) в секундах"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.last = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Добавляет измерение
+
+        Args:
+            seconds: Длительность в секундах
+        """
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.last = seconds
+            self.max = max(self.max, seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'count': self.count,
+                'last': self.last,
+                'avg': self.total / self.count if self.count else 0.0,
+                'max': self.max
+            }
+
+
+class Histogram:
+    """Скользящее окно последних измерений с процентилями (p50/p95/p99)"""
+
+    def __init__(self, name: str, window: int = HISTOGRAM_WINDOW):
+        self.name = name
+        self.count = 0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Добавляет измерение (самое старое вытесняется из окна)
+
+        Args:
+            seconds: Длительность в секундах
+        """
+        with self._lock:
+            self.count += 1
+            self._samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self.count
+
+        if not samples:
+            return {'count': count, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+
+        def percentile(p: float) -> float:
+            # Метод ближайшего ранга
+            return samples[min(len(samples) - 1, max(0, math.ceil(p * len(samples)) - 1))]
+
+        return {
+            'count': count,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': samples[-1]
+        }
+
+
+# 📊 ОБЩИЙ РЕЕСТР МЕТРИК - ВСЕ ЦИФРЫ В ОДНОМ МЕСТЕ!!! 📊
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(name: str, cls):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name: str) -> Counter:
+    """Возвращает счетчик с указанным именем, создавая его при необходимости"""
+    return _get_or_create(name, Counter)
+
+
+def gauge(name: str) -> Gauge:
+    """Возвращает показатель с указанным именем, создавая его при необходимости"""
+    return _get_or_create(name, Gauge)
+
+
+def snapshot() -> Dict[str, Any]:
+    """Текущие значения всех метрик
+
+    Returns:
+        Словарь имя метрики -> значение
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def latency(name: str) -> LatencyStat:
+    """Возвращает статистику длительностей с указанным именем, создавая ее при необходимости"""
+    return _get_or_create(name, LatencyStat)
+
+
+def histogram(name: str) -> Histogram:
+    """Возвращает гистограмму с указанным именем, создавая ее при необходимости"""
+    return _get_or_create(name, Histogram)
+
+
+def snapshot_prefix(prefix: str) -> Dict[str, Any]:
+    """Текущие значения метрик, имена которых начинаются с префикса
+
+    Args:
+        prefix: Префикс имени
+
+    Returns:
+        Словарь имя метрики -> значение
+    """
+    with _registry_lock:
+        metrics = [metric for name, metric in _registry.items() if name.startswith(prefix)]
+    return {metric.name: metric.snapshot() for metric in metrics}
+
+
+def remove_prefix(prefix: str) -> int:
+    """Удаляет из реестра метрики, имена которых начинаются с префикса
+
+    Args:
+        prefix: Префикс имени
+
+    Returns:
+        Количество удаленных метрик
+    """
+    with _registry_lock:
+        names = [name for name in _registry if name.startswith(prefix)]
+        for name in names:
+            del _registry[name]
+    return len(names)
@@ -1,18 +1,32 @@
 import asyncio
+import math
+import time
 import discord
-import yt_dlp
 import os
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 from dotenv import load_dotenv
+from track_cache import resolver_cache, resolve_flights, normalize_query
+from extraction_pool import ExtractionPool
+from track_queue import TrackQueue
+from track_record import TrackRecord
+from prefetcher import QueuePrefetcher, PREFETCH_REFRESH_MARGIN
+from audio_sources import GaplessSource, DSPSource, create_opus_source
+from radio_hub import radio_hub, RADIO_BROADCAST_ENABLED
+from icy_ingest import RADIO_ICY_METADATA, create_icy_source
+from audio_cache import audio_cache, AUDIO_CACHE_ENABLED
+from loudness import loudness_analyzer, LOUDNESS_NORMALIZATION
+from station_health import station_health
+from stream_breaker import stream_breakers, backoff_delay, STREAM_MIN_HEALTHY_SECONDS
+from spotify_client import spotify_client
+from spotify_import import parse_spotify_url, spotify_track_to_info, import_spotify_collection
+from match_index import match_index, youtube_watch_url
+from transition_timing import TransitionSpan, forget_guild as forget_transition_stats, get_transition_stats
+from now_playing import NowPlayingMessage
+from idle_manager import human_listeners
+import metrics
 
 # 🔑 ЗАГРУЗКА ПЕРЕМЕННЫХ ОКРУЖЕНИЯ - КРИТИЧЕСКИ ВАЖНО!!! 🔑
 load_dotenv()
 
-# 🎵 НАСТРОЙКА SPOTIFY API - ДЛЯ РАБОТЫ С ПЛЕЙЛИСТАМИ SPOTIFY!!! 🎵
-SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
-SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
-
 # 📻 НАСТРОЙКИ РАДИО ИЗ .ENV - МОЖНО ПЕРЕОПРЕДЕЛИТЬ, НО НЕ РЕКОМЕНДУЕТСЯ!!! 📻
 RADIO_STREAM_URL = os.getenv('RADIO_STREAM_URL', 'https://rusradio.hostingradio.ru/rusradio96.aacp')
 RADIO_NAME = os.getenv('RADIO_NAME', 'Русское Радио')
@@ -20,7 +34,7 @@ RADIO_THUMBNAIL = os.getenv('RADIO_THUMBNAIL', 'https://rusradio.ru/design/image
 
 # ⚙️ НАСТРОЙКИ ДЛЯ YT-DLP - НЕ ТРОГАЙ, ЕСЛИ НЕ ХОЧЕШЬ ПОЛОМАТЬ!!! ⚙️
 YTDL_OPTIONS = {
-    'format': 'bestaudio/best',  # 🎧 САМОЕ ЛУЧШЕЕ КАЧЕСТВО ЗВУКА!!! 🎧
+    'format': 'bestaudio[acodec=opus]/bestaudio/best',  # 🎧 САМОЕ ЛУЧШЕЕ КАЧЕСТВО ЗВУКА, OPUS В ПРИОРИТЕТЕ!!! 🎧
     'extractaudio': True,       # 🔈 ИЗВЛЕКАЕМ ТОЛЬКО АУДИО!!! 🔈
     'audioformat': 'mp3',       # 🎵 ФОРМАТ MP3 - САМЫЙ СОВМЕСТИМЫЙ!!! 🎵
     'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',  # 📝 ШАБЛОН ИМЕНИ ФАЙЛА!!! 📝
@@ -41,6 +55,34 @@ FFMPEG_OPTIONS = {
     'options': '-vn',  # 📺 УДАЛЯЕМ ВИДЕОПОТОК - НАМ НУЖЕН ТОЛЬКО ЗВУК!!! 📺
 }
 
+# 🚀 OPUS БЕЗ ПЕРЕКОДИРОВАНИЯ В PYTHON - ГРОМКОСТЬ ВШИВАЕТСЯ В FFMPEG!!! 🚀
+OPUS_PASSTHROUGH = os.getenv('OPUS_PASSTHROUGH', 'true').lower() == 'true'
+OPUS_BITRATE = int(os.getenv('OPUS_BITRATE', '128'))
+
+# 🎚️ БЕСШОВНЫЕ ПЕРЕХОДЫ - СЛЕДУЮЩИЙ FFMPEG ЗАПУСКАЕТСЯ ЗАРАНЕЕ!!! 🎚️
+GAPLESS_ENABLED = os.getenv('GAPLESS_ENABLED', 'false').lower() == 'true'
+GAPLESS_PREWARM_SECONDS = float(os.getenv('GAPLESS_PREWARM_SECONDS', '5'))
+
+# 🌊 ПЕРЕКРЕСТНОЕ ЗАТУХАНИЕ - КОНЕЦ ТРЕКА СМЕШИВАЕТСЯ С НАЧАЛОМ СЛЕДУЮЩЕГО (0 - ВЫКЛЮЧЕНО)!!! 🌊
+# Смешивать можно только PCM, поэтому при включенном переходе треки играют через PCM
+CROSSFADE_SECONDS = float(os.getenv('CROSSFADE_SECONDS', '0'))
+
+# 📊 ЗАДЕРЖКА МЕЖДУ КОНЦОМ ТРЕКА И ПЕРВЫМ КАДРОМ СЛЕДУЮЩЕГО!!! 📊
+TRANSITION_LATENCY = metrics.latency('track_transition_seconds')
+# ⏩ ЗАДЕРЖКА ДО ЗВУКА ПОСЛЕ ВОССТАНОВЛЕНИЯ С ТОЙ ЖЕ ПОЗИЦИИ И ПОСЛЕ ПЕРЕМОТКИ!!! ⏩
+RESUME_LATENCY = metrics.latency('playback_resume_seconds')
+SEEK_LATENCY = metrics.latency('playback_seek_seconds')
+# 👂 ЗАДЕРЖКА ДО ЗВУКА, КОГДА В ПУСТОЙ КАНАЛ ВЕРНУЛСЯ СЛУШАТЕЛЬ!!! 👂
+LISTENER_RESUME_LATENCY = metrics.latency('listener_resume_seconds')
+SUSPENDED_STREAMS = metrics.counter('listener_suspended_streams')
+
+# ✂️ ТРЕК, ЗАКОНЧИВШИЙСЯ РАНЬШЕ СВОЕЙ ДЛИТЕЛЬНОСТИ БОЛЬШЕ ЧЕМ НА СТОЛЬКО СЕКУНД, - ОБРЫВ СЕТИ!!! ✂️
+PREMATURE_END_MARGIN = float(os.getenv('PREMATURE_END_MARGIN', '10'))
+MAX_PREMATURE_RESUMES = 3
+
+# 🏊 ОБЩИЙ ПУЛ ИЗВЛЕЧЕНИЯ ДЛЯ ВСЕХ СЕРВЕРОВ - НЕ ЗАБИВАЕМ ПУЛ ПО УМОЛЧАНИЮ!!! 🏊
+EXTRACTION_POOL = ExtractionPool(YTDL_OPTIONS)
+
 class MusicPlayer:
     def __init__(self, bot, guild_id):
         self.bot = bot
@@ -49,23 +91,34 @@ class MusicPlayer:
         self.text_channel_id = None
         self.voice_client = None
         self.current_track = None
-        self.queue = []
-        self.ytdl = yt_dlp.YoutubeDL(YTDL_OPTIONS)
+        self.queue = TrackQueue()  # 📜 ОЧЕРЕДЬ С ПЕРЕХОДОМ К СЛЕДУЮЩЕМУ ТРЕКУ ЗА O(1)!!! 📜
         self.is_playing = False
         self.reconnect_attempts = 0
         self.max_reconnect_attempts = 5
         self.is_paused = False
         self.skip_votes = set()  # 🗳️ МНОЖЕСТВО ID ПОЛЬЗОВАТЕЛЕЙ, ПРОГОЛОСОВАВШИХ ЗА ПРОПУСК!!! 🗳️
         self.votes_required = 3  # 🔢 КОЛИЧЕСТВО ГОЛОСОВ, НЕОБХОДИМОЕ ДЛЯ ПРОПУСКА!!! ДЕМОКРАТИЯ!!! 🔢
+        self.prefetcher = QueuePrefetcher(self)  # ⏩ ДЕРЖИТ СЛЕДУЮЩИЕ ТРЕКИ ГОТОВЫМИ!!! ⏩
+        self.source = None  # 🎚️ ТЕКУЩИЙ ИСТОЧНИК (ОБЕРТКА С ПОЗИЦИЕЙ И БЕСШОВНЫМ ПЕРЕХОДОМ)!!! 🎚️
+        self._transition_span = None  # ⏱️ ОТМЕТКИ ТЕКУЩЕГО ПЕРЕХОДА МЕЖДУ ТРЕКАМИ!!! ⏱️
+        self._resume_position = 0.0  # ⏩ С КАКОГО МЕСТА ПРОДОЛЖИТЬ ТРЕК ПОСЛЕ СБОЯ!!! ⏩
+        self._pending_resume = None  # ⏱️ (МЕТРИКА, ВРЕМЯ НАЧАЛА) ДЛЯ ЗАДЕРЖКИ ДО ЗВУКА ПОСЛЕ СБОЯ/ПЕРЕМОТКИ!!! ⏱️
+        self._premature_ends = (None, 0)  # ✂️ (ТРЕК, СКОЛЬКО РАЗ ОН ОБРЫВАЛСЯ РАНЬШЕ КОНЦА)!!! ✂️
+        self._user_stop = False  # ✋ ТЕКУЩИЙ ИСТОЧНИК ОСТАНОВЛЕН ПОЛЬЗОВАТЕЛЕМ (ПРОПУСК/СТОП), А НЕ СБОЕМ!!! ✋
+        self._suspended = None  # 💤 (ТРЕК, ПОЗИЦИЯ), ПОКА ПОТОК ЗАКРЫТ ИЗ-ЗА ПУСТОГО КАНАЛА!!! 💤
+        # 📌 ОДНО СООБЩЕНИЕ "СЕЙЧАС ИГРАЕТ", КОТОРОЕ РЕДАКТИРУЕТСЯ, А НЕ ПЕРЕСОЗДАЕТСЯ!!! 📌
+        self.now_playing = NowPlayingMessage(
+            bot,
+            lambda: self.text_channel_id,
+            self._build_now_playing_embed,
+            lambda: MusicControlView(self)
+        )
+        self.volume = 100  # 🔊 ГРОМКОСТЬ В ПРОЦЕНТАХ (100 = БЕЗ ИЗМЕНЕНИЙ, МОЖНО OPUS БЕЗ ПЕРЕКОДИРОВАНИЯ)!!! 🔊
+        self._live_volume_track = None  # 🎚️ ТРЕК, ДОИГРЫВАЮЩИЙ ЧЕРЕЗ PCM ПОСЛЕ СМЕНЫ ГРОМКОСТИ НА ХОДУ!!! 🎚️
         
         # 🎵 НАСТРОЙКА SPOTIFY КЛИЕНТА - ДЛЯ ВОСПРОИЗВЕДЕНИЯ С SPOTIFY!!! 🎵
-        if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
-            self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-                client_id=SPOTIFY_CLIENT_ID,
-                client_secret=SPOTIFY_CLIENT_SECRET
-            ))
-        else:
-            self.sp = None
+        # Общий асинхронный клиент: один пул соединений и один токен на весь бот
+        self.sp = spotify_client if spotify_client.configured else None
     
     async def connect(self):
         """🔌 ПОДКЛЮЧЕНИЕ К ГОЛОСОВОМУ КАНАЛУ - ПЕРВЫЙ ШАГ К ИДЕАЛЬНОЙ МУЗЫКЕ!!! 🔌"""
@@ -101,42 +154,195 @@ class MusicPlayer:
             await self.voice_client.disconnect()
             self.voice_client = None
     
+    async def cleanup(self):
+        """🧹 ПОЛНОЕ ОСВОБОЖДЕНИЕ РЕСУРСОВ ПЛЕЕРА - FFMPEG, ГОЛОСОВОЕ СОЕДИНЕНИЕ, ОЧЕРЕДЬ!!! 🧹
+        
+        После вызова плеер больше не используется.
+        
+        Returns:
+            Количество освобожденных треков (очередь и текущий)
+        """
+        # Сначала отвязываем источник - остановка не запустит следующий трек или радио
+        source, self.source = self.source, None
+        self.now_playing.close()
+        await self.prefetcher.stop()
+        
+        if self.voice_client and (self.voice_client.is_playing() or self.voice_client.is_paused()):
+            self.voice_client.stop()
+        if source is not None:
+            # Убиваем FFmpeg сразу (kill + wait блокирует, поэтому не в цикле событий)
+            await asyncio.to_thread(source.cleanup)
+        await self.disconnect()
+        self.voice_client = None
+        
+        released = len(self.queue) + (1 if self.current_track else 0)
+        self.queue.clear()
+        self.current_track = None
+        self.is_playing = False
+        self.is_paused = False
+        self.skip_votes.clear()
+        self._transition_span = None
+        self._pending_resume = None
+        self._premature_ends = (None, 0)
+        self._suspended = None
+        
+        # Лимитер извлечений сервера создастся заново, если сервер вернется
+        EXTRACTION_POOL.forget_guild(self.guild_id)
+        # Гистограммы переходов сервера не должны копиться в общем реестре метрик
+        forget_transition_stats(self.guild_id)
+        return released
+    
+    @property
+    def suspended(self):
+        """Поток закрыт, потому что в канале нет слушателей"""
+        return self._suspended is not None
+    
+    async def suspend_stream(self):
+        """💤 В КАНАЛЕ НИКОГО - ЗАКРЫВАЕМ FFMPEG И ПОТОК, НО ОСТАЕМСЯ В КАНАЛЕ!!! 💤
+        
+        Голосовое соединение и очередь сохраняются, позиция трека
+        запоминается для resume_stream.
+        
+        Returns:
+            True, если поток был закрыт
+        """
+        source = self.source
+        if self._suspended is not None or source is None or not self.voice_client:
+            return False
+        
+        # Подготовленный для бесшовного перехода трек возвращается в очередь
+        prepared_track = source.take_next()
+        if prepared_track:
+            self.queue.insert(0, prepared_track)
+        self._suspended = (self.current_track, source.position)
+        
+        # Отвязываем источник - остановка не запустит следующий трек или радио
+        self.source = None
+        if self.voice_client.is_playing() or self.voice_client.is_paused():
+            self.voice_client.stop()
+        await asyncio.to_thread(source.cleanup)
+        # Ссылки в очереди все равно протухнут, пока никто не слушает
+        await self.prefetcher.stop()
+        SUSPENDED_STREAMS.inc()
+        return True
+    
+    async def resume_stream(self):
+        """▶️ СЛУШАТЕЛЬ ВЕРНУЛСЯ - РАДИО С ПРЯМОГО ЭФИРА, ТРЕК С ТОЙ ЖЕ ПОЗИЦИИ!!! ▶️
+        
+        Поставленное пользователем на паузу не продолжается - это сделает его команда resume.
+        
+        Returns:
+            True, если воспроизведение возобновлено
+        """
+        if self._suspended is None or self.is_paused:
+            return False
+        track, position = self._suspended
+        self._suspended = None
+        self.is_playing = False
+        self.prefetcher.start()
+        self._pending_resume = (LISTENER_RESUME_LATENCY, time.perf_counter())
+        
+        if track is None:
+            return await self.play_default_radio()
+        if track.get('source') == 'stream':
+            # Новое подключение к станции - сразу прямой эфир, а не то, что играло при уходе
+            return await self.play_radio(track['url'], track['title'], track['thumbnail'])
+        return await self.play_track(track, start_at=position)
+    
     async def play_default_radio(self):
         """📻 ВОСПРОИЗВЕДЕНИЕ РАДИО ПО УМОЛЧАНИЮ - ЛУЧШАЯ МУЗЫКА БЕЗ ПРОБЛЕМ!!! 📻"""
+        return await self.play_radio(RADIO_STREAM_URL, RADIO_NAME, RADIO_THUMBNAIL)
+    
+    async def play_radio(self, url=None, name=None, thumbnail=None):
+        """📻 ВОСПРОИЗВЕДЕНИЕ РАДИОСТАНЦИИ (ПО УМОЛЧАНИЮ - ТЕКУЩАЯ СТАНЦИЯ БОТА)!!! 📻"""
+        if url is None:
+            url = self.bot.current_radio['url']
+            name = self.bot.current_radio['name']
+            thumbnail = self.bot.current_radio['thumbnail']
+        
         if not self.voice_client or not self.voice_client.is_connected():
             success = await self.connect()
             if not success:
                 return False
         
-        try:
-            self.current_track = {
-                'title': RADIO_NAME,
-                'url': RADIO_STREAM_URL,
-                'thumbnail': RADIO_THUMBNAIL,
-                'source': 'stream'
-            }
+        self._mark_transition('callback')
+        
+        stations = self.bot.available_radios.values()
+        for attempt in range(self.max_reconnect_attempts):
+            # 🩺 САМОЕ ЗДОРОВОЕ ЗЕРКАЛО СТАНЦИИ ПО РЕЗУЛЬТАТАМ ФОНОВЫХ ПРОВЕРОК!!! 🩺
+            url = station_health.best_url(url, stations, allowed=stream_breakers.available)
             
-            # 🗑️ СБРАСЫВАЕМ ГОЛОСА ПРИ ВОЗВРАТЕ К РАДИО!!! 🗑️
-            self.skip_votes.clear()
+            # ⚡ СТАНЦИЯ ЛЕЖИТ (АВТОМАТ РАЗОМКНУТ) - СРАЗУ ПЕРЕКЛЮЧАЕМСЯ НА РЕЗЕРВНУЮ!!! ⚡
+            if not stream_breakers.allow(url):
+                fallback = stream_breakers.pick_fallback(url, station_health.rank_stations(stations))
+                if not fallback:
+                    print("❌ ВСЕ РАДИОСТАНЦИИ НЕДОСТУПНЫ!!! ПОПРОБУЕМ ПОЗЖЕ!!! ❌")
+                    return False
+                print(f"🔀 СТАНЦИЯ {name} НЕДОСТУПНА - ПЕРЕКЛЮЧАЕМСЯ НА {fallback['name']}!!! 🔀")
+                url, name, thumbnail = fallback['url'], fallback['name'], fallback['thumbnail']
             
-            source = discord.FFmpegPCMAudio(RADIO_STREAM_URL, **FFMPEG_OPTIONS)
-            self.voice_client.play(source, after=self._play_next_or_radio)
-            self.is_playing = True
-            self.is_paused = False
+            # ⏳ ПОСЛЕ СБОЕВ ЖДЕМ С ЭКСПОНЕНЦИАЛЬНОЙ ЗАДЕРЖКОЙ - НЕ ДОЛБИМ СЕРВЕР СТАНЦИИ!!! ⏳
+            delay = stream_breakers.retry_delay(url)
+            if delay:
+                await asyncio.sleep(delay)
+                # Пока ждали, могли запустить трек из очереди
+                if self.is_playing:
+                    return True
             
-            # 📨 ОТПРАВКА ИНФОРМАЦИИ О ТЕКУЩЕМ ТРЕКЕ!!! 📨
-            await self.send_now_playing_embed()
-            return True
-        except Exception as e:
-            print(f"❌ ОШИБКА ПРИ ВОСПРОИЗВЕДЕНИИ РАДИО: {e}!!! НЕ ПАНИКУЙ, СЕЙЧАС ПОЧИНИМ!!! ❌")
-            self.reconnect_attempts += 1
-            if self.reconnect_attempts < self.max_reconnect_attempts:
-                await asyncio.sleep(2)
-                return await self.play_default_radio()
-            return False
+            try:
+                if self.voice_client.is_playing():
+                    # Останавливаем текущий источник без перехода к следующему треку
+                    self.source = None
+                    self.voice_client.stop()
+                
+                track = TrackRecord(
+                    title=name,
+                    url=url,
+                    thumbnail=thumbnail,
+                    source='stream'
+                )
+                self.current_track = track
+                on_title = lambda title, track=track: self._on_stream_title(track, title)
+                
+                # 🗑️ СБРАСЫВАЕМ ГОЛОСА ПРИ ВОЗВРАТЕ К РАДИО!!! 🗑️
+                self.skip_votes.clear()
+                
+                # 📡 ОДНА ТРАНСЛЯЦИЯ НА СТАНЦИЮ И ГРОМКОСТЬ ДЛЯ ВСЕХ СЕРВЕРОВ!!! 📡
+                if RADIO_BROADCAST_ENABLED and OPUS_PASSTHROUGH:
+                    audio_source = radio_hub.subscribe(
+                        url,
+                        FFMPEG_OPTIONS['before_options'],
+                        FFMPEG_OPTIONS['options'],
+                        OPUS_BITRATE,
+                        on_title=on_title,
+                        volume_filter=self._volume_filter()
+                    )
+                else:
+                    audio_source = self._create_radio_source(url, on_title)
+                self._mark_transition('spawn')
+                
+                source = self._start_source(audio_source, track)
+                self.is_playing = True
+                self.is_paused = False
+                self.bot.loop.call_later(STREAM_MIN_HEALTHY_SECONDS, self._check_stream_health, source)
+                
+                # 📨 ОТПРАВКА ИНФОРМАЦИИ О ТЕКУЩЕМ ТРЕКЕ!!! 📨
+                await self.send_now_playing_embed()
+                return True
+            except Exception as e:
+                print(f"❌ ОШИБКА ПРИ ВОСПРОИЗВЕДЕНИИ РАДИО: {e}!!! НЕ ПАНИКУЙ, СЕЙЧАС ПОЧИНИМ!!! ❌")
+                stream_breakers.record_failure(url)
+        
+        return False
     
     def _play_next_or_radio(self, error=None):
         """🔄 CALLBACK ДЛЯ ВОСПРОИЗВЕДЕНИЯ СЛЕДУЮЩЕГО ТРЕКА ИЛИ ВОЗВРАТА К РАДИО!!! 🔄"""
+        # Подготовленный для бесшовного перехода трек не успел заиграть (например, пропуск) - возвращаем в очередь
+        if self.source:
+            prepared_track = self.source.take_next()
+            if prepared_track:
+                self.queue.insert(0, prepared_track)
+        
         if error:
             print(f"⚠️ ОШИБКА ВОСПРОИЗВЕДЕНИЯ: {error}!!! НО МЫ НЕ СДАЕМСЯ!!! ⚠️")
             self.reconnect_attempts += 1
@@ -149,63 +355,399 @@ class MusicPlayer:
             return
         
         self.is_playing = False
+        self._transition_span = TransitionSpan(self.guild_id)
         
         if self.queue:
             # Воспроизведение следующего трека из очереди
-            next_track = self.queue.pop(0)
+            next_track = self.queue.popleft()
             asyncio.run_coroutine_threadsafe(self.play_track(next_track), self.bot.loop)
         else:
             # Возврат к радио по умолчанию
             asyncio.run_coroutine_threadsafe(self.play_default_radio(), self.bot.loop)
     
     async def _handle_playback_error(self):
-        """Обработка ошибок воспроизведения"""
+        """Обработка ошибок воспроизведения (с экспоненциальной задержкой между попытками)"""
         try:
-            # Переподключение к голосовому каналу
-            await self.disconnect()
-            await asyncio.sleep(2)
-            success = await self.connect()
+            await asyncio.sleep(backoff_delay(self.reconnect_attempts - 1))
+            
+            # Ошибка FFmpeg не рвет голосовое соединение - переподключаемся, только если оно потеряно
+            success = True
+            if not self.voice_client or not self.voice_client.is_connected():
+                await self.disconnect()
+                success = await self.connect()
             
             if success:
-                # Повторная попытка воспроизведения
+                # Повторная попытка воспроизведения (радио - через автомат станции и резервные станции)
                 if self.current_track:
                     if self.current_track['source'] == 'stream':
-                        await self.play_default_radio()
+                        await self.play_radio(
+                            self.current_track['url'],
+                            self.current_track['title'],
+                            self.current_track['thumbnail']
+                        )
                     else:
-                        await self.play_track(self.current_track)
+                        # ⏩ ПРОДОЛЖАЕМ С МЕСТА СБОЯ, А НЕ С НАЧАЛА!!! ⏩
+                        start_at, self._resume_position = self._resume_position, 0.0
+                        await self.play_track(self.current_track, start_at=start_at)
                 else:
                     await self.play_default_radio()
         except Exception as e:
             print(f"Ошибка при обработке ошибки воспроизведения: {e}")
     
-    async def play_track(self, track_info):
-        """Воспроизведение трека"""
+    async def play_track(self, track_info, start_at=0.0):
+        """Воспроизведение трека (start_at - позиция в секундах, с которой начать)"""
         if not self.voice_client or not self.voice_client.is_connected():
             success = await self.connect()
             if not success:
                 return False
         
+        self._mark_transition('callback')
+        
         try:
+            # Ссылка могла протухнуть, пока трек ждал в очереди
+            if await self._needs_prefetch(track_info, margin=0):
+                await self._prefetch_entry(track_info)
+            self._mark_transition('resolve')
+            
+            resumed = start_at > 0 and track_info is self.current_track
             self.current_track = track_info
             
-            if self.voice_client.is_playing():
+            if self.voice_client.is_playing() or self.voice_client.is_paused():
+                # Останавливаем текущий источник без перехода к следующему треку
+                self.source = None
                 self.voice_client.stop()
             
             # Сбрасываем голоса при смене трека
-            self.skip_votes.clear()
+            if not resumed:
+                self.skip_votes.clear()
             
-            source = discord.FFmpegPCMAudio(track_info['url'], **FFMPEG_OPTIONS)
-            self.voice_client.play(source, after=self._play_next_or_radio)
+            audio_source = await self._create_track_source(track_info, start_at)
+            self._mark_transition('spawn')
+            source = self._start_source(audio_source, track_info, start_at)
             self.is_playing = True
             self.is_paused = False
+            if not resumed:
+                await self._on_track_started(track_info)
             
-            # Отправка информации о текущем треке
-            await self.send_now_playing_embed()
+            # Очередь сдвинулась - готовим следующие треки
+            self.prefetcher.wake()
+            if GAPLESS_ENABLED or CROSSFADE_SECONDS > 0:
+                self.bot.loop.create_task(self._gapless_prewarm_loop(source))
+            
+            # Отправка информации о текущем треке (при продолжении того же трека она уже в чате)
+            if not resumed:
+                await self.send_now_playing_embed()
             return True
         except Exception as e:
             print(f"Ошибка при воспроизведении трека: {e}")
             return False
     
+    @property
+    def position(self):
+        """Позиция воспроизведения текущего трека (в секундах, по отправленным кадрам)"""
+        if self._suspended is not None:
+            return self._suspended[1]
+        return self.source.position if self.source else 0.0
+    
+    async def seek(self, position):
+        """Перемотка текущего трека
+        
+        FFmpeg перезапускается с -ss перед -i: для сетевого потока это запрос
+        диапазона байтов с нужного места, а не декодирование от начала.
+        
+        Returns:
+            float | None: Позиция после ограничения длительностью трека или None, если перемотать нечего
+        """
+        track = self._suspended[0] if self._suspended is not None else self.current_track
+        if not track or track.get('source') == 'stream' or not self.voice_client:
+            return None
+        
+        position = max(0.0, float(position))
+        duration = track.get('duration')
+        if duration:
+            position = min(position, max(0.0, duration - 1))
+        
+        if self._suspended is not None:
+            # Поток закрыт - трек продолжится с новой позиции, когда придут слушатели
+            self._suspended = (track, position)
+            return position
+        
+        self._pending_resume = (SEEK_LATENCY, time.perf_counter())
+        return position if await self.play_track(track, start_at=position) else None
+    
+    async def _on_track_started(self, track_info):
+        """Фоновые задачи после старта трека: учет для локального кеша и анализ громкости"""
+        # 💾 ЧАСТО ИГРАЮЩИЕ ТРЕКИ СКАЧИВАЮТСЯ В ЛОКАЛЬНЫЙ КЕШ!!! 💾
+        if AUDIO_CACHE_ENABLED:
+            audio_cache.record_play(track_info)
+        
+        # 🔊 ГРОМКОСТЬ ИЗМЕРЯЕТСЯ ОДИН РАЗ - ПРИ СЛЕДУЮЩИХ ЗАПУСКАХ ТОЛЬКО ФИКСИРОВАННОЕ УСИЛЕНИЕ!!! 🔊
+        if LOUDNESS_NORMALIZATION:
+            local_path = await audio_cache.local_path(track_info) if AUDIO_CACHE_ENABLED else None
+            if local_path:
+                loudness_analyzer.schedule(track_info, local_path)
+            elif track_info.get('url'):
+                loudness_analyzer.schedule(track_info, track_info['url'], FFMPEG_OPTIONS['before_options'])
+    
+    async def _create_track_source(self, track_info, start_at=0.0):
+        """Создание источника трека: из локального кеша, если трек там есть, иначе по ссылке"""
+        gain_db = await loudness_analyzer.gain_for(track_info) if LOUDNESS_NORMALIZATION else 0.0
+        live_volume = track_info is self._live_volume_track
+        cached = await audio_cache.lookup(track_info) if AUDIO_CACHE_ENABLED else None
+        if cached:
+            return self._create_audio_source(cached['path'], cached['acodec'], local=True, gain_db=gain_db,
+                                             start_at=start_at, live_volume=live_volume)
+        return self._create_audio_source(track_info['url'], track_info.get('acodec'), gain_db=gain_db,
+                                         start_at=start_at, live_volume=live_volume)
+    
+    def _volume_filter(self, gain_db=0.0):
+        """Фильтр FFmpeg для громкости плеера и усиления нормализации ('' - звук не меняется)"""
+        if self.volume <= 0:
+            return 'volume=0'
+        gain_db += 20 * math.log10(self.volume / 100)
+        if abs(gain_db) < 0.01:
+            return ''
+        return f'volume={gain_db:.2f}dB'
+    
+    def _create_audio_source(self, url, codec=None, local=False, gain_db=0.0, start_at=0.0, live_volume=False):
+        """Создание источника звука: Opus-путь без кодирования в Python или PCM с регулировкой громкости
+        
+        Постоянная громкость вшивается в фильтр FFmpeg вместе с усилением
+        нормализации, поэтому Opus кодирует FFmpeg при любой громкости. PCM
+        нужен только для перехода с затуханием и для трека, громкость которого
+        поменяли на ходу (live_volume): дальше она меняется без перезапуска.
+        """
+        # Параметры переподключения есть только у сетевых потоков - для файла FFmpeg их не примет
+        before_options = '' if local else FFMPEG_OPTIONS['before_options']
+        if start_at > 0:
+            # -ss до -i - быстрый переход по контейнеру/диапазону байтов, без декодирования пропущенного
+            before_options = f"{before_options} -ss {start_at:.2f}".strip()
+        options = FFMPEG_OPTIONS['options']
+        
+        if OPUS_PASSTHROUGH and not live_volume and CROSSFADE_SECONDS <= 0:
+            # Фиксированное усиление дешево, в отличие от loudnorm в реальном времени
+            volume_filter = self._volume_filter(gain_db)
+            if volume_filter:
+                options += f' -af {volume_filter}'
+            return create_opus_source(
+                url,
+                codec,
+                OPUS_BITRATE,
+                before_options,
+                options,
+                allow_copy=not volume_filter
+            )
+        
+        if gain_db:
+            options += f' -af volume={gain_db:.2f}dB'
+        source = discord.FFmpegPCMAudio(url, before_options=before_options, options=options)
+        return DSPSource(source, volume=self.volume / 100)
+    
+    def _create_radio_source(self, url, on_title):
+        """Создание источника радио вне общей трансляции (с разбором названий песен, если он включен)"""
+        if not RADIO_ICY_METADATA:
+            return self._create_audio_source(url)
+        
+        if OPUS_PASSTHROUGH:
+            options = FFMPEG_OPTIONS['options']
+            volume_filter = self._volume_filter()
+            if volume_filter:
+                options += f' -af {volume_filter}'
+            return create_icy_source(url, on_title, options, OPUS_BITRATE)
+        
+        return DSPSource(create_icy_source(url, on_title, FFMPEG_OPTIONS['options']), volume=self.volume / 100)
+    
+    def _on_stream_title(self, track, title):
+        """Новое название песни в эфире станции (вызывается из потока чтения станции)"""
+        track['stream_title'] = title
+        asyncio.run_coroutine_threadsafe(self._announce_stream_title(track), self.bot.loop)
+    
+    async def _announce_stream_title(self, track):
+        """Показывает новую песню в эфире, если станция все еще играет"""
+        if self.current_track is track:
+            await self.send_now_playing_embed()
+    
+    async def set_volume(self, volume):
+        """Установка громкости (0-100)
+        
+        PCM-источник меняет громкость сразу. В Opus-источнике она вшита в
+        FFmpeg: радио переподключается (к трансляции с новой громкостью), а
+        трек перезапускается с текущей позиции через PCM и доигрывает так,
+        чтобы следующие изменения не требовали перезапуска. Следующий трек
+        снова идет через Opus-путь. Трек на паузе получит новую громкость при
+        следующем запуске.
+        """
+        volume = max(0, min(100, int(volume)))
+        if volume == self.volume:
+            return True
+        self.volume = volume
+        
+        source = self.source
+        if source is None:
+            return True
+        if isinstance(source.current, DSPSource):
+            source.current.volume = self.volume / 100
+            return True
+        
+        track = self.current_track
+        if not track or self.is_paused:
+            return True
+        if track.get('source') == 'stream':
+            return await self.play_radio(track['url'], track['title'], track['thumbnail'])
+        self._live_volume_track = track
+        return await self.play_track(track, start_at=source.position)
+    
+    def _start_source(self, audio_source, track_info, start_at=0.0):
+        """Запуск источника через обертку, считающую позицию и умеющую бесшовный переход"""
+        source = GaplessSource(
+            audio_source,
+            track_info,
+            start_offset=start_at,
+            on_transition=self._on_gapless_transition,
+            on_first_frame=self._on_first_frame,
+            crossfade_seconds=CROSSFADE_SECONDS
+        )
+        # Любой новый источник (смена станции, трек из веб-панели) отменяет приостановку
+        self._suspended = None
+        self.source = source
+        self.voice_client.play(source, after=lambda error: self._on_source_finished(source, error))
+        return source
+    
+    def _on_source_finished(self, source, error=None):
+        """Вызывается из аудиопотока по окончании источника"""
+        # Источник заменили вручную (смена станции/трека) - переход к следующему не нужен
+        if source is not self.source:
+            return
+        
+        user_stop, self._user_stop = self._user_stop, False
+        track = source.track_info
+        
+        # Радиопоток, оборвавшийся почти сразу, - сбой станции (учитывается для всех серверов)
+        if track.get('source') == 'stream' and source.position < STREAM_MIN_HEALTHY_SECONDS:
+            stream_breakers.record_failure(track['url'])
+        
+        if track.get('source') != 'stream' and not user_stop:
+            # Трек оборвался задолго до конца без ошибки - это обрыв сети, а не конец трека
+            duration = track.get('duration')
+            if error is None and duration and source.position < duration - PREMATURE_END_MARGIN:
+                # Повторный обрыв того же трека - скорее неверная длительность, чем сеть
+                resumes = self._premature_ends[1] + 1 if self._premature_ends[0] is track else 1
+                self._premature_ends = (track, resumes)
+                if resumes <= MAX_PREMATURE_RESUMES:
+                    error = f"поток трека оборвался на {source.position:.0f} из {duration:.0f} с"
+            if error:
+                # ⏩ ЗАПОМИНАЕМ ПОЗИЦИЮ - ПОСЛЕ ВОССТАНОВЛЕНИЯ ПРОДОЛЖИМ С НЕЕ!!! ⏩
+                self._resume_position = source.position
+                self._pending_resume = (RESUME_LATENCY, time.perf_counter())
+        
+        self._play_next_or_radio(error)
+    
+    def _check_stream_health(self, source):
+        """Радиопоток все еще играет спустя STREAM_MIN_HEALTHY_SECONDS - станция исправна"""
+        if source is self.source and not source.finished:
+            stream_breakers.record_success(source.track_info['url'])
+    
+    def _mark_transition(self, stage):
+        """Отметка этапа текущего перехода между треками (если переход идет)"""
+        span = self._transition_span
+        if span is not None:
+            span.mark(stage)
+    
+    def _on_first_frame(self):
+        """Вызывается из аудиопотока при первом кадре нового трека"""
+        self.reconnect_attempts = 0
+        
+        pending, self._pending_resume = self._pending_resume, None
+        if pending is not None:
+            latency, started = pending
+            latency.observe(time.perf_counter() - started)
+        
+        span = self._transition_span
+        if span is not None:
+            self._transition_span = None
+            span.mark('first_frame')
+            TRANSITION_LATENCY.observe(span.finish())
+    
+    def get_transition_stats(self):
+        """Процентили этапов перехода между треками на этом сервере"""
+        return get_transition_stats(self.guild_id)
+    
+    def _on_gapless_transition(self, track_info):
+        """Вызывается из аудиопотока при бесшовном переходе на подготовленный трек"""
+        self._transition_span = TransitionSpan(self.guild_id)
+        self.current_track = track_info
+        self.skip_votes.clear()
+        asyncio.run_coroutine_threadsafe(self._after_gapless_transition(), self.bot.loop)
+    
+    async def _after_gapless_transition(self):
+        """Действия в цикле событий после бесшовного перехода"""
+        self.prefetcher.wake()
+        if self.current_track:
+            await self._on_track_started(self.current_track)
+        await self.send_now_playing_embed()
+    
+    async def _gapless_prewarm_loop(self, source):
+        """Заранее запускает FFmpeg следующего трека за несколько секунд до конца текущего"""
+        while self.source is source and not source.finished:
+            await asyncio.sleep(0.5)
+            
+            if source.next_track is not None or not self.queue:
+                continue
+            
+            duration = source.track_info.get('duration')
+            # Для перехода следующий трек нужен уже к началу смешивания
+            if not duration or duration - source.position > GAPLESS_PREWARM_SECONDS + CROSSFADE_SECONDS:
+                continue
+            
+            next_track = self.queue.popleft()
+            try:
+                if await self._needs_prefetch(next_track, margin=0):
+                    await self._prefetch_entry(next_track)
+                audio_source = await self._create_track_source(next_track)
+            except Exception as e:
+                print(f"Ошибка при подготовке следующего трека: {e}")
+                self.queue.insert(0, next_track)
+                return
+            
+            # Пока разрешали трек, источник могли остановить (пропуск, стоп, перемотка, приостановка)
+            if self.source is not source or source.finished:
+                await asyncio.to_thread(audio_source.cleanup)
+                self.queue.insert(0, next_track)
+                return
+            if not source.prepare_next(audio_source, next_track):
+                # Трек закончился между проверкой и подготовкой - источник уже закрыт
+                self.queue.insert(0, next_track)
+                return
+    
+    async def _needs_prefetch(self, track_info, margin=PREFETCH_REFRESH_MARGIN):
+        """Проверка, нужно ли (пере)разрешить трек перед воспроизведением"""
+        if track_info.get('source') == 'stream':
+            return False
+        # Трек из локального кеша не нуждается в ссылке на поток
+        if AUDIO_CACHE_ENABLED and await audio_cache.local_path(track_info):
+            return False
+        if not track_info.get('url'):
+            return True
+        return resolver_cache.expires_at(track_info) - time.time() < margin
+    
+    async def _prefetch_entry(self, track_info):
+        """Разрешение трека очереди заранее (обновляет словарь на месте)"""
+        query = track_info.get('webpage_url')
+        if not query:
+            return
+        
+        # Старая запись в кеше истекает вместе со ссылкой - запрашиваем свежую
+        if track_info.get('url'):
+            resolver_cache.invalidate(query)
+        
+        fresh_info = await self._get_youtube_track_info(query)
+        if fresh_info:
+            track_info['url'] = fresh_info['url']
+            track_info['acodec'] = fresh_info['acodec']
+        elif track_info.get('spotify_id'):
+            # Сохраненное совпадение Spotify больше не открывается (видео удалено или закрыто) - ищем заново
+            await self._rematch_spotify_track(track_info)
+    
     async def add_to_queue(self, query):
         """Добавление трека в очередь"""
         try:
@@ -214,28 +756,29 @@ class MusicPlayer:
                 if not self.sp:
                     return False, "Spotify API не настроен. Проверьте ваши учетные данные Spotify."
                 
-                track_info = await self._get_spotify_track_info(query)
-                if not track_info:
+                # Плейлисты и альбомы импортируются в фоне - первый трек заиграет сразу после поиска
+                kind, collection_id = parse_spotify_url(query)
+                if kind in ('playlist', 'album'):
+                    self.bot.loop.create_task(self._import_spotify_collection(kind, collection_id))
+                    return True, "Импорт из Spotify начат. Треки будут добавляться в очередь по мере поиска."
+                
+                spotify_info = await self._get_spotify_track_info(query)
+                if not spotify_info:
                     return False, "Не удалось получить информацию о треке Spotify."
                 
                 # Поиск трека на YouTube для воспроизведения
-                search_query = f"{track_info['title']} {track_info['artist']}"
-                youtube_info = await self._get_youtube_track_info(search_query)
+                track_info = await self._match_spotify_track(spotify_info)
                 
-                if not youtube_info:
+                if not track_info:
                     return False, "Не удалось найти трек на YouTube."
                 
-                # Объединение информации
-                track_info.update({
-                    'url': youtube_info['url'],
-                    'source': 'youtube'
-                })
-                
                 self.queue.append(track_info)
+                self.prefetcher.start()
+                self.prefetcher.wake()
                 
                 # Если ничего не воспроизводится, начать воспроизведение
                 if not self.is_playing:
-                    await self.play_track(self.queue.pop(0))
+                    await self.play_track(self.queue.popleft())
                 
                 return True, f"Трек {track_info['title']} добавлен в очередь."
             else:
@@ -246,30 +789,103 @@ class MusicPlayer:
                     return False, "Не удалось найти трек."
                 
                 self.queue.append(track_info)
+                self.prefetcher.start()
+                self.prefetcher.wake()
                 
                 # Если ничего не воспроизводится, начать воспроизведение
                 if not self.is_playing:
-                    await self.play_track(self.queue.pop(0))
+                    await self.play_track(self.queue.popleft())
                 
                 return True, f"Трек {track_info['title']} добавлен в очередь."
         except Exception as e:
             print(f"Ошибка при добавлении трека в очередь: {e}")
             return False, f"Произошла ошибка: {str(e)}"
     
+    async def _match_spotify_track(self, spotify_info):
+        """Поиск трека Spotify на YouTube и объединение информации"""
+        track_info = TrackRecord.from_dict(spotify_info)
+        
+        # Трек уже сопоставлялся раньше - поиск не нужен, ссылку разрешит предзагрузка
+        match = await match_index.lookup(spotify_info.get('spotify_id'), spotify_info.get('isrc'))
+        if match:
+            track_info.update({
+                'id': match['video_id'],
+                'webpage_url': youtube_watch_url(match['video_id']),
+                'duration': match['duration'] or spotify_info.get('duration'),
+                'source': 'youtube'
+            })
+            return track_info
+        
+        youtube_info = await self._search_spotify_match(spotify_info)
+        if not youtube_info:
+            return None
+        
+        self._apply_youtube_match(track_info, youtube_info)
+        return track_info
+    
+    async def _search_spotify_match(self, spotify_info):
+        """Поиск трека Spotify на YouTube с сохранением совпадения в индекс"""
+        search_query = f"{spotify_info['title']} {spotify_info['artist']}"
+        youtube_info = await self._get_youtube_track_info(search_query)
+        
+        if youtube_info:
+            await match_index.store(
+                spotify_info.get('spotify_id'),
+                spotify_info.get('isrc'),
+                youtube_info['id'],
+                youtube_info['duration']
+            )
+        return youtube_info
+    
+    async def _rematch_spotify_track(self, track_info):
+        """Замена недоступного совпадения Spotify результатом нового поиска (обновляет запись на месте)"""
+        await match_index.invalidate(track_info['spotify_id'], track_info.get('isrc'))
+        youtube_info = await self._search_spotify_match(track_info)
+        if youtube_info:
+            self._apply_youtube_match(track_info, youtube_info)
+    
+    def _apply_youtube_match(self, track_info, youtube_info):
+        track_info.update({
+            'id': youtube_info['id'],
+            'url': youtube_info['url'],
+            'webpage_url': youtube_info['webpage_url'],
+            'duration': youtube_info['duration'],
+            'acodec': youtube_info['acodec'],
+            'source': 'youtube'
+        })
+    
+    async def _enqueue_imported_track(self, track_info):
+        """Добавление трека, найденного при импорте, в очередь"""
+        self.queue.append(track_info)
+        self.prefetcher.start()
+        self.prefetcher.wake()
+        
+        # Если ничего не воспроизводится, начать воспроизведение
+        if not self.is_playing:
+            await self.play_track(self.queue.popleft())
+    
+    async def _import_spotify_collection(self, kind, collection_id):
+        """Фоновый импорт плейлиста или альбома Spotify"""
+        try:
+            added = await import_spotify_collection(
+                self.sp,
+                kind,
+                collection_id,
+                self._match_spotify_track,
+                self._enqueue_imported_track
+            )
+            print(f"Импорт из Spotify завершен: добавлено {added} треков")
+        except Exception as e:
+            print(f"Ошибка при импорте из Spotify: {e}")
+    
     async def _get_spotify_track_info(self, spotify_url):
         """Получение информации о треке Spotify"""
         try:
             # Извлечение ID трека из URL
-            if 'track' in spotify_url:
-                track_id = spotify_url.split('track/')[1].split('?')[0]
-                track = self.sp.track(track_id)
-                
-                return {
-                    'title': track['name'],
-                    'artist': track['artists'][0]['name'],
-                    'thumbnail': track['album']['images'][0]['url'] if track['album']['images'] else None,
-                    'source': 'spotify'
-                }
+            kind, track_id = parse_spotify_url(spotify_url)
+            if kind == 'track':
+                track = await self.sp.track(track_id)
+                return spotify_track_to_info(track)
             return None
         except Exception as e:
             print(f"Ошибка при получении информации о треке Spotify: {e}")
@@ -278,26 +894,47 @@ class MusicPlayer:
     async def _get_youtube_track_info(self, query):
         """Получение информации о треке с YouTube"""
         try:
-            loop = asyncio.get_event_loop()
-            data = await loop.run_in_executor(None, lambda: self.ytdl.extract_info(query, download=False))
-            
-            if 'entries' in data:
-                # Берем первый результат из плейлиста
-                data = data['entries'][0]
+            # Проверяем общий кеш - тот же трек мог быть найден на другом сервере
+            cached = resolver_cache.get(query)
+            if cached:
+                return TrackRecord.from_dict(cached)
             
-            return {
-                'title': data['title'],
-                'url': data['url'],
-                'thumbnail': data['thumbnail'] if 'thumbnail' in data else None,
-                'source': 'youtube'
-            }
+            # Одинаковые одновременные запросы (с любых серверов) ждут одно извлечение
+            track_info = await resolve_flights.do(normalize_query(query), lambda: self._extract_track_info(query))
+            # Каждый получает свою запись - она меняется на месте при предзагрузке
+            return TrackRecord.from_dict(track_info) if track_info else None
         except Exception as e:
             print(f"Ошибка при получении информации о треке с YouTube: {e}")
             return None
     
+    async def _extract_track_info(self, query):
+        """Извлечение информации о треке через yt-dlp с сохранением в кеш"""
+        # Извлечение в выделенном пуле с лимитом на сервер
+        data = await EXTRACTION_POOL.extract(query, guild_id=self.guild_id)
+        if not data:
+            return None
+        
+        track_info = {
+            'id': data['id'],
+            'title': data['title'],
+            'url': data['url'],
+            'webpage_url': data['webpage_url'] or query,
+            'thumbnail': data['thumbnail'],
+            'duration': data['duration'],
+            'acodec': data['acodec'],
+            'source': 'youtube'
+        }
+        resolver_cache.put(query, track_info)
+        return track_info
+    
     async def skip(self):
         """Пропуск текущего трека"""
+        if self._suspended is not None:
+            # Поток закрыт - при возвращении слушателей заиграет следующий трек
+            self._suspended = (self.queue.popleft() if self.queue else None, 0.0)
+            return True
         if self.voice_client and self.voice_client.is_playing():
+            self._user_stop = True
             self.voice_client.stop()
             return True
         return False
@@ -341,6 +978,9 @@ class MusicPlayer:
     
     async def pause(self):
         """Приостановка воспроизведения"""
+        if self._suspended is not None and not self.is_paused:
+            self.is_paused = True
+            return True
         if self.voice_client and self.voice_client.is_playing():
             self.voice_client.pause()
             self.is_paused = True
@@ -349,6 +989,13 @@ class MusicPlayer:
     
     async def resume(self):
         """Возобновление воспроизведения"""
+        if self._suspended is not None and self.is_paused:
+            self.is_paused = False
+            # Поток откроется сразу, если в канале кто-то есть, иначе - когда слушатель придет
+            guild = self.bot.get_guild(self.guild_id)
+            if human_listeners(guild) > 0:
+                await self.resume_stream()
+            return True
         if self.voice_client and self.is_paused:
             self.voice_client.resume()
             self.is_paused = False
@@ -359,22 +1006,62 @@ class MusicPlayer:
         """Остановка воспроизведения и очистка очереди"""
         if self.voice_client and self.voice_client.is_connected():
             if self.voice_client.is_playing():
+                self._user_stop = True
                 self.voice_client.stop()
-            self.queue = []
+            self.queue.clear()
             self.is_playing = False
             self.is_paused = False
             self.skip_votes.clear()  # Сбрасываем голоса при остановке
+            self._suspended = None
+            await self.prefetcher.stop()
             return True
         return False
     
+    async def remove_track(self, index, from_web=False):
+        """Удаление трека из очереди по индексу
+        
+        Args:
+            index: Позиция трека в очереди (0 - следующий)
+            from_web: Запрос пришел из веб-интерфейса
+        
+        Returns:
+            Удаленный трек или None, если индекс вне очереди
+        """
+        track_info = self.queue.remove_at(index)
+        if track_info:
+            # Начало очереди могло сдвинуться - готовим новые следующие треки
+            self.prefetcher.wake()
+        return track_info
+    
+    async def move_track(self, source, destination):
+        """Перемещение трека в очереди
+        
+        Args:
+            source: Текущая позиция трека
+            destination: Новая позиция трека
+        
+        Returns:
+            True, если трек перемещен
+        """
+        moved = self.queue.move(source, destination)
+        if moved:
+            self.prefetcher.wake()
+        return moved
+    
+    async def shuffle_queue(self):
+        """Перемешивание очереди"""
+        self.queue.shuffle()
+        self.prefetcher.wake()
+    
     async def send_now_playing_embed(self):
-        """Отправка эмбеда с информацией о текущем треке"""
+        """Обновление сообщения "Сейчас играет" (одно сообщение, редактируется на месте)"""
+        if self.current_track:
+            self.now_playing.request()
+    
+    def _build_now_playing_embed(self):
+        """Эмбед с информацией о текущем треке"""
         if not self.current_track:
-            return
-        
-        text_channel = self.bot.get_channel(self.text_channel_id)
-        if not text_channel:
-            return
+            return None
         
         embed = discord.Embed(
             title="Сейчас играет",
@@ -388,6 +1075,9 @@ class MusicPlayer:
         if 'artist' in self.current_track:
             embed.add_field(name="Исполнитель", value=self.current_track['artist'], inline=True)
         
+        if 'stream_title' in self.current_track:
+            embed.add_field(name="В эфире", value=self.current_track['stream_title'], inline=False)
+        
         source_name = "Радио"
         if self.current_track['source'] == 'youtube':
             source_name = "YouTube"
@@ -395,24 +1085,7 @@ class MusicPlayer:
             source_name = "Spotify"
         
         embed.add_field(name="Источник", value=source_name, inline=True)
-        
-        # Создание кнопок управления
-        view = MusicControlView(self)
-        
-        # Отправка сообщения и закрепление его
-        try:
-            # Проверка наличия закрепленных сообщений
-            pins = await text_channel.pins()
-            for pin in pins:
-                if pin.author == self.bot.user and "Сейчас играет" in pin.content:
-                    await pin.unpin()
-                    await pin.delete()
-            
-            message = await text_channel.send(embed=embed, view=view)
-            await message.pin()
-        except Exception as e:
-            print(f"Ошибка при отправке эмбеда: {e}")
-            await text_channel.send(embed=embed, view=view)
+        return embed
 
 class MusicControlView(discord.ui.View):
     def __init__(self, player):
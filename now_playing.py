@@ -0,0 +1,159 @@
+import os
+import time
+import asyncio
+from typing import Callable, Optional
+
+import discord
+
+import metrics
+from rest_scheduler import rest_scheduler, route_key, PRIORITY_NOW_PLAYING
+
+# ⚙️ НАСТРОЙКИ СООБЩЕНИЯ "СЕЙЧАС ИГРАЕТ" - ОДНО СООБЩЕНИЕ, КОТОРОЕ РЕДАКТИРУЕТСЯ!!! ⚙️
+# Не чаще одного обновления сообщения за это время (в секундах); промежуточные изменения объединяются
+NOW_PLAYING_UPDATE_WINDOW = float(os.getenv('NOW_PLAYING_UPDATE_WINDOW', '5'))
+
+# Заголовок, по которому после перезапуска находится уже закрепленное сообщение
+NOW_PLAYING_TITLE_PREFIX = 'Сейчас играет'
+
+sends = metrics.counter('now_playing_sends')
+edits = metrics.counter('now_playing_edits')
+skipped = metrics.counter('now_playing_unchanged')
+coalesced = metrics.counter('now_playing_coalesced')
+
+
+class NowPlayingMessage:
+    """Постоянное сообщение "Сейчас играет" сервера, редактируемое на месте
+
+    Вместо удаления старых сообщений и отправки нового при каждой смене
+    трека сообщение один раз отправляется и закрепляется, а дальше только
+    редактируется. Запросы на обновление объединяются: в пределах окна
+    выполняется не больше одного редактирования, причем с самым свежим
+    состоянием (эмбед строится в момент отправки). Если эмбед не
+    изменился, запрос к Discord не выполняется вовсе.
+    """
+
+    def __init__(self, bot, channel_id_provider: Callable[[], Optional[int]],
+                 build_embed: Callable[[], Optional[discord.Embed]],
+                 build_view: Callable[[], discord.ui.View],
+                 window: float = NOW_PLAYING_UPDATE_WINDOW):
+        """Инициализация сообщения
+
+        Args:
+            bot: Экземпляр бота
+            channel_id_provider: Возвращает ID текстового канала (может меняться)
+            build_embed: Строит эмбед по текущему состоянию плеера (None - показывать нечего)
+            build_view: Создает кнопки управления (вызывается один раз)
+            window: Минимальный интервал между обновлениями (в секундах)
+        """
+        self.bot = bot
+        self.channel_id_provider = channel_id_provider
+        self.build_embed = build_embed
+        self.build_view = build_view
+        self.window = window
+        self.message: Optional[discord.Message] = None
+        self._view = None
+        self._last_content = None
+        self._last_update = 0.0
+        self._dirty = False
+        self._adopt_checked = False
+        self._task = None
+
+    def request(self) -> None:
+        """Запрос обновления (не ждет отправки; частые запросы объединяются)"""
+        if self._dirty:
+            coalesced.inc()
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def close(self) -> None:
+        """Отмена ожидающего обновления (плеер освобождается; само сообщение остается)"""
+        self._dirty = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.message = None
+
+    async def _run(self) -> None:
+        while self._dirty:
+            delay = self._last_update + self.window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty = False
+            try:
+                await self._flush()
+            except Exception as e:
+                print(f"Ошибка при обновлении сообщения \"Сейчас играет\": {e}")
+
+    def _get_channel(self):
+        channel_id = self.channel_id_provider()
+        return self.bot.get_channel(channel_id) if channel_id else None
+
+    async def _flush(self) -> None:
+        embed = self.build_embed()
+        channel = self._get_channel()
+        if embed is None or channel is None:
+            return
+
+        if self.message is not None and self.message.channel.id != channel.id:
+            # Канал сменили - в новом канале будет новое сообщение
+            self.message = None
+            self._last_content = None
+
+        content = embed.to_dict()
+        if self.message is not None and content == self._last_content:
+            skipped.inc()
+            return
+
+        self._last_update = time.monotonic()
+        if self._view is None:
+            self._view = self.build_view()
+
+        if self.message is None:
+            self.message = await self._find_existing(channel)
+
+        if self.message is not None:
+            message = self.message
+            try:
+                await rest_scheduler.run(
+                    lambda: message.edit(embed=embed, view=self._view),
+                    PRIORITY_NOW_PLAYING,
+                    route=route_key('PATCH', f'/channels/{channel.id}/messages/{message.id}')[0]
+                )
+                edits.inc()
+                self._last_content = content
+                return
+            except discord.NotFound:
+                # Сообщение удалили вручную - отправляем новое
+                self.message = None
+
+        self.message = await rest_scheduler.run(
+            lambda: channel.send(embed=embed, view=self._view),
+            PRIORITY_NOW_PLAYING,
+            route=route_key('POST', f'/channels/{channel.id}/messages')[0]
+        )
+        sends.inc()
+        self._last_content = content
+        message = self.message
+        try:
+            await rest_scheduler.run(
+                message.pin,
+                PRIORITY_NOW_PLAYING,
+                route=route_key('PUT', f'/channels/{channel.id}/pins/{message.id}')[0]
+            )
+        except discord.HTTPException as e:
+            print(f"Не удалось закрепить сообщение \"Сейчас играет\": {e}")
+
+    async def _find_existing(self, channel) -> Optional[discord.Message]:
+        """Поиск сообщения, закрепленного до перезапуска (один раз за время жизни плеера)"""
+        if self._adopt_checked:
+            return None
+        self._adopt_checked = True
+        try:
+            for pin in await channel.pins():
+                if pin.author == self.bot.user and pin.embeds and \
+                        (pin.embeds[0].title or '').startswith(NOW_PLAYING_TITLE_PREFIX):
+                    return pin
+        except discord.HTTPException as e:
+            print(f"Ошибка при поиске закрепленного сообщения: {e}")
+        return None
@@ -0,0 +1,321 @@
+import os
+import time
+from typing import Optional
+
+import numpy as np
+
+# ⚙️ НАСТРОЙКИ ОБРАБОТКИ PCM - ГРОМКОСТЬ И ЗАТУХАНИЯ БЕЗ AUDIOOP!!! ⚙️
+# Порог мягкого ограничения (доля полной шкалы): выше него пики плавно сжимаются, а не срезаются
+DSP_SOFT_CLIP_THRESHOLD = float(os.getenv('DSP_SOFT_CLIP_THRESHOLD', '0.9'))
+# Форма кривой перекрестного затухания: equal_power, linear или scurve
+CROSSFADE_CURVE = os.getenv('CROSSFADE_CURVE', 'equal_power').lower()
+
+# Формат PCM discord.py: 48 кГц, стерео, 16 бит, кадры по 20 мс
+SAMPLE_RATE = 48000
+CHANNELS = 2
+FRAME_SAMPLES = SAMPLE_RATE // 50
+FRAME_SIZE = FRAME_SAMPLES * CHANNELS * 2
+FRAME_SECONDS = 0.02
+
+_INT16_SCALE = 1.0 / 32768.0
+_INT16_MAX = 32767.0
+
+
+class PCMProcessor:
+    """Обработка 20-мс кадров PCM: громкость с плавным переходом, затухания и мягкое ограничение
+
+    Все операции векторные (NumPy) и пишут в буферы, выделенные один раз
+    на процессор, поэтому обработка кадра не создает новых массивов.
+    Кадр с единичным усилением возвращается без изменений и без
+    обращения к NumPy.
+
+    Изменение громкости применяется плавно в пределах одного кадра
+    (линейная огибающая), поэтому не дает щелчков.
+    """
+
+    def __init__(self, volume: float = 1.0, soft_clip_threshold: float = DSP_SOFT_CLIP_THRESHOLD):
+        """Инициализация процессора
+
+        Args:
+            volume: Начальная громкость (1.0 - без изменений)
+            soft_clip_threshold: Порог мягкого ограничения (0-1)
+        """
+        self.volume = max(0.0, volume)
+        self.threshold = min(max(soft_clip_threshold, 0.1), 0.999)
+        self._gain = self.volume
+        self._fade = 1.0
+        self._fade_step = 0.0
+        self._stop_after_fade = False
+
+        # Рабочие буферы одного кадра
+        self._ramp = (np.arange(1, FRAME_SAMPLES + 1, dtype=np.float32) / FRAME_SAMPLES)
+        self._envelope = np.empty(FRAME_SAMPLES, dtype=np.float32)
+        self._samples = np.empty(FRAME_SAMPLES * CHANNELS, dtype=np.float32)
+        self._magnitude = np.empty(FRAME_SAMPLES * CHANNELS, dtype=np.float32)
+        self._excess = np.empty(FRAME_SAMPLES * CHANNELS, dtype=np.float32)
+        self._output = np.empty(FRAME_SAMPLES * CHANNELS, dtype=np.int16)
+
+    @property
+    def finished(self) -> bool:
+        """Затухание с остановкой завершилось - дальше только тишина"""
+        return self._stop_after_fade and self._fade <= 0.0 and self._gain <= 0.0
+
+    def fade_in(self, seconds: float) -> None:
+        """Плавное нарастание громкости с нуля
+
+        Args:
+            seconds: Длительность нарастания
+        """
+        self._fade = 0.0
+        self._gain = 0.0
+        self._fade_step = 1.0 / max(1, round(seconds / FRAME_SECONDS))
+        self._stop_after_fade = False
+
+    def fade_out(self, seconds: float, stop: bool = True) -> None:
+        """Плавное затухание до нуля
+
+        Args:
+            seconds: Длительность затухания
+            stop: Закончить источник после затухания
+        """
+        self._fade_step = -max(self._fade, 1e-6) / max(1, round(seconds / FRAME_SECONDS))
+        self._stop_after_fade = stop
+
+    def _next_gain(self) -> float:
+        if self._fade_step:
+            self._fade = min(1.0, max(0.0, self._fade + self._fade_step))
+            if self._fade in (0.0, 1.0):
+                self._fade_step = 0.0
+        return self.volume * self._fade
+
+    def process(self, data: bytes) -> bytes:
+        """Обработка одного кадра
+
+        Args:
+            data: Кадр PCM s16le (обычно FRAME_SIZE байт, последний может быть короче)
+
+        Returns:
+            Обработанный кадр той же длины
+        """
+        start_gain = self._gain
+        end_gain = self._next_gain()
+        self._gain = end_gain
+        if start_gain == end_gain == 1.0:
+            return data
+
+        count = len(data) // 2
+        frames = count // CHANNELS
+        if frames == 0:
+            return data
+        samples = self._samples[:count]
+        np.multiply(np.frombuffer(data, dtype=np.int16, count=count), _INT16_SCALE, out=samples)
+
+        stereo = samples.reshape(frames, CHANNELS)
+        if start_gain == end_gain:
+            stereo *= end_gain
+        else:
+            envelope = self._envelope[:frames]
+            np.multiply(self._ramp[:frames], end_gain - start_gain, out=envelope)
+            envelope += start_gain
+            stereo *= envelope[:, None]
+
+        # Без усиления выше 1.0 выйти за шкалу нельзя - ограничение не нужно
+        if end_gain > 1.0 or start_gain > 1.0:
+            self._soft_clip(samples)
+
+        output = self._output[:count]
+        np.multiply(samples, _INT16_MAX, out=samples)
+        np.copyto(output, samples, casting='unsafe')
+        return output.tobytes()
+
+    def _soft_clip(self, samples: np.ndarray) -> None:
+        count = len(samples)
+        soft_clip(samples, self.threshold, self._magnitude[:count], self._excess[:count])
+
+
+def soft_clip(samples: np.ndarray, threshold: float, magnitude: np.ndarray, excess: np.ndarray) -> None:
+    """Мягкое ограничение на месте: до порога сигнал не меняется, выше - сжимается через tanh
+
+    Args:
+        samples: Отсчеты float32 в шкале -1..1 (изменяются на месте)
+        threshold: Порог ограничения (0-1)
+        magnitude: Рабочий буфер той же длины
+        excess: Рабочий буфер той же длины
+    """
+    headroom = 1.0 - threshold
+    np.abs(samples, out=magnitude)
+    np.subtract(magnitude, threshold, out=excess)
+    np.maximum(excess, 0.0, out=excess)
+    if not excess.any():
+        return
+
+    # |y| = min(|x|, t) + (1 - t) * tanh(max(|x| - t, 0) / (1 - t))
+    excess /= headroom
+    np.tanh(excess, out=excess)
+    excess *= headroom
+    np.minimum(magnitude, threshold, out=magnitude)
+    magnitude += excess
+    np.copysign(magnitude, samples, out=samples)
+
+
+def crossfade_curves(position: np.ndarray, curve: str = CROSSFADE_CURVE):
+    """Кривые затухания уходящего и нарастания входящего трека
+
+    Args:
+        position: Положение внутри перехода (0-1) для каждого отсчета
+        curve: equal_power - постоянная мощность (без провала громкости на некоррелированных треках),
+               linear - постоянная амплитуда, scurve - мягкие начало и конец
+
+    Returns:
+        Кортеж (усиление уходящего, усиление входящего)
+    """
+    if curve == 'linear':
+        incoming = position.copy()
+    elif curve == 'scurve':
+        incoming = 0.5 - 0.5 * np.cos(np.pi * position)
+    else:
+        incoming = np.sin(0.5 * np.pi * position)
+        return np.cos(0.5 * np.pi * position).astype(np.float32), incoming.astype(np.float32)
+    return (1.0 - incoming).astype(np.float32), incoming.astype(np.float32)
+
+
+class CrossfadeMixer:
+    """Смешивание уходящего и входящего треков кадрами по 20 мс
+
+    Кривые для всего перехода рассчитываются один раз, а каждый кадр
+    смешивается целиком векторными операциями над срезами этих кривых
+    и буферами, выделенными один раз.
+    """
+
+    def __init__(self, seconds: float, curve: str = CROSSFADE_CURVE,
+                 soft_clip_threshold: float = DSP_SOFT_CLIP_THRESHOLD):
+        """Инициализация микшера
+
+        Args:
+            seconds: Длительность перехода
+            curve: Форма кривой (см. crossfade_curves)
+            soft_clip_threshold: Порог мягкого ограничения суммы
+        """
+        self.frames = max(1, round(seconds / FRAME_SECONDS))
+        self.threshold = min(max(soft_clip_threshold, 0.1), 0.999)
+        self.position = 0
+
+        total = self.frames * FRAME_SAMPLES
+        self._out_curve, self._in_curve = crossfade_curves(
+            np.arange(1, total + 1, dtype=np.float32) / total, curve
+        )
+
+        size = FRAME_SAMPLES * CHANNELS
+        self._outgoing = np.zeros(size, dtype=np.float32)
+        self._incoming = np.zeros(size, dtype=np.float32)
+        self._magnitude = np.empty(size, dtype=np.float32)
+        self._excess = np.empty(size, dtype=np.float32)
+        self._output = np.empty(size, dtype=np.int16)
+
+    @property
+    def done(self) -> bool:
+        """Переход завершен - дальше играет только входящий трек"""
+        return self.position >= self.frames
+
+    def reset(self) -> None:
+        """Подготовка к следующему переходу"""
+        self.position = 0
+
+    def _load(self, data: bytes, buffer: np.ndarray, count: int) -> None:
+        available = min(len(data) // 2, count)
+        np.multiply(np.frombuffer(data, dtype=np.int16, count=available), _INT16_SCALE, out=buffer[:available])
+        # Короткий последний кадр дополняется тишиной
+        buffer[available:count] = 0.0
+
+    def mix(self, outgoing: bytes, incoming: bytes) -> bytes:
+        """Смешивание очередных кадров уходящего и входящего треков
+
+        Args:
+            outgoing: Кадр уходящего трека (может быть пустым или коротким)
+            incoming: Кадр входящего трека (может быть пустым или коротким)
+
+        Returns:
+            Смешанный кадр PCM s16le
+        """
+        count = (max(len(outgoing), len(incoming)) // (2 * CHANNELS)) * CHANNELS
+        frames = count // CHANNELS
+        if frames == 0:
+            return b''
+
+        start = min(self.position, self.frames - 1) * FRAME_SAMPLES
+        self.position += 1
+
+        mixed = self._outgoing[:count]
+        self._load(outgoing, mixed, count)
+        addition = self._incoming[:count]
+        self._load(incoming, addition, count)
+
+        mixed.reshape(frames, CHANNELS)[:] *= self._out_curve[start:start + frames, None]
+        addition.reshape(frames, CHANNELS)[:] *= self._in_curve[start:start + frames, None]
+        mixed += addition
+        soft_clip(mixed, self.threshold, self._magnitude[:count], self._excess[:count])
+
+        output = self._output[:count]
+        np.multiply(mixed, _INT16_MAX, out=mixed)
+        np.copyto(output, mixed, casting='unsafe')
+        return output.tobytes()
+
+
+def benchmark(guilds: int = 12, frames: int = 2000, volume: float = 0.8, seed: Optional[int] = 0) -> float:
+    """Микробенчмарк: время обработки кадра для заданного числа серверов
+
+    Каждый сервер получает свой процессор; громкость каждые 50 кадров
+    меняется между volume и volume * 1.5 (огибающая, а выше 1.0 - еще и
+    мягкое ограничение), чтобы измерять не только быстрый путь.
+
+    Args:
+        guilds: Количество одновременно играющих серверов
+        frames: Количество кадров на сервер
+        volume: Базовая громкость
+        seed: Зерно генератора тестового сигнала
+
+    Returns:
+        Среднее время обработки одного кадра одного сервера (в микросекундах)
+    """
+    rng = np.random.default_rng(seed)
+    signal = (rng.standard_normal(FRAME_SAMPLES * CHANNELS) * 12000).clip(-32768, 32767).astype(np.int16).tobytes()
+    processors = [PCMProcessor(volume=volume) for _ in range(guilds)]
+
+    started = time.perf_counter()
+    for index in range(frames):
+        for processor in processors:
+            if index % 50 == 0:
+                processor.volume = volume if processor.volume != volume else volume * 1.5
+            processor.process(signal)
+    elapsed = time.perf_counter() - started
+    return elapsed / (frames * guilds) * 1e6
+
+
+def benchmark_crossfade(guilds: int = 12, seconds: float = 5.0, seed: Optional[int] = 0) -> float:
+    """Микробенчмарк перехода: время смешивания кадра для заданного числа серверов
+
+    Returns:
+        Среднее время смешивания одного кадра одного сервера (в микросекундах)
+    """
+    rng = np.random.default_rng(seed)
+    outgoing, incoming = (
+        (rng.standard_normal(FRAME_SAMPLES * CHANNELS) * 12000).clip(-32768, 32767).astype(np.int16).tobytes()
+        for _ in range(2)
+    )
+    mixers = [CrossfadeMixer(seconds) for _ in range(guilds)]
+
+    started = time.perf_counter()
+    for _ in range(mixers[0].frames):
+        for mixer in mixers:
+            mixer.mix(outgoing, incoming)
+    elapsed = time.perf_counter() - started
+    return elapsed / (mixers[0].frames * guilds) * 1e6
+
+
+if __name__ == '__main__':
+    for name, run in (('громкость', benchmark), ('переход', benchmark_crossfade)):
+        for guild_count in (1, 12, 50):
+            per_frame = run(guilds=guild_count)
+            # Доля одного ядра, которую занимает обработка в реальном времени (кадр длится 20 мс)
+            load = per_frame * guild_count / (FRAME_SECONDS * 1e6) * 100
+            print(f"{name}, {guild_count:>3} серверов: {per_frame:6.1f} мкс на кадр на сервер, {load:5.2f}% ядра")
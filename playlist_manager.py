@@ -2,7 +2,9 @@ import json
 import os
 import asyncio
 import time
-from typing import Dict, List, Any, Tuple, Optional
+from typing import Dict, List, Any, Tuple, Optional, Union
+
+from track_record import TrackRecord
 
 class PlaylistManager:
     """Класс для управления плейлистами с хранением в JSON"""
@@ -184,13 +186,14 @@ class PlaylistManager:
         
         return True, f"Плейлист '{playlist_name}' успешно удален"
     
-    async def add_track(self, guild_id: int, playlist_name: str, track: Dict[str, str]) -> Tuple[bool, str]:
+    async def add_track(self, guild_id: int, playlist_name: str,
+                        track: Union[TrackRecord, Dict[str, Any]]) -> Tuple[bool, str]:
         """Добавление трека в плейлист
         
         Args:
             guild_id: ID сервера
             playlist_name: Название плейлиста
-            track: Информация о треке (url, title, author)
+            track: Запись о треке или словарь (url, title, ...)
         
         Returns:
             Кортеж (успех, сообщение)
@@ -201,6 +204,9 @@ class PlaylistManager:
         if not playlist:
             return False, f"Плейлист '{playlist_name}' не найден"
         
+        # Сохраняем только долговечные поля - ссылка на поток истекает
+        track = TrackRecord.from_dict(track).to_storage()
+        
         # Проверяем, есть ли уже трек с таким URL
         if any(t['url'] == track['url'] for t in playlist['tracks']):
             return False, "Этот трек уже есть в плейлисте"
@@ -245,6 +251,29 @@ class PlaylistManager:
         
         return True, f"Трек '{track_title}' удален из плейлиста '{playlist_name}'"
     
+    def get_tracks(self, guild_id: int, playlist_name: str) -> List[TrackRecord]:
+        """Получение треков плейлиста в виде записей для очереди
+        
+        Args:
+            guild_id: ID сервера
+            playlist_name: Название плейлиста
+        
+        Returns:
+            Список записей о треках (пустой, если плейлист не найден)
+        """
+        playlist = self.get_playlist(guild_id, playlist_name)
+        if not playlist:
+            return []
+        
+        tracks = []
+        for data in playlist['tracks']:
+            track = TrackRecord.from_dict(data)
+            # Ссылку на поток плеер получит перед воспроизведением по ссылке на страницу
+            if track.webpage_url:
+                track.url = None
+            tracks.append(track)
+        return tracks
+    
     async def start_voting(self, guild_id: int, playlist_name: str, duration: int = 86400) -> Tuple[bool, str]:
         """Начало голосования за плейлист
         
@@ -0,0 +1,81 @@
+import os
+import asyncio
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ ПРЕДЗАГРУЗКИ - НИКАКОЙ ТИШИНЫ МЕЖДУ ТРЕКАМИ!!! ⚙️
+# Сколько следующих треков очереди держать готовыми к воспроизведению
+PREFETCH_DEPTH = int(os.getenv('PREFETCH_DEPTH', '3'))
+# Как часто перепроверять очередь без явных изменений (в секундах)
+PREFETCH_INTERVAL = int(os.getenv('PREFETCH_INTERVAL', '30'))
+# За сколько секунд до истечения ссылки перезапрашивать трек
+PREFETCH_REFRESH_MARGIN = int(os.getenv('PREFETCH_REFRESH_MARGIN', '300'))
+
+
+class QueuePrefetcher:
+    """Фоновая задача, которая держит следующие треки очереди разрешенными
+
+    Плеер должен реализовать два метода:
+        _needs_prefetch(track) -> bool - нужно ли (пере)разрешить трек (корутина: может проверять диск)
+        _prefetch_entry(track) -> None - разрешить трек, обновив словарь на месте
+    """
+
+    def __init__(self, player, depth: int = PREFETCH_DEPTH, interval: int = PREFETCH_INTERVAL):
+        """Инициализация предзагрузчика
+
+        Args:
+            player: Плеер, чью очередь нужно обслуживать
+            depth: Количество треков от начала очереди
+            interval: Период фоновой проверки (в секундах)
+        """
+        self.player = player
+        self.depth = depth
+        self.interval = interval
+        self._task = None
+        self._wake = asyncio.Event()
+
+        self.resolved = metrics.counter('prefetch_resolved')
+        self.failed = metrics.counter('prefetch_failed')
+
+    def start(self) -> None:
+        """Запускает фоновую задачу, если она еще не запущена"""
+        if self.depth <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def wake(self) -> None:
+        """Просит проверить очередь немедленно (после изменения очереди)"""
+        self._wake.set()
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.prefetch_once()
+
+    async def prefetch_once(self) -> None:
+        """Один проход по началу очереди"""
+        # Срез - копия начала очереди (она может меняться, пока мы ждем резолвера)
+        for track in self.player.queue[:self.depth]:
+            if not await self.player._needs_prefetch(track):
+                continue
+            try:
+                await self.player._prefetch_entry(track)
+                self.resolved.inc()
+            except Exception as e:
+                self.failed.inc()
+                print(f"Ошибка при предзагрузке трека {track.get('title')}: {e}")
@@ -0,0 +1,215 @@
+import os
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Tuple
+
+import discord
+
+import metrics
+from audio_sources import FRAME_DURATION, create_opus_source
+from icy_ingest import RADIO_ICY_METADATA, create_icy_source
+
+# ⚙️ НАСТРОЙКИ ОБЩЕЙ ТРАНСЛЯЦИИ РАДИО - ОДИН FFMPEG НА СТАНЦИЮ!!! ⚙️
+RADIO_BROADCAST_ENABLED = os.getenv('RADIO_BROADCAST_ENABLED', 'true').lower() == 'true'
+# Сколько кадров (по 20 мс) может накопиться у отстающего слушателя
+RADIO_BROADCAST_BUFFER_FRAMES = int(os.getenv('RADIO_BROADCAST_BUFFER_FRAMES', '50'))
+
+# Кадр тишины Opus - отдается, пока новых кадров нет (пустой кадр завершил бы воспроизведение)
+OPUS_SILENCE = b'\xf8\xff\xfe'
+
+
+class BroadcastSubscriber(discord.AudioSource):
+    """Источник звука одного голосового клиента, читающий общую трансляцию станции"""
+
+    def __init__(self, station: 'StationBroadcast', on_title: Optional[Callable[[str], None]] = None):
+        self.station = station
+        self.on_title = on_title
+        self.frames = deque(maxlen=RADIO_BROADCAST_BUFFER_FRAMES)
+        self.closed = False
+        self._ready = threading.Condition()
+
+    def push(self, frame: bytes) -> None:
+        """Добавляет кадр от трансляции (вызывается из потока станции)"""
+        with self._ready:
+            self.frames.append(frame)
+            self._ready.notify()
+
+    def close(self) -> None:
+        """Сообщает, что трансляция закончилась (вызывается из потока станции)"""
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+    def read(self) -> bytes:
+        with self._ready:
+            if not self.frames and not self.closed:
+                self._ready.wait(FRAME_DURATION)
+            if self.frames:
+                return self.frames.popleft()
+            if self.closed:
+                return b''
+        return OPUS_SILENCE
+
+    def is_opus(self) -> bool:
+        return True
+
+    def cleanup(self) -> None:
+        self.station.hub.unsubscribe(self)
+
+
+class StationBroadcast:
+    """Один процесс FFmpeg станции, кадры которого раздаются всем подписчикам
+
+    Громкость вшита в FFmpeg (подписчики получают готовые кадры Opus и не
+    могут менять ее сами), поэтому трансляция своя для каждой громкости.
+    Все серверы с одинаковой громкостью - например, с DEFAULT_VOLUME - слушают
+    одну трансляцию.
+    """
+
+    def __init__(self, hub: 'RadioBroadcastHub', url: str, volume_filter: str = ''):
+        self.hub = hub
+        self.url = url
+        self.volume_filter = volume_filter
+        self.key = (url, volume_filter)
+        self.subscribers = []
+        self.source = None
+        self.title = None
+        self.running = False
+        self._thread = None
+
+    def start(self, before_options: str, options: str, bitrate: int) -> None:
+        """Запускает FFmpeg и поток раздачи кадров"""
+        if self.volume_filter:
+            options = f'{options} -af {self.volume_filter}'
+        if RADIO_ICY_METADATA:
+            # Поток читает сам бот: названия песен приходят по тому же соединению
+            self.source = create_icy_source(self.url, self._on_title, options, bitrate)
+        else:
+            self.source = create_opus_source(self.url, None, bitrate, before_options, options)
+        self.running = True
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f'radio-broadcast-{self.url}',
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Останавливает трансляцию (поток завершится на следующем кадре)"""
+        self.running = False
+
+    def _on_title(self, title: str) -> None:
+        # Вызывается из потока чтения станции
+        self.title = title
+        for subscriber in list(self.subscribers):
+            if subscriber.on_title:
+                subscriber.on_title(title)
+
+    def _run(self) -> None:
+        # Раздаем кадры в реальном темпе, сглаживая начальный всплеск буфера FFmpeg
+        next_frame_at = time.perf_counter()
+        try:
+            while self.running:
+                frame = self.source.read()
+                if not frame:
+                    break
+
+                for subscriber in list(self.subscribers):
+                    subscriber.push(frame)
+
+                next_frame_at += FRAME_DURATION
+                delay = next_frame_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame_at = time.perf_counter()
+        except Exception as e:
+            print(f"Ошибка в трансляции станции {self.url}: {e}")
+        finally:
+            self.running = False
+            self.source.cleanup()
+            self.hub._station_finished(self)
+            for subscriber in list(self.subscribers):
+                subscriber.close()
+
+
+class RadioBroadcastHub:
+    """Общие трансляции радиостанций: один FFmpeg и одно соединение на станцию и громкость"""
+
+    def __init__(self):
+        self.stations: Dict[Tuple[str, str], StationBroadcast] = {}
+        self._lock = threading.Lock()
+
+        self.active_stations = metrics.gauge('radio_broadcast_stations')
+        self.active_subscribers = metrics.gauge('radio_broadcast_subscribers')
+
+    def subscribe(self, url: str, before_options: str, options: str, bitrate: int,
+                  on_title: Optional[Callable[[str], None]] = None,
+                  volume_filter: str = '') -> BroadcastSubscriber:
+        """Подписка голосового клиента на станцию (станция запускается при первой подписке)
+
+        Args:
+            url: Ссылка на поток станции
+            before_options: Параметры FFmpeg до -i
+            options: Параметры FFmpeg после -i
+            bitrate: Битрейт кодирования в Opus (кбит/с)
+            on_title: Вызывается с названием песни в эфире (при подписке, если оно уже известно, и при каждой смене)
+            volume_filter: Фильтр громкости FFmpeg ('' - без изменений); определяет, какая трансляция станции нужна
+
+        Returns:
+            Источник звука для voice_client.play()
+        """
+        with self._lock:
+            key = (url, volume_filter)
+            station = self.stations.get(key)
+            if station is None or not station.running:
+                station = StationBroadcast(self, url, volume_filter)
+                station.start(before_options, options, bitrate)
+                self.stations[key] = station
+                self.active_stations.set(len(self.stations))
+
+            subscriber = BroadcastSubscriber(station, on_title)
+            station.subscribers.append(subscriber)
+            self.active_subscribers.inc()
+
+        if on_title and station.title:
+            on_title(station.title)
+        return subscriber
+
+    def unsubscribe(self, subscriber: BroadcastSubscriber) -> None:
+        """Отписка (станция останавливается, когда уходит последний подписчик)"""
+        station = subscriber.station
+        with self._lock:
+            if subscriber not in station.subscribers:
+                return
+            station.subscribers.remove(subscriber)
+            self.active_subscribers.dec()
+
+            if not station.subscribers:
+                station.stop()
+                if self.stations.get(station.key) is station:
+                    del self.stations[station.key]
+                self.active_stations.set(len(self.stations))
+
+    def _station_finished(self, station: StationBroadcast) -> None:
+        with self._lock:
+            if self.stations.get(station.key) is station:
+                del self.stations[station.key]
+            self.active_stations.set(len(self.stations))
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика трансляций
+
+        Returns:
+            Словарь ссылка станции -> количество слушающих серверов (по всем громкостям)
+        """
+        stats = {}
+        with self._lock:
+            for station in self.stations.values():
+                stats[station.url] = stats.get(station.url, 0) + len(station.subscribers)
+        return stats
+
+
+# 📻 ОБЩИЙ ХАБ ДЛЯ ВСЕХ СЕРВЕРОВ - ОДНА ТРАНСЛЯЦИЯ НА СТАНЦИЮ!!! 📻
+radio_hub = RadioBroadcastHub()
@@ -0,0 +1,397 @@
+import os
+import re
+import time
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ ОБЩЕГО ПЛАНИРОВЩИКА ЗАПРОСОВ К DISCORD - ОДИН БЮДЖЕТ НА ВЕСЬ БОТ!!! ⚙️
+# Сколько запросов планировщик выполняет одновременно
+REST_SCHEDULER_CONCURRENCY = int(os.getenv('REST_SCHEDULER_CONCURRENCY', '4'))
+# Сколько запросов каждого лимита косметические обновления оставляют для ответов пользователям
+REST_COSMETIC_RESERVE = int(os.getenv('REST_COSMETIC_RESERVE', '1'))
+
+# 🚦 ПРИОРИТЕТЫ ЗАПРОСОВ - ЧЕМ МЕНЬШЕ ЧИСЛО, ТЕМ РАНЬШЕ!!! 🚦
+PRIORITY_INTERACTION = 0  # Ответы на команды и кнопки
+PRIORITY_NOW_PLAYING = 1  # Сообщение "Сейчас играет"
+PRIORITY_PRESENCE = 2     # Статус бота
+PRIORITY_COSMETIC = 3     # Админ-панель и прочие украшения
+
+# Смена статуса идет через шлюз, а не REST - лимит задаем сами (запросов за окно в секундах)
+PRESENCE_ROUTE = 'GATEWAY presence'
+PRESENCE_LIMIT = 5
+PRESENCE_WINDOW = 20.0
+
+# Ресурсы, ID которых входит в лимит Discord ("major parameters")
+MAJOR_RESOURCES = ('channels', 'guilds', 'webhooks', 'interactions')
+# Для вебхуков и взаимодействий в лимит входит и токен после ID
+TOKEN_RESOURCES = ('webhooks', 'interactions')
+# Запросы взаимодействий не расходуют глобальный лимит бота
+GLOBAL_EXEMPT_PREFIX = '/interactions/'
+# Сколько лимитов хранить, прежде чем выбрасывать истекшие
+MAX_TRACKED_BUCKETS = 1000
+
+_API_PREFIX_RE = re.compile(r'^/api(?:/v\d+)?')
+
+
+def route_key(method: str, url: str) -> Tuple[str, str]:
+    """Ключ маршрута Discord для учета лимитов
+
+    ID ресурса из "major parameters" сохраняется (у каждого канала свой
+    лимит), остальные числовые ID заменяются на {id}.
+
+    Args:
+        method: HTTP-метод
+        url: Полный адрес или путь запроса (с /api/vN или без)
+
+    Returns:
+        Кортеж (маршрут, например "PATCH /channels/123/messages/{id}", major-параметр)
+    """
+    segments = _API_PREFIX_RE.sub('', urlparse(url).path).strip('/').split('/')
+    parts = []
+    major = ''
+    major_index = None
+    for index, segment in enumerate(segments):
+        previous = segments[index - 1] if index else ''
+        if major_index is None and previous in MAJOR_RESOURCES:
+            major_index = index
+            major = f'{previous}/{segment}'
+            parts.append(segment)
+        elif major_index is not None and index == major_index + 1 and segments[major_index - 1] in TOKEN_RESOURCES:
+            major += f'/{segment}'
+            parts.append(segment)
+        elif segment.isdigit():
+            parts.append('{id}')
+        else:
+            parts.append(segment)
+    return f"{method.upper()} /{'/'.join(parts)}", major
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RouteBucket:
+    """Состояние одного лимита: сколько запросов осталось и когда он сбросится
+
+    Заполняется по заголовкам X-RateLimit-*, которые Discord присылает в
+    каждом ответе. Лимит с окном (window) ведется локально - для шлюза,
+    где заголовков нет.
+    """
+
+    def __init__(self, limit: Optional[int] = None, window: float = 0.0):
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.window = window
+
+    def wait_time(self, now: float, reserve: int = 0) -> float:
+        """Сколько ждать до запроса (0 - можно сейчас)
+
+        Args:
+            now: Текущее время (time.monotonic)
+            reserve: Сколько запросов оставить нетронутыми
+        """
+        if self.remaining is None or now >= self.reset_at:
+            return 0.0
+        if self.remaining > reserve:
+            return 0.0
+        return self.reset_at - now
+
+    def consume(self, now: float) -> None:
+        """Учет отправленного запроса до прихода ответа"""
+        if now >= self.reset_at:
+            if not self.window:
+                # Окно истекло - точное состояние придет с ответом
+                return
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        if self.remaining is not None:
+            self.remaining = max(0, self.remaining - 1)
+
+    def update(self, headers: Mapping[str, str], now: float) -> None:
+        """Обновление по заголовкам ответа"""
+        limit = _header_float(headers, 'X-RateLimit-Limit')
+        remaining = _header_float(headers, 'X-RateLimit-Remaining')
+        reset_after = _header_float(headers, 'X-RateLimit-Reset-After')
+        if limit is not None:
+            self.limit = int(limit)
+        if remaining is not None:
+            self.remaining = int(remaining)
+        if reset_after is not None:
+            self.reset_at = now + reset_after
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'factory', 'route', 'key', 'future', 'queued_at', 'report')
+
+    def __init__(self, priority, seq, factory, route, key, future):
+        self.priority = priority
+        self.seq = seq
+        self.factory = factory
+        self.route = route
+        self.key = key
+        self.future = future
+        self.queued_at = time.monotonic()
+        self.report = False
+
+
+class RestScheduler:
+    """Общая очередь исходящих запросов бота к Discord
+
+    Сообщения "Сейчас играет", админ-панель, статус бота и ответы на
+    голосования идут через одну очередь с приоритетами. Планировщик
+    следит за лимитами маршрутов, которые сообщает Discord (discord.py
+    получает их в заголовках ответов; планировщик читает их через
+    aiohttp.TraceConfig, переданный в http_trace бота), и не отправляет
+    запрос в исчерпанный лимит - его выполнение откладывается до сброса,
+    а другие маршруты тем временем продолжают работать. Косметические
+    обновления оставляют в каждом лимите запас для ответов пользователям.
+
+    Запросы с ключом (key) заменяют еще не отправленный запрос с тем же
+    ключом: из нескольких обновлений админ-панели уйдет только последнее.
+    """
+
+    def __init__(self, concurrency: int = REST_SCHEDULER_CONCURRENCY, reserve: int = REST_COSMETIC_RESERVE):
+        """Инициализация планировщика
+
+        Args:
+            concurrency: Максимум одновременно выполняемых запросов
+            reserve: Запас лимита, который не трогают косметические обновления
+        """
+        self.concurrency = max(1, concurrency)
+        self.reserve = max(0, reserve)
+        self._pending = []
+        self._keyed: Dict[str, _Job] = {}
+        self._buckets: Dict[str, RouteBucket] = {}
+        self._aliases: Dict[str, str] = {}
+        self._global_reset_at = 0.0
+        self._running = 0
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._worker = None
+
+        self.observed = metrics.counter('rest_responses')
+        self.rate_limited = metrics.counter('rest_rate_limited')
+        self.superseded = metrics.counter('rest_superseded')
+        self.completed = metrics.counter('rest_scheduled_requests')
+        self.queue_depth = metrics.gauge('rest_queue_depth')
+        self.queue_wait = metrics.histogram('rest_queue_wait_seconds')
+
+        self.limit_route(PRESENCE_ROUTE, PRESENCE_LIMIT, PRESENCE_WINDOW)
+
+    def limit_route(self, route: str, limit: int, window: float) -> None:
+        """Локальный лимит для маршрута, по которому Discord не присылает заголовков
+
+        Args:
+            route: Ключ маршрута
+            limit: Запросов за окно
+            window: Длина окна (в секундах)
+        """
+        self._buckets[route] = RouteBucket(limit, window)
+
+    def submit(self, factory: Callable[[], Awaitable[Any]], priority: int = PRIORITY_COSMETIC,
+               route: Optional[str] = None, key: Optional[str] = None) -> asyncio.Future:
+        """Постановка запроса в очередь
+
+        Должна вызываться из цикла событий.
+
+        Args:
+            factory: Функция, создающая корутину запроса (вызывается только при отправке)
+            priority: Приоритет (PRIORITY_*)
+            route: Ключ маршрута (route_key) для учета лимита
+            key: Ключ для замены устаревших запросов
+
+        Returns:
+            Future с результатом запроса (у замененного запроса - результат заменившего)
+        """
+        return self._enqueue(factory, priority, route, key).future
+
+    def post(self, factory: Callable[[], Awaitable[Any]], priority: int = PRIORITY_COSMETIC,
+             route: Optional[str] = None, key: Optional[str] = None) -> None:
+        """Постановка запроса в очередь без ожидания результата (ошибки пишутся в лог)"""
+        self._enqueue(factory, priority, route, key).report = True
+
+    async def run(self, factory: Callable[[], Awaitable[Any]], priority: int = PRIORITY_INTERACTION,
+                  route: Optional[str] = None, key: Optional[str] = None) -> Any:
+        """Выполнение запроса через очередь с ожиданием результата"""
+        return await self.submit(factory, priority, route, key)
+
+    def _enqueue(self, factory, priority, route, key) -> _Job:
+        job = self._keyed.get(key) if key is not None else None
+        if job is not None:
+            # Еще не отправленный запрос устарел - отправим только новый
+            job.factory = factory
+            job.route = route or job.route
+            job.priority = min(job.priority, priority)
+            self.superseded.inc()
+        else:
+            loop = asyncio.get_running_loop()
+            job = _Job(priority, next(self._seq), factory, route, key, loop.create_future())
+            self._pending.append(job)
+            if key is not None:
+                self._keyed[key] = job
+            self.queue_depth.set(len(self._pending))
+            if self._wakeup is None:
+                self._wakeup = asyncio.Event()
+            if self._worker is None or self._worker.done():
+                self._worker = loop.create_task(self._dispatch())
+        self._wake()
+        return job
+
+    def _wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _bucket(self, route: str) -> RouteBucket:
+        key = self._aliases.get(route, route)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RouteBucket()
+        return bucket
+
+    def _wait_time(self, job: _Job, now: float) -> float:
+        wait = 0.0
+        if not (job.route or '').split(' ', 1)[-1].startswith(GLOBAL_EXEMPT_PREFIX):
+            wait = self._global_reset_at - now
+        if job.route:
+            reserve = self.reserve if job.priority >= PRIORITY_COSMETIC else 0
+            wait = max(wait, self._bucket(job.route).wait_time(now, reserve))
+        return wait
+
+    def _next_job(self, now: float) -> Tuple[Optional[_Job], Optional[float]]:
+        """Самый приоритетный запрос, который можно отправить сейчас, или время ожидания"""
+        if self._running >= self.concurrency:
+            return None, None
+        shortest = None
+        for job in sorted(self._pending, key=lambda j: (j.priority, j.seq)):
+            wait = self._wait_time(job, now)
+            if wait <= 0:
+                return job, None
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    async def _dispatch(self) -> None:
+        while self._pending:
+            now = time.monotonic()
+            job, wait = self._next_job(now)
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._pending.remove(job)
+            if job.key is not None:
+                self._keyed.pop(job.key, None)
+            self.queue_depth.set(len(self._pending))
+            if job.future.done():
+                # Ждавший результата отменил запрос
+                continue
+            if job.route:
+                self._bucket(job.route).consume(now)
+            self.queue_wait.observe(now - job.queued_at)
+            self._running += 1
+            asyncio.get_running_loop().create_task(self._execute(job))
+
+    async def _execute(self, job: _Job) -> None:
+        try:
+            result = await job.factory()
+        except Exception as e:
+            if job.report:
+                print(f"Ошибка при запросе к Discord ({job.route or job.key}): {e}")
+            elif not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            if job.report and not job.future.done():
+                job.future.set_result(None)
+            self.completed.inc()
+            self._running -= 1
+            self._wake()
+
+    def observe(self, method: str, url: str, status: int, headers: Mapping[str, str]) -> None:
+        """Учет ответа Discord: обновление лимита маршрута по заголовкам
+
+        Args:
+            method: HTTP-метод запроса
+            url: Адрес запроса
+            status: Код ответа
+            headers: Заголовки ответа
+        """
+        now = time.monotonic()
+        route, major = route_key(method, url)
+        self.observed.inc()
+
+        bucket_hash = headers.get('X-RateLimit-Bucket')
+        if bucket_hash:
+            # Разные маршруты могут делить один лимит
+            self._aliases[route] = f'{bucket_hash}:{major}'
+        bucket = self._bucket(route)
+
+        if status == 429:
+            self.rate_limited.inc()
+            retry_after = _header_float(headers, 'Retry-After') or 1.0
+            if (headers.get('X-RateLimit-Global') or '').lower() == 'true':
+                self._global_reset_at = max(self._global_reset_at, now + retry_after)
+            else:
+                bucket.remaining = 0
+                bucket.reset_at = max(bucket.reset_at, now + retry_after)
+        else:
+            bucket.update(headers, now)
+
+        if len(self._buckets) > MAX_TRACKED_BUCKETS:
+            self._prune(now)
+        self._wake()
+
+    def _prune(self, now: float) -> None:
+        # Токены взаимодействий живут 15 минут - их лимиты быстро становятся мусором
+        expired = {key for key, bucket in self._buckets.items() if not bucket.window and bucket.reset_at < now}
+        for key in expired:
+            del self._buckets[key]
+        self._aliases = {route: key for route, key in self._aliases.items() if key not in expired}
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self.observe(params.method, str(params.url), params.response.status, params.response.headers)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig для HTTP-сессии discord.py (параметр http_trace бота)
+
+        Returns:
+            Конфигурация, передающая планировщику заголовки каждого ответа
+        """
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._on_request_end)
+        return trace
+
+    def stats(self) -> Dict[str, Any]:
+        """Состояние очереди
+
+        Returns:
+            Словарь с длиной очереди, числом выполняемых запросов и исчерпанными лимитами
+        """
+        now = time.monotonic()
+        return {
+            'queued': len(self._pending),
+            'running': self._running,
+            'buckets': len(self._buckets),
+            'exhausted': sum(1 for bucket in self._buckets.values() if bucket.wait_time(now) > 0),
+            'global_wait': max(0.0, self._global_reset_at - now)
+        }
+
+
+# 🚦 ОБЩИЙ ПЛАНИРОВЩИК ЗАПРОСОВ ДЛЯ ВСЕХ СЕРВЕРОВ!!! 🚦
+rest_scheduler = RestScheduler()
@@ -0,0 +1,268 @@
+import os
+import time
+import base64
+import asyncio
+from typing import Dict, Any, List, Optional, Iterable
+
+import aiohttp
+from dotenv import load_dotenv
+
+import metrics
+
+# 🔑 ЗАГРУЗКА ПЕРЕМЕННЫХ ОКРУЖЕНИЯ - МОДУЛЬ ИМПОРТИРУЕТСЯ РАНЬШЕ, ЧЕМ ПЛЕЕРЫ ВЫЗЫВАЮТ load_dotenv()!!! 🔑
+load_dotenv()
+
+# 🎵 ДАННЫЕ ПРИЛОЖЕНИЯ SPOTIFY - ОДИН КЛИЕНТ НА ВЕСЬ БОТ!!! 🎵
+SPOTIFY_CLIENT_ID = os.getenv('SPOTIFY_CLIENT_ID')
+SPOTIFY_CLIENT_SECRET = os.getenv('SPOTIFY_CLIENT_SECRET')
+
+# ⚙️ НАСТРОЙКИ HTTP-КЛИЕНТА SPOTIFY ⚙️
+# Максимум одновременных соединений с api.spotify.com
+SPOTIFY_MAX_CONNECTIONS = int(os.getenv('SPOTIFY_MAX_CONNECTIONS', '10'))
+# Сколько ждать соседние запросы треков, чтобы отправить их одним запросом (в секундах)
+SPOTIFY_BATCH_WINDOW = float(os.getenv('SPOTIFY_BATCH_WINDOW', '0.05'))
+# Таймаут одного запроса (в секундах)
+SPOTIFY_REQUEST_TIMEOUT = float(os.getenv('SPOTIFY_REQUEST_TIMEOUT', '10'))
+
+API_URL = 'https://api.spotify.com/v1'
+TOKEN_URL = 'https://accounts.spotify.com/api/token'
+
+# Максимум ID в одном запросе /tracks
+TRACKS_BATCH_SIZE = 50
+# Обновляем токен заранее, чтобы не получить 401 посреди импорта
+TOKEN_REFRESH_MARGIN = 60
+# Максимум повторов при ответе 429 (слишком много запросов)
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+class SpotifyError(Exception):
+    """Ошибка запроса к Spotify Web API"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Spotify API {status}: {message}")
+        self.status = status
+
+
+class AsyncSpotifyClient:
+    """Асинхронный клиент Spotify Web API, общий для всех плееров
+
+    Один пул соединений aiohttp, один токен client credentials (обновляется
+    заранее и только одним запросом), а одиночные запросы треков, пришедшие
+    почти одновременно, объединяются в один запрос /tracks.
+
+    Методы возвращают те же JSON-объекты, что и spotipy.
+    """
+
+    def __init__(self, client_id: Optional[str] = SPOTIFY_CLIENT_ID,
+                 client_secret: Optional[str] = SPOTIFY_CLIENT_SECRET,
+                 max_connections: int = SPOTIFY_MAX_CONNECTIONS,
+                 batch_window: float = SPOTIFY_BATCH_WINDOW):
+        """Инициализация клиента
+
+        Args:
+            client_id: ID приложения Spotify
+            client_secret: Секрет приложения Spotify
+            max_connections: Размер пула соединений
+            batch_window: Окно объединения запросов треков (в секундах)
+        """
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.max_connections = max_connections
+        self.batch_window = batch_window
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock: Optional[asyncio.Lock] = None
+
+        # Ожидающие запросы треков: ID -> список future
+        self._pending_tracks: Dict[str, List[asyncio.Future]] = {}
+        self._batch_task: Optional[asyncio.Task] = None
+
+        self.requests = metrics.counter('spotify_api_requests')
+        self.batched_tracks = metrics.counter('spotify_api_batched_tracks')
+        self.token_refreshes = metrics.counter('spotify_api_token_refreshes')
+        self.request_latency = metrics.latency('spotify_api_request')
+
+    @property
+    def configured(self) -> bool:
+        """Заданы ли учетные данные Spotify"""
+        return bool(self.client_id and self.client_secret)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Сессия создается лениво - внутри работающего цикла событий
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=SPOTIFY_REQUEST_TIMEOUT)
+            )
+        return self._session
+
+    async def _get_token(self) -> str:
+        if self._token and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+            return self._token
+
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+
+        async with self._token_lock:
+            # Пока мы ждали блокировку, токен мог обновить другой запрос
+            if self._token and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN:
+                return self._token
+
+            credentials = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+            async with self._get_session().post(
+                TOKEN_URL,
+                data={'grant_type': 'client_credentials'},
+                headers={'Authorization': f'Basic {credentials}'}
+            ) as response:
+                data = await response.json()
+                if response.status != 200:
+                    raise SpotifyError(response.status, data.get('error_description', 'token request failed'))
+
+            self._token = data['access_token']
+            self._token_expires_at = time.time() + data.get('expires_in', 3600)
+            self.token_refreshes.inc()
+            return self._token
+
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """GET-запрос к Web API с повтором при 401 (истекший токен) и 429 (лимит)"""
+        if not self.configured:
+            raise SpotifyError(0, 'учетные данные Spotify не заданы')
+
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            token = await self._get_token()
+            started = time.perf_counter()
+            self.requests.inc()
+            async with self._get_session().get(
+                f"{API_URL}/{path}",
+                params=params,
+                headers={'Authorization': f'Bearer {token}'}
+            ) as response:
+                self.request_latency.observe(time.perf_counter() - started)
+
+                if response.status == 401 and attempt == 0:
+                    self._token = None
+                    continue
+                if response.status == 429 and attempt < MAX_RATE_LIMIT_RETRIES:
+                    await asyncio.sleep(float(response.headers.get('Retry-After', '1')))
+                    continue
+
+                data = await response.json()
+                if response.status != 200:
+                    message = (data.get('error') or {}).get('message', 'request failed')
+                    raise SpotifyError(response.status, message)
+                return data
+
+        raise SpotifyError(429, 'превышен лимит запросов')
+
+    async def track(self, track_id: str) -> Dict[str, Any]:
+        """Получение трека (запросы из разных плееров объединяются в один /tracks)
+
+        Args:
+            track_id: ID трека Spotify
+
+        Returns:
+            Объект трека
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending_tracks.setdefault(track_id, []).append(future)
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.get_running_loop().create_task(self._flush_tracks())
+        return await future
+
+    async def _flush_tracks(self) -> None:
+        await asyncio.sleep(self.batch_window)
+
+        while self._pending_tracks:
+            batch_ids = list(self._pending_tracks)[:TRACKS_BATCH_SIZE]
+            waiters = {track_id: self._pending_tracks.pop(track_id) for track_id in batch_ids}
+            self.batched_tracks.inc(len(batch_ids))
+
+            try:
+                tracks = (await self.tracks(batch_ids))['tracks']
+            except Exception as e:
+                for futures in waiters.values():
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            for track_id, track in zip(batch_ids, tracks):
+                for future in waiters[track_id]:
+                    if future.done():
+                        continue
+                    if track is None:
+                        future.set_exception(SpotifyError(404, f'трек {track_id} не найден'))
+                    else:
+                        future.set_result(track)
+
+    async def tracks(self, track_ids: Iterable[str]) -> Dict[str, Any]:
+        """Получение нескольких треков (до 50 ID за запрос)
+
+        Args:
+            track_ids: ID треков Spotify
+
+        Returns:
+            Словарь с ключом 'tracks' в порядке переданных ID
+        """
+        track_ids = list(track_ids)
+        tracks = []
+        for start in range(0, len(track_ids), TRACKS_BATCH_SIZE):
+            chunk = track_ids[start:start + TRACKS_BATCH_SIZE]
+            data = await self._get('tracks', {'ids': ','.join(chunk)})
+            tracks.extend(data.get('tracks', []))
+        return {'tracks': tracks}
+
+    async def album(self, album_id: str) -> Dict[str, Any]:
+        """Получение альбома
+
+        Args:
+            album_id: ID альбома Spotify
+
+        Returns:
+            Объект альбома
+        """
+        return await self._get(f'albums/{album_id}')
+
+    async def album_tracks(self, album_id: str, offset: int = 0, limit: int = TRACKS_BATCH_SIZE) -> Dict[str, Any]:
+        """Получение страницы треков альбома
+
+        Args:
+            album_id: ID альбома Spotify
+            offset: Смещение
+            limit: Размер страницы (до 50)
+
+        Returns:
+            Страница с упрощенными объектами треков
+        """
+        return await self._get(f'albums/{album_id}/tracks', {'offset': offset, 'limit': limit})
+
+    async def playlist_items(self, playlist_id: str, offset: int = 0, limit: int = 100,
+                             additional_types: Iterable[str] = ('track',)) -> Dict[str, Any]:
+        """Получение страницы элементов плейлиста
+
+        Args:
+            playlist_id: ID плейлиста Spotify
+            offset: Смещение
+            limit: Размер страницы (до 100)
+            additional_types: Типы элементов
+
+        Returns:
+            Страница элементов плейлиста
+        """
+        return await self._get(f'playlists/{playlist_id}/tracks', {
+            'offset': offset,
+            'limit': limit,
+            'additional_types': ','.join(additional_types)
+        })
+
+    async def close(self) -> None:
+        """Закрывает пул соединений"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# 🎧 ОБЩИЙ КЛИЕНТ SPOTIFY ДЛЯ ВСЕХ ПЛЕЕРОВ И СЕРВЕРОВ!!! 🎧
+spotify_client = AsyncSpotifyClient()
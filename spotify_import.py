@@ -0,0 +1,189 @@
+import os
+import asyncio
+from typing import Dict, Any, Optional, Tuple, List, Callable, Awaitable
+from urllib.parse import urlparse
+
+import metrics
+from track_record import TrackRecord
+
+# ⚙️ НАСТРОЙКИ ИМПОРТА ПЛЕЙЛИСТОВ SPOTIFY - БЫСТРО И БЕЗ ЗАВИСАНИЙ!!! ⚙️
+# Сколько треков одновременно ищется на YouTube/Lavalink
+SPOTIFY_MATCH_CONCURRENCY = int(os.getenv('SPOTIFY_MATCH_CONCURRENCY', '4'))
+# Максимум треков из одного плейлиста или альбома
+SPOTIFY_IMPORT_LIMIT = int(os.getenv('SPOTIFY_IMPORT_LIMIT', '500'))
+
+# Размеры страниц массовых методов Spotify Web API
+PLAYLIST_PAGE_SIZE = 100
+TRACKS_BATCH_SIZE = 50
+
+
+def parse_spotify_url(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """Разбирает ссылку Spotify
+
+    Поддерживаются ссылки вида open.spotify.com/<тип>/<id> (в том числе
+    с префиксом локали intl-xx) и URI вида spotify:<тип>:<id>.
+
+    Args:
+        url: Ссылка на трек, плейлист или альбом
+
+    Returns:
+        Кортеж (тип, id), где тип - 'track', 'playlist' или 'album'
+    """
+    url = url.strip()
+    if url.startswith('spotify:'):
+        parts = url.split(':')
+        if len(parts) >= 3:
+            return parts[1], parts[2]
+        return None, None
+
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    if parts and parts[0].startswith('intl-'):
+        parts = parts[1:]
+    if len(parts) >= 2 and parts[0] in ('track', 'playlist', 'album'):
+        return parts[0], parts[1]
+    return None, None
+
+
+def spotify_track_to_info(track: Dict[str, Any], album: Optional[Dict[str, Any]] = None) -> TrackRecord:
+    """Преобразует объект трека Spotify в информацию о треке плеера
+
+    Args:
+        track: Объект трека из Spotify Web API
+        album: Объект альбома (для упрощенных треков без поля album)
+
+    Returns:
+        Запись о треке
+    """
+    album = track.get('album') or album or {}
+    images = album.get('images') or []
+    return TrackRecord(
+        spotify_id=track.get('id'),
+        isrc=(track.get('external_ids') or {}).get('isrc'),
+        title=track['name'],
+        artist=', '.join(artist['name'] for artist in track.get('artists', [])),
+        thumbnail=images[0]['url'] if images else None,
+        duration=track['duration_ms'] / 1000 if track.get('duration_ms') else None,
+        source='spotify'
+    )
+
+
+async def _fetch_playlist_page(sp, playlist_id: str, offset: int) -> Tuple[List[TrackRecord], bool]:
+    """Получает страницу плейлиста (до 100 треков за один запрос)"""
+    page = await sp.playlist_items(
+        playlist_id,
+        offset=offset,
+        limit=PLAYLIST_PAGE_SIZE,
+        additional_types=('track',)
+    )
+    tracks = [
+        spotify_track_to_info(item['track'])
+        for item in page.get('items', [])
+        if item.get('track') and item['track'].get('id') and not item['track'].get('is_local')
+    ]
+    return tracks, page.get('next') is not None
+
+
+async def _fetch_album_page(sp, album_id: str, offset: int, album: Dict[str, Any]) -> Tuple[List[TrackRecord], bool]:
+    """Получает страницу альбома и полные данные ее треков (до 50 ID за один запрос)"""
+    page = await sp.album_tracks(album_id, offset=offset, limit=TRACKS_BATCH_SIZE)
+    track_ids = [track['id'] for track in page.get('items', []) if track.get('id')]
+    full_tracks = (await sp.tracks(track_ids))['tracks'] if track_ids else []
+    tracks = [spotify_track_to_info(track, album) for track in full_tracks if track]
+    return tracks, page.get('next') is not None
+
+
+async def iter_spotify_collection(sp, kind: str, collection_id: str, limit: int = SPOTIFY_IMPORT_LIMIT):
+    """Асинхронно перебирает страницы плейлиста или альбома
+
+    Args:
+        sp: Асинхронный клиент Spotify
+        kind: 'playlist' или 'album'
+        collection_id: ID плейлиста или альбома
+        limit: Максимум треков
+
+    Yields:
+        Списки информации о треках (по странице за раз)
+    """
+    album = None
+    if kind == 'album':
+        album = await sp.album(collection_id)
+
+    offset = 0
+    count = 0
+    has_more = True
+    while has_more and count < limit:
+        if kind == 'playlist':
+            tracks, has_more = await _fetch_playlist_page(sp, collection_id, offset)
+            offset += PLAYLIST_PAGE_SIZE
+        else:
+            tracks, has_more = await _fetch_album_page(sp, collection_id, offset, album)
+            offset += TRACKS_BATCH_SIZE
+
+        tracks = tracks[:limit - count]
+        count += len(tracks)
+        if tracks:
+            yield tracks
+
+
+async def import_spotify_collection(sp, kind: str, collection_id: str,
+                                    match: Callable[[TrackRecord], Awaitable[Optional[TrackRecord]]],
+                                    enqueue: Callable[[TrackRecord], Awaitable[None]],
+                                    concurrency: int = SPOTIFY_MATCH_CONCURRENCY) -> int:
+    """Импортирует плейлист или альбом Spotify в очередь
+
+    Страницы загружаются массовыми запросами, треки ищутся параллельно
+    (не больше concurrency одновременно) и попадают в очередь в исходном
+    порядке сразу, как только найдены все предыдущие - поэтому первый трек
+    начинает играть, не дожидаясь остальных.
+
+    Args:
+        sp: Асинхронный клиент Spotify
+        kind: 'playlist' или 'album'
+        collection_id: ID плейлиста или альбома
+        match: Корутина поиска воспроизводимой версии трека
+        enqueue: Корутина добавления найденного трека в очередь
+        concurrency: Максимум одновременных поисков
+
+    Returns:
+        Количество добавленных треков
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    flush_lock = asyncio.Lock()
+    results: Dict[int, Optional[TrackRecord]] = {}
+    state = {'next_index': 0, 'added': 0}
+    matched = metrics.counter('spotify_import_matched')
+    unmatched = metrics.counter('spotify_import_unmatched')
+
+    async def flush():
+        async with flush_lock:
+            while state['next_index'] in results:
+                track_info = results.pop(state['next_index'])
+                state['next_index'] += 1
+                if track_info:
+                    await enqueue(track_info)
+                    state['added'] += 1
+
+    async def match_one(index, spotify_info):
+        async with semaphore:
+            try:
+                track_info = await match(spotify_info)
+            except Exception as e:
+                print(f"Ошибка при поиске трека Spotify {spotify_info.get('title')}: {e}")
+                track_info = None
+        if track_info:
+            matched.inc()
+        else:
+            unmatched.inc()
+        results[index] = track_info
+        await flush()
+
+    tasks = []
+    index = 0
+    async for page in iter_spotify_collection(sp, kind, collection_id):
+        for spotify_info in page:
+            tasks.append(asyncio.create_task(match_one(index, spotify_info)))
+            index += 1
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    return state['added']
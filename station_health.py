@@ -0,0 +1,243 @@
+import os
+import time
+import asyncio
+from typing import Dict, Any, List, Optional, Iterable, Callable
+
+import metrics
+from stream_http import open_stream_async
+
+# ⚙️ НАСТРОЙКИ ПРОВЕРКИ РАДИОСТАНЦИЙ - УЗНАЕМ О МЕРТВОЙ СТАНЦИИ РАНЬШЕ СЛУШАТЕЛЕЙ!!! ⚙️
+STATION_PROBE_ENABLED = os.getenv('STATION_PROBE_ENABLED', 'true').lower() == 'true'
+# Как часто проверять все станции (в секундах)
+STATION_PROBE_INTERVAL = float(os.getenv('STATION_PROBE_INTERVAL', '300'))
+# Сколько ждать первого байта (в секундах)
+STATION_PROBE_TIMEOUT = float(os.getenv('STATION_PROBE_TIMEOUT', '10'))
+# Сколько секунд читать поток после первого байта
+STATION_PROBE_SAMPLE_SECONDS = float(os.getenv('STATION_PROBE_SAMPLE_SECONDS', '3'))
+# Пауза между порциями данных, которая считается подвисанием (в секундах)
+STATION_PROBE_STALL_THRESHOLD = float(os.getenv('STATION_PROBE_STALL_THRESHOLD', '1'))
+# Сколько станций проверять одновременно
+STATION_PROBE_CONCURRENCY = int(os.getenv('STATION_PROBE_CONCURRENCY', '4'))
+
+# Штраф за одно подвисание при ранжировании (в секундах задержки)
+STALL_PENALTY = 1.0
+# Оценка для еще не проверенных адресов - хуже любого исправного, лучше неисправного
+UNKNOWN_SCORE = 30.0
+# Вес нового измерения в скользящем среднем времени до первого байта
+TTFB_SMOOTHING = 0.5
+READ_CHUNK_SIZE = 4096
+
+
+def station_urls(station: Dict[str, Any]) -> List[str]:
+    """Все адреса станции: основной и зеркала
+
+    Args:
+        station: Станция из config.radios (url и необязательный список mirrors)
+
+    Returns:
+        Список адресов, основной первым
+    """
+    return [station['url']] + [url for url in station.get('mirrors', []) if url != station['url']]
+
+
+async def probe_url(url: str, timeout: float = STATION_PROBE_TIMEOUT,
+                    sample_seconds: float = STATION_PROBE_SAMPLE_SECONDS,
+                    stall_threshold: float = STATION_PROBE_STALL_THRESHOLD) -> Dict[str, Any]:
+    """Проверка одного адреса станции
+
+    Подключается, измеряет время до первого байта аудио и в течение
+    sample_seconds считает подвисания (паузы между порциями данных
+    дольше stall_threshold).
+
+    Args:
+        url: Адрес потока
+        timeout: Таймаут подключения и первого байта
+        sample_seconds: Длительность чтения потока
+        stall_threshold: Порог подвисания
+
+    Returns:
+        Словарь ok, ttfb, stalls, bytes, error, checked_at
+    """
+    result = {'ok': False, 'ttfb': None, 'stalls': 0, 'bytes': 0, 'error': None, 'checked_at': time.time()}
+    started = time.monotonic()
+    writer = None
+    try:
+        reader, writer, status, headers = await open_stream_async(url, timeout)
+        if status != 200:
+            result['error'] = f"HTTP {status}"
+            return result
+
+        first = await asyncio.wait_for(reader.read(READ_CHUNK_SIZE), timeout)
+        if not first:
+            result['error'] = 'пустой ответ'
+            return result
+        result['ttfb'] = time.monotonic() - started
+        result['bytes'] = len(first)
+
+        deadline = time.monotonic() + sample_seconds
+        while time.monotonic() < deadline:
+            chunk_started = time.monotonic()
+            try:
+                chunk = await asyncio.wait_for(reader.read(READ_CHUNK_SIZE), max(0.0, deadline - chunk_started) + stall_threshold)
+            except asyncio.TimeoutError:
+                result['stalls'] += 1
+                break
+            if not chunk:
+                result['error'] = 'поток оборвался'
+                return result
+            if time.monotonic() - chunk_started > stall_threshold:
+                result['stalls'] += 1
+            result['bytes'] += len(chunk)
+
+        result['ok'] = True
+        return result
+    except Exception as e:
+        result['error'] = str(e) or type(e).__name__
+        return result
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+class StationHealth:
+    """Таблица здоровья и задержек адресов радиостанций"""
+
+    def __init__(self):
+        self.table: Dict[str, Dict[str, Any]] = {}
+        self.probes = metrics.counter('station_probes')
+        self.probe_failures = metrics.counter('station_probe_failures')
+        self.failovers = metrics.counter('station_mirror_failovers')
+
+    def record(self, url: str, result: Dict[str, Any]) -> None:
+        """Учет результата проверки
+
+        Args:
+            url: Адрес потока
+            result: Результат probe_url
+        """
+        self.probes.inc()
+        entry = self.table.setdefault(url, {'ok': False, 'ttfb': None, 'stalls': 0, 'failures': 0})
+        entry['ok'] = result['ok']
+        entry['checked_at'] = result['checked_at']
+        entry['error'] = result['error']
+        if result['ok']:
+            entry['failures'] = 0
+            entry['stalls'] = result['stalls']
+            if entry['ttfb'] is None:
+                entry['ttfb'] = result['ttfb']
+            else:
+                entry['ttfb'] += TTFB_SMOOTHING * (result['ttfb'] - entry['ttfb'])
+        else:
+            entry['failures'] += 1
+            self.probe_failures.inc()
+
+    def score(self, url: str) -> float:
+        """Оценка адреса: меньше - лучше (бесконечность - неисправен)"""
+        entry = self.table.get(url)
+        if entry is None:
+            return UNKNOWN_SCORE
+        if not entry['ok']:
+            return float('inf')
+        return entry['ttfb'] + entry['stalls'] * STALL_PENALTY
+
+    def find_station(self, url: str, stations: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Станция, которой принадлежит адрес (основной или зеркало)"""
+        for station in stations:
+            if url in station_urls(station):
+                return station
+        return None
+
+    def best_url(self, url: str, stations: Iterable[Dict[str, Any]],
+                 allowed: Optional[Callable[[str], bool]] = None) -> str:
+        """Самый здоровый адрес станции, которой принадлежит url
+
+        Args:
+            url: Любой адрес станции
+            stations: Каталог станций
+            allowed: Дополнительный фильтр адресов (например, автомат станции)
+
+        Returns:
+            Лучший адрес (или исходный, если станция не найдена в каталоге)
+        """
+        station = self.find_station(url, stations)
+        if station is None:
+            return url
+
+        candidates = station_urls(station)
+        if allowed is not None:
+            candidates = [candidate for candidate in candidates if allowed(candidate)] or candidates
+
+        # При равных оценках min оставляет основной адрес
+        best = min(candidates, key=self.score)
+        if best != station['url']:
+            self.failovers.inc()
+        return best
+
+    def rank_stations(self, stations: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Станции от самой здоровой к самой проблемной (по лучшему адресу каждой)"""
+        return sorted(stations, key=lambda station: min(self.score(url) for url in station_urls(station)))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Таблица здоровья: адрес -> ok, ttfb, stalls, failures, checked_at, error"""
+        return {url: dict(entry) for url, entry in self.table.items()}
+
+
+class StationProber:
+    """Фоновая задача, которая регулярно проверяет все адреса всех станций"""
+
+    def __init__(self, health: StationHealth, interval: float = STATION_PROBE_INTERVAL,
+                 concurrency: int = STATION_PROBE_CONCURRENCY):
+        """Инициализация проверяющего
+
+        Args:
+            health: Таблица, в которую записываются результаты
+            interval: Период проверки (в секундах)
+            concurrency: Максимум одновременных проверок
+        """
+        self.health = health
+        self.interval = interval
+        self.concurrency = concurrency
+        self._task = None
+
+    def start(self, stations_provider: Callable[[], Iterable[Dict[str, Any]]]) -> None:
+        """Запускает фоновые проверки, если они еще не запущены
+
+        Args:
+            stations_provider: Функция, возвращающая текущий каталог станций
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(stations_provider))
+
+    async def stop(self) -> None:
+        """Останавливает фоновые проверки"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, stations_provider) -> None:
+        while True:
+            try:
+                await self.probe_all(stations_provider())
+            except Exception as e:
+                print(f"Ошибка при проверке радиостанций: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def probe_all(self, stations: Iterable[Dict[str, Any]]) -> None:
+        """Один проход по всем адресам всех станций"""
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def probe_one(url):
+            async with semaphore:
+                self.health.record(url, await probe_url(url))
+
+        urls = {url for station in stations for url in station_urls(station)}
+        await asyncio.gather(*(probe_one(url) for url in urls))
+
+
+# 🩺 ОБЩАЯ ТАБЛИЦА ЗДОРОВЬЯ СТАНЦИЙ ДЛЯ ВСЕХ СЕРВЕРОВ!!! 🩺
+station_health = StationHealth()
+station_prober = StationProber(station_health)
@@ -0,0 +1,211 @@
+import os
+import time
+import random
+import threading
+from typing import Dict, Any, Optional, Iterable
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ ПЕРЕПОДКЛЮЧЕНИЯ К РАДИО - НЕ ДОЛБИМ УПАВШУЮ СТАНЦИЮ!!! ⚙️
+# Базовая и максимальная задержка между попытками (в секундах)
+RADIO_BACKOFF_BASE = float(os.getenv('RADIO_BACKOFF_BASE', '1'))
+RADIO_BACKOFF_MAX = float(os.getenv('RADIO_BACKOFF_MAX', '60'))
+# Сколько сбоев подряд размыкают автомат станции
+RADIO_BREAKER_THRESHOLD = int(os.getenv('RADIO_BREAKER_THRESHOLD', '3'))
+# Сколько станция отдыхает после размыкания (удваивается при повторных размыканиях)
+RADIO_BREAKER_COOLDOWN = float(os.getenv('RADIO_BREAKER_COOLDOWN', '30'))
+RADIO_BREAKER_MAX_COOLDOWN = float(os.getenv('RADIO_BREAKER_MAX_COOLDOWN', '600'))
+# Поток, проигравший меньше этого времени, считается сбойным (в секундах)
+STREAM_MIN_HEALTHY_SECONDS = float(os.getenv('STREAM_MIN_HEALTHY_SECONDS', '10'))
+
+# Сбои одной станции на разных серверах в пределах этого окна считаются одним сбоем
+FAILURE_DEDUP_SECONDS = 1.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def backoff_delay(attempt: int, base: float = RADIO_BACKOFF_BASE, cap: float = RADIO_BACKOFF_MAX) -> float:
+    """Экспоненциальная задержка со случайным разбросом
+
+    Половина задержки фиксирована, половина случайна - серверы,
+    потерявшие станцию одновременно, не переподключаются все разом.
+
+    Args:
+        attempt: Номер попытки (с 0)
+        base: Задержка первой попытки
+        cap: Максимальная задержка
+
+    Returns:
+        Задержка в секундах
+    """
+    delay = min(cap, base * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Автомат одной станции: closed -> open (после серии сбоев) -> half_open (одна пробная попытка)"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.opened_at = 0.0
+        self.cooldown = RADIO_BREAKER_COOLDOWN
+        self.last_failure_at = 0.0
+        self.trial_started_at = 0.0
+
+    def allow(self) -> bool:
+        """Можно ли сейчас подключаться к станции"""
+        now = time.monotonic()
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if now - self.opened_at < self.cooldown:
+                return False
+            self.state = HALF_OPEN
+            self.trial_started_at = now
+            return True
+        # Пробная попытка уже идет; если она зависла, разрешаем новую
+        if now - self.trial_started_at >= self.cooldown:
+            self.trial_started_at = now
+            return True
+        return False
+
+    def available(self) -> bool:
+        """Разрешит ли автомат подключение (без перехода в half_open)"""
+        now = time.monotonic()
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        if self.state == HALF_OPEN:
+            return now - self.trial_started_at >= self.cooldown
+        return True
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.cooldown = RADIO_BREAKER_COOLDOWN
+
+    def record_failure(self) -> bool:
+        """Учет сбоя
+
+        Returns:
+            True, если автомат разомкнулся из-за этого сбоя
+        """
+        now = time.monotonic()
+        if self.state == HALF_OPEN:
+            # Пробная попытка не удалась - отдыхаем вдвое дольше
+            self.cooldown = min(RADIO_BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+            self._open(now)
+            return True
+
+        if now - self.last_failure_at < FAILURE_DEDUP_SECONDS:
+            return False
+        self.last_failure_at = now
+        self.failures += 1
+
+        if self.state == CLOSED and self.failures >= RADIO_BREAKER_THRESHOLD:
+            self._open(now)
+            return True
+        return False
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.trips += 1
+
+    def retry_delay(self) -> float:
+        """Задержка перед следующей попыткой (0, если сбоев не было)"""
+        if self.failures == 0:
+            return 0.0
+        return backoff_delay(self.failures - 1)
+
+
+class StreamCircuitBreakers:
+    """Автоматы всех станций - общие для всех серверов процесса"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+        self.failures = metrics.counter('radio_stream_failures')
+        self.trips = metrics.counter('radio_breaker_trips')
+        self.fallbacks = metrics.counter('radio_fallbacks')
+
+    def _get(self, url: str) -> CircuitBreaker:
+        breaker = self._breakers.get(url)
+        if breaker is None:
+            breaker = CircuitBreaker(url)
+            self._breakers[url] = breaker
+        return breaker
+
+    def allow(self, url: str) -> bool:
+        """Можно ли подключаться к станции
+
+        Args:
+            url: Ссылка на поток станции
+        """
+        with self._lock:
+            return self._get(url).allow()
+
+    def available(self, url: str) -> bool:
+        """Можно ли подключаться к станции (проверка без побочных эффектов, для выбора зеркала)"""
+        with self._lock:
+            return self._get(url).available()
+
+    def record_success(self, url: str) -> None:
+        """Станция успешно заиграла (вызывается из любого потока)"""
+        with self._lock:
+            self._get(url).record_success()
+
+    def record_failure(self, url: str) -> None:
+        """Сбой станции (вызывается из любого потока)"""
+        with self._lock:
+            tripped = self._get(url).record_failure()
+        self.failures.inc()
+        if tripped:
+            self.trips.inc()
+            print(f"⚡ Станция {url} временно отключена после серии сбоев")
+
+    def retry_delay(self, url: str) -> float:
+        """Задержка перед следующей попыткой подключения к станции"""
+        with self._lock:
+            return self._get(url).retry_delay()
+
+    def pick_fallback(self, url: str, stations: Iterable[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Выбор резервной станции, автомат которой разрешает подключение
+
+        Args:
+            url: Ссылка на недоступную станцию
+            stations: Все станции (словари с url, name, thumbnail)
+
+        Returns:
+            Резервная станция или None, если доступных нет
+        """
+        for station in stations:
+            # Зеркала той же станции не подходят - она уже признана недоступной
+            if url == station['url'] or url in station.get('mirrors', []):
+                continue
+            if self.allow(station['url']):
+                self.fallbacks.inc()
+                return station
+        return None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Состояние автоматов
+
+        Returns:
+            Словарь ссылка станции -> {state, failures, trips}
+        """
+        with self._lock:
+            return {
+                url: {'state': breaker.state, 'failures': breaker.failures, 'trips': breaker.trips}
+                for url, breaker in self._breakers.items()
+            }
+
+
+# ⚡ ОБЩИЕ АВТОМАТЫ СТАНЦИЙ ДЛЯ ВСЕХ СЕРВЕРОВ!!! ⚡
+stream_breakers = StreamCircuitBreakers()
@@ -0,0 +1,140 @@
+import ssl
+import socket
+import asyncio
+from typing import Dict, Any, List, Tuple
+from urllib.parse import urlparse, urljoin
+
+# Голые соединения вместо HTTP-клиента: серверы SHOUTcast отвечают строкой
+# "ICY 200 OK", которую обычные клиенты не принимают. Здесь общая часть для
+# чтения станции ботом (icy_ingest, в потоке) и проверки станций
+# (station_health, в цикле событий): запрос, заголовки ответа, перенаправления.
+
+MAX_REDIRECTS = 3
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def _request(url: str, icy_metadata: bool) -> Tuple[str, int, bool, bytes]:
+    """Адрес сервера и байты GET-запроса потока
+
+    Returns:
+        Кортеж (хост, порт, https, запрос)
+    """
+    parsed = urlparse(url)
+    secure = parsed.scheme == 'https'
+    port = parsed.port or (443 if secure else 80)
+    path = parsed.path or '/'
+    if parsed.query:
+        path += '?' + parsed.query
+
+    request = (
+        f"GET {path} HTTP/1.0\r\n"
+        f"Host: {parsed.netloc}\r\n"
+        f"User-Agent: RadioVecher/1.0\r\n"
+        f"Icy-MetaData: {int(icy_metadata)}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode()
+    return parsed.hostname, port, secure, request
+
+
+def _is_head_end(line: bytes) -> bool:
+    return line in (b'\r\n', b'\n', b'')
+
+
+def parse_response_head(lines: List[bytes]) -> Tuple[int, Dict[str, str]]:
+    """Разбор строки статуса и заголовков ответа
+
+    Args:
+        lines: Строка статуса ("HTTP/1.0 200 OK" или "ICY 200 OK") и строки заголовков
+
+    Returns:
+        Кортеж (статус, заголовки с именами в нижнем регистре); статус 0, если строка не разобрана
+    """
+    parts = lines[0].decode('latin-1').split() if lines else []
+    status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def _redirect(url: str, status: int, headers: Dict[str, str]) -> str:
+    """Адрес перенаправления или пустая строка, если ответ окончательный"""
+    if status in REDIRECT_STATUSES and headers.get('location'):
+        return urljoin(url, headers['location'])
+    return ''
+
+
+def open_stream(url: str, timeout: float, icy_metadata: bool = False) -> Tuple[socket.socket, Any, int, Dict[str, str]]:
+    """Открывает поток в блокирующем сокете, проходя перенаправления
+
+    Args:
+        url: Адрес потока
+        timeout: Таймаут подключения и чтения
+        icy_metadata: Просить сервер вставлять в поток названия песен (icy-metaint)
+
+    Returns:
+        Кортеж (сокет, файл для чтения, статус, заголовки) окончательного ответа
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        host, port, secure, request = _request(url, icy_metadata)
+        sock = socket.create_connection((host, port), timeout=timeout)
+        try:
+            if secure:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            sock.sendall(request)
+            reader = sock.makefile('rb')
+
+            lines = [reader.readline()]
+            while not _is_head_end(lines[-1]):
+                lines.append(reader.readline())
+            status, headers = parse_response_head(lines[:-1])
+        except Exception:
+            sock.close()
+            raise
+
+        location = _redirect(url, status, headers)
+        if not location:
+            break
+        sock.close()
+        url = location
+    return sock, reader, status, headers
+
+
+async def open_stream_async(url: str, timeout: float,
+                            icy_metadata: bool = False) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter, int, Dict[str, str]]:
+    """Открывает поток на потоках asyncio, проходя перенаправления
+
+    Args:
+        url: Адрес потока
+        timeout: Таймаут подключения и каждой строки заголовков
+        icy_metadata: Просить сервер вставлять в поток названия песен (icy-metaint)
+
+    Returns:
+        Кортеж (reader, writer, статус, заголовки) окончательного ответа
+    """
+    for _ in range(MAX_REDIRECTS + 1):
+        host, port, secure, request = _request(url, icy_metadata)
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=ssl.create_default_context() if secure else None),
+            timeout
+        )
+        try:
+            writer.write(request)
+            await writer.drain()
+
+            lines = [await asyncio.wait_for(reader.readline(), timeout)]
+            while not _is_head_end(lines[-1]):
+                lines.append(await asyncio.wait_for(reader.readline(), timeout))
+            status, headers = parse_response_head(lines[:-1])
+        except BaseException:
+            writer.close()
+            raise
+
+        location = _redirect(url, status, headers)
+        if not location:
+            break
+        writer.close()
+        url = location
+    return reader, writer, status, headers
@@ -0,0 +1,73 @@
+import asyncio
+import os
+
+import pytest
+
+import audio_cache
+from audio_cache import AudioCache, TEMP_PREFIX
+from track_record import TrackRecord
+
+
+def track(video_id):
+    return TrackRecord(webpage_url=f'https://www.youtube.com/watch?v={video_id}', source='youtube')
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    def download(video_id, directory):
+        path = os.path.join(directory, f'{TEMP_PREFIX}{video_id}.webm')
+        with open(path, 'wb') as file:
+            file.write(b'x' * 600)
+        return {'path': path, 'acodec': 'opus', 'ext': 'webm'}
+
+    monkeypatch.setattr(audio_cache, '_download', download)
+    return AudioCache(str(tmp_path), max_bytes=1000, min_plays=2)
+
+
+async def play(cache, video_id):
+    cache.record_play(track(video_id))
+    # Учет и загрузка идут фоновой задачей - ждем ее
+    await asyncio.gather(*(asyncio.all_tasks() - {asyncio.current_task()}))
+
+
+def test_track_is_cached_after_min_plays(cache, tmp_path):
+    async def scenario():
+        await play(cache, 'aaaaaaaaaaa')
+        assert await cache.local_path(track('aaaaaaaaaaa')) is None
+        await play(cache, 'aaaaaaaaaaa')
+        return await cache.lookup(track('aaaaaaaaaaa'))
+
+    found = asyncio.run(scenario())
+
+    assert found == {'path': str(tmp_path / 'aaaaaaaaaaa.webm'), 'acodec': 'opus'}
+
+
+def test_eviction_keeps_row_until_file_is_removed(cache, monkeypatch):
+    real_remove = os.remove
+    locked = {'aaaaaaaaaaa.webm'}
+
+    def remove(path):
+        if os.path.basename(path) in locked:
+            raise PermissionError('файл открыт')
+        real_remove(path)
+
+    monkeypatch.setattr(audio_cache.os, 'remove', remove)
+
+    async def fill(video_id):
+        await play(cache, video_id)
+        await play(cache, video_id)
+
+    asyncio.run(fill('aaaaaaaaaaa'))
+    asyncio.run(fill('bbbbbbbbbbb'))
+
+    # Файл первого трека не удалился - он остается в индексе, вытесняется следующий по порядку
+    assert asyncio.run(cache.local_path(track('aaaaaaaaaaa')))
+    assert asyncio.run(cache.local_path(track('bbbbbbbbbbb'))) is None
+    assert cache.stats()['bytes'] == 600
+
+    locked.clear()
+    asyncio.run(fill('ccccccccccc'))
+
+    assert asyncio.run(cache.local_path(track('aaaaaaaaaaa'))) is None
+    assert asyncio.run(cache.local_path(track('ccccccccccc')))
+    assert cache.stats()['bytes'] == 600
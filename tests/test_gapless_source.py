@@ -0,0 +1,128 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from audio_sources import GaplessSource
+from music_player import MusicPlayer
+from pcm_dsp import FRAME_SIZE
+from track_record import TrackRecord
+
+
+class FakePCMSource(discord.AudioSource):
+    """PCM-источник на заданное число кадров постоянного уровня"""
+
+    def __init__(self, frames, level):
+        self.remaining = frames
+        self.frame = (level & 0xFFFF).to_bytes(2, 'little', signed=False) * (FRAME_SIZE // 2)
+        self.cleaned_up = False
+
+    def read(self):
+        if self.remaining <= 0:
+            return b''
+        self.remaining -= 1
+        return self.frame
+
+    def is_opus(self):
+        return False
+
+    def cleanup(self):
+        self.cleaned_up = True
+
+
+def play_through(source):
+    frames = []
+    while True:
+        data = source.read()
+        if not data:
+            return frames
+        frames.append(data)
+
+
+def test_crossfade_reports_first_frame_of_each_track():
+    events = []
+    outgoing = FakePCMSource(10, 1000)
+    incoming = FakePCMSource(20, 2000)
+    source = GaplessSource(
+        outgoing,
+        {'title': 'first', 'duration': 0.2},
+        on_transition=lambda track: events.append(('transition', track['title'])),
+        on_first_frame=lambda: events.append(('first_frame', source.track_info['title'])),
+        crossfade_seconds=0.1
+    )
+    source.prepare_next(incoming, {'title': 'second', 'duration': 0.4})
+
+    frames = play_through(source)
+
+    assert events == [
+        ('first_frame', 'first'),
+        ('transition', 'second'),
+        ('first_frame', 'second'),
+    ]
+    assert outgoing.cleaned_up
+    assert source.track_info['title'] == 'second'
+    assert source.finished
+    # Последние кадры уходящего трека смешаны с началом входящего - общая длина меньше суммы
+    assert len(frames) < 30
+    assert frames[-1] == incoming.frame
+
+
+def test_hard_cut_reports_first_frame_of_each_track():
+    events = []
+    source = GaplessSource(
+        FakePCMSource(3, 1000),
+        {'title': 'first', 'duration': 0.06},
+        on_transition=lambda track: events.append(('transition', track['title'])),
+        on_first_frame=lambda: events.append(('first_frame', source.track_info['title']))
+    )
+    source.prepare_next(FakePCMSource(3, 2000), {'title': 'second', 'duration': 0.06})
+
+    assert len(play_through(source)) == 6
+    assert events == [
+        ('first_frame', 'first'),
+        ('transition', 'second'),
+        ('first_frame', 'second'),
+    ]
+
+
+def test_stopped_source_refuses_prepared_track():
+    source = GaplessSource(FakePCMSource(10, 1000), {'title': 'first', 'duration': 0.2})
+    # Пропуск: подготовленного трека еще нет, обертка закрывается
+    assert source.take_next() is None
+    source.cleanup()
+
+    late = FakePCMSource(10, 2000)
+    assert not source.prepare_next(late, {'title': 'second'})
+
+    assert late.cleaned_up
+    assert source.next_source is None
+    assert source.next_track is None
+
+
+def test_prewarm_returns_track_to_queue_when_source_stopped_meanwhile(monkeypatch):
+    player = MusicPlayer(SimpleNamespace(), 1)
+    source = GaplessSource(FakePCMSource(10, 1000), {'title': 'first', 'duration': 0.2})
+    player.source = source
+    queued = TrackRecord(title='second', url='https://media.example/second.webm', source='youtube')
+    player.queue.append(queued)
+    created = []
+
+    async def needs_prefetch(track_info, margin=0):
+        return False
+
+    async def create_track_source(track_info, start_at=0.0):
+        # Пока FFmpeg следующего трека запускался, пользователь пропустил текущий
+        player.source = None
+        source.take_next()
+        source.cleanup()
+        created.append(FakePCMSource(10, 2000))
+        return created[-1]
+
+    monkeypatch.setattr(player, '_needs_prefetch', needs_prefetch)
+    monkeypatch.setattr(player, '_create_track_source', create_track_source)
+
+    asyncio.run(player._gapless_prewarm_loop(source))
+
+    assert list(player.queue) == [queued]
+    assert created[0].cleaned_up
+    assert source.next_track is None
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import wavelink
+
+import lavalink_player
+from lavalink_player import LavalinkPlayer
+
+
+class FakeTrack:
+    def __init__(self, title):
+        self.title = title
+        self.uri = f'https://www.youtube.com/watch?v={title}'
+        self.artwork = None
+        self.length = 180000
+        self.encoded = f'encoded-{title}'
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+
+    async def search(query):
+        calls.append(query)
+        await asyncio.sleep(0.01)
+        return [FakeTrack('dQw4w9WgXcQ')]
+
+    monkeypatch.setattr(wavelink.Playable, 'search', search)
+    monkeypatch.setattr(lavalink_player, 'lavalink_cache', lavalink_player.ResolverCache())
+    return calls
+
+
+def test_same_query_from_two_guilds_searches_once(searches):
+    first = LavalinkPlayer(SimpleNamespace(), 1)
+    second = LavalinkPlayer(SimpleNamespace(), 2)
+
+    async def resolve_both():
+        return await asyncio.gather(
+            first._resolve_query('never gonna give you up', 'youtube'),
+            second._resolve_query('Never  Gonna Give You Up', 'youtube')
+        )
+
+    (records_a, playlist_a), (records_b, playlist_b) = asyncio.run(resolve_both())
+
+    assert searches == ['never gonna give you up']
+    assert not playlist_a and not playlist_b
+    assert records_a[0]['encoded'] == records_b[0]['encoded'] == 'encoded-dQw4w9WgXcQ'
+    # Записи независимы: предзагрузка меняет их на месте
+    assert records_a[0] is not records_b[0]
+
+
+def test_repeated_query_is_served_from_cache(searches):
+    player = LavalinkPlayer(SimpleNamespace(), 1)
+
+    asyncio.run(player._resolve_query('never gonna give you up', 'youtube'))
+    records, is_playlist = asyncio.run(player._resolve_query('never gonna give you up', 'youtube'))
+
+    assert searches == ['never gonna give you up']
+    assert not is_playlist
+    assert records[0]['title'] == 'dQw4w9WgXcQ'
+
+
+def test_playlists_are_not_cached(searches, monkeypatch):
+    playlist = wavelink.Playlist.__new__(wavelink.Playlist)
+    playlist.tracks = [FakeTrack('a'), FakeTrack('b')]
+
+    async def search(query):
+        searches.append(query)
+        return playlist
+
+    monkeypatch.setattr(wavelink.Playable, 'search', search)
+    player = LavalinkPlayer(SimpleNamespace(), 1)
+    url = 'https://www.youtube.com/playlist?list=PL123'
+
+    for _ in range(2):
+        records, is_playlist = asyncio.run(player._resolve_query(url, 'youtube'))
+        assert is_playlist
+        assert [record['title'] for record in records] == ['a', 'b']
+
+    assert searches == [url, url]
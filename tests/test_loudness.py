@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+import loudness
+from loudness import LoudnessAnalyzer, LoudnessIndex
+from track_record import TrackRecord
+
+VIDEO_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LoudnessIndex(str(tmp_path / 'loudness.db'))
+
+
+def test_database_opens_on_first_use(index, tmp_path):
+    assert not (tmp_path / 'loudness.db').exists()
+
+    asyncio.run(index.store('dQw4w9WgXcQ', -20.0, -3.0))
+
+    assert (tmp_path / 'loudness.db').exists()
+    assert asyncio.run(index.lookup('dQw4w9WgXcQ')) == {'integrated': -20.0, 'true_peak': -3.0}
+
+
+def test_gain_for_reads_index(index):
+    asyncio.run(index.store('dQw4w9WgXcQ', -20.0, -3.0))
+    analyzer = LoudnessAnalyzer(index)
+    track = TrackRecord(webpage_url=VIDEO_URL, source='youtube')
+
+    gain = asyncio.run(analyzer.gain_for(track))
+
+    # До -14 LUFS не хватает 6 дБ, но истинный пик позволяет поднять только до -1 dBTP
+    assert gain == pytest.approx(2.0)
+    assert track['loudness'] == -20.0
+
+
+def test_indexed_track_is_not_analyzed_again(index, monkeypatch):
+    asyncio.run(index.store('dQw4w9WgXcQ', -20.0, -3.0))
+    analyzer = LoudnessAnalyzer(index)
+
+    async def no_ffmpeg(*args, **kwargs):
+        raise AssertionError('FFmpeg не должен запускаться')
+
+    monkeypatch.setattr(loudness.asyncio, 'create_subprocess_exec', no_ffmpeg)
+
+    async def schedule_and_wait():
+        analyzer.schedule(TrackRecord(webpage_url=VIDEO_URL, source='youtube'), VIDEO_URL)
+        while analyzer._pending:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(schedule_and_wait())
+    assert analyzer.failures.value == 0
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import music_player
+from match_index import SpotifyMatchIndex
+from track_record import TrackRecord
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = SpotifyMatchIndex(str(tmp_path / 'matches.db'))
+    monkeypatch.setattr(music_player, 'match_index', index)
+    return index
+
+
+def test_database_opens_on_first_use(index, tmp_path):
+    assert not (tmp_path / 'matches.db').exists()
+
+    asyncio.run(index.store('sp1', 'ISRC1', 'dQw4w9WgXcQ', 212.0))
+
+    assert (tmp_path / 'matches.db').exists()
+    assert asyncio.run(index.lookup('sp1')) == {'video_id': 'dQw4w9WgXcQ', 'duration': 212.0}
+
+
+def test_invalidate_drops_isrc_matches_too(index):
+    asyncio.run(index.store('sp1', 'ISRC1', 'dQw4w9WgXcQ'))
+
+    asyncio.run(index.invalidate('sp2', 'ISRC1'))
+
+    assert asyncio.run(index.lookup('sp2', 'ISRC1')) is None
+    assert asyncio.run(index.lookup('sp1')) is None
+    assert index.stats()['invalidated'] == 1
+
+
+def test_unavailable_indexed_match_is_searched_again(index, monkeypatch):
+    asyncio.run(index.store('sp1', 'ISRC1', 'deadVideo01'))
+    searched = []
+
+    async def get_youtube_track_info(self, query):
+        searched.append(query)
+        if 'deadVideo01' in query:
+            return None
+        return TrackRecord(
+            id='freshVideo1',
+            url='https://media.example/fresh.webm',
+            webpage_url='https://www.youtube.com/watch?v=freshVideo1',
+            duration=200.0,
+            acodec='opus',
+            source='youtube'
+        )
+
+    monkeypatch.setattr(music_player.MusicPlayer, '_get_youtube_track_info', get_youtube_track_info)
+    player = music_player.MusicPlayer(SimpleNamespace(), 1)
+    spotify_info = TrackRecord(spotify_id='sp1', isrc='ISRC1', title='Song', artist='Artist', source='spotify')
+
+    async def match_and_prefetch():
+        track_info = await player._match_spotify_track(spotify_info)
+        await player._prefetch_entry(track_info)
+        return track_info
+
+    track_info = asyncio.run(match_and_prefetch())
+
+    assert searched == ['https://www.youtube.com/watch?v=deadVideo01', 'Song Artist']
+    assert track_info['url'] == 'https://media.example/fresh.webm'
+    assert asyncio.run(index.lookup('sp1'))['video_id'] == 'freshVideo1'
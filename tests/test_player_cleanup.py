@@ -0,0 +1,33 @@
+import asyncio
+from types import SimpleNamespace
+
+import metrics
+from music_player import EXTRACTION_POOL, MusicPlayer
+from transition_timing import TransitionSpan
+
+
+def test_cleanup_forgets_guild_extraction_limiter():
+    player = MusicPlayer(SimpleNamespace(), 42)
+
+    async def extract_then_release():
+        EXTRACTION_POOL._get_guild_slots(42)
+        assert 42 in EXTRACTION_POOL._guild_slots
+        return await player.cleanup()
+
+    assert asyncio.run(extract_then_release()) == 0
+    assert 42 not in EXTRACTION_POOL._guild_slots
+
+
+def test_cleanup_forgets_guild_transition_histograms():
+    player = MusicPlayer(SimpleNamespace(), 43)
+    other = TransitionSpan(430)
+    for span in (TransitionSpan(43), other):
+        span.mark('first_frame')
+        span.finish()
+    assert metrics.snapshot_prefix('transition.guild.43.')
+
+    asyncio.run(player.cleanup())
+
+    assert metrics.snapshot_prefix('transition.guild.43.') == {}
+    assert metrics.snapshot_prefix('transition.guild.430.')
+    assert metrics.histogram('transition.total').snapshot()['count'] >= 2
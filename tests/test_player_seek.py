@@ -0,0 +1,27 @@
+import asyncio
+from types import SimpleNamespace
+
+from music_player import MusicPlayer
+from track_record import TrackRecord
+
+
+def suspended_player(duration):
+    player = MusicPlayer(SimpleNamespace(), 7)
+    player.voice_client = SimpleNamespace()
+    player._suspended = (TrackRecord(webpage_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+                                     source='youtube', duration=duration), 10.0)
+    return player
+
+
+def test_seek_reports_position_clamped_to_duration():
+    player = suspended_player(duration=120)
+
+    assert asyncio.run(player.seek(500)) == 119
+    assert player._suspended[1] == 119
+    assert asyncio.run(player.seek(-5)) == 0.0
+
+
+def test_seek_without_track_returns_none():
+    player = MusicPlayer(SimpleNamespace(), 7)
+
+    assert asyncio.run(player.seek(30)) is None
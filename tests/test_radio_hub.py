@@ -0,0 +1,90 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import radio_hub
+from audio_sources import FRAME_DURATION
+from music_player import MusicPlayer
+
+STATION_URL = 'http://radio.example/stream'
+
+
+class FakeStationSource:
+    """Вместо FFmpeg: отдает кадры тишины в реальном темпе"""
+
+    def __init__(self, options):
+        self.options = options
+        self.closed = False
+
+    def read(self):
+        time.sleep(FRAME_DURATION)
+        return b'' if self.closed else radio_hub.OPUS_SILENCE
+
+    def cleanup(self):
+        self.closed = True
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    started = []
+
+    def start(options):
+        source = FakeStationSource(options)
+        started.append(source)
+        return source
+
+    monkeypatch.setattr(radio_hub, 'create_icy_source',
+                        lambda url, on_title, options, bitrate: start(options))
+    monkeypatch.setattr(radio_hub, 'create_opus_source',
+                        lambda url, codec, bitrate, before_options, options: start(options))
+    hub = radio_hub.RadioBroadcastHub()
+    hub.started = started
+    yield hub
+    for station in list(hub.stations.values()):
+        for subscriber in list(station.subscribers):
+            hub.unsubscribe(subscriber)
+
+
+def make_player(guild_id, volume):
+    player = MusicPlayer(SimpleNamespace(), guild_id)
+    asyncio.run(player.set_volume(volume))
+    return player
+
+
+def subscribe(hub, player):
+    return hub.subscribe(STATION_URL, '', '-vn', 128, volume_filter=player._volume_filter())
+
+
+def test_default_volume_guilds_share_one_process(hub):
+    first = make_player(1, 50)
+    second = make_player(2, 50)
+
+    subscribe(hub, first)
+    subscribe(hub, second)
+
+    assert len(hub.started) == 1
+    assert hub.stats() == {STATION_URL: 2}
+    assert '-af volume=-6.02dB' in hub.started[0].options
+
+
+def test_each_volume_gets_its_own_broadcast(hub):
+    subscribe(hub, make_player(1, 50))
+    subscribe(hub, make_player(2, 100))
+
+    assert len(hub.started) == 2
+    assert hub.stats() == {STATION_URL: 2}
+    assert hub.started[1].options == '-vn'
+
+
+def test_last_unsubscribe_stops_only_its_broadcast(hub):
+    quiet = subscribe(hub, make_player(1, 50))
+    loud = subscribe(hub, make_player(2, 100))
+
+    hub.unsubscribe(quiet)
+
+    assert list(hub.stations) == [(STATION_URL, '')]
+    assert hub.stats() == {STATION_URL: 1}
+    hub.unsubscribe(loud)
+    assert hub.stations == {}
@@ -0,0 +1,205 @@
+import asyncio
+import time
+
+from aiohttp import ClientSession, web
+
+from rest_scheduler import (
+    PRIORITY_COSMETIC, PRIORITY_INTERACTION, PRIORITY_NOW_PLAYING, RestScheduler, route_key
+)
+
+
+class FakeDiscord:
+    """Локальный сервер с лимитами в стиле Discord
+
+    У каждого канала свой лимит (limit запросов за window секунд) с
+    заголовками X-RateLimit-*; запрос в исчерпанный лимит получает 429.
+    global_429 - сколько следующих запросов к каналам получат глобальный 429.
+    """
+
+    def __init__(self, limit=5, window=1.0, retry_after=0.4):
+        self.limit = limit
+        self.window = window
+        self.retry_after = retry_after
+        self.global_429 = 0
+        self.buckets = {}
+        self.arrivals = []
+        self.rejected = []
+        self.url = None
+
+    async def handle(self, request):
+        now = time.monotonic()
+        label = request.query.get('label', request.path)
+        self.arrivals.append((label, now))
+
+        if request.path.startswith('/api/v10/interactions/'):
+            return web.json_response({'label': label})
+
+        if self.global_429:
+            self.global_429 -= 1
+            self.rejected.append(label)
+            return web.json_response({'global': True}, status=429, headers={
+                'Retry-After': str(self.retry_after),
+                'X-RateLimit-Global': 'true',
+                'X-RateLimit-Scope': 'global',
+            })
+
+        channel = request.match_info['channel']
+        remaining, reset_at = self.buckets.get(channel, (self.limit, 0.0))
+        if now >= reset_at:
+            remaining, reset_at = self.limit, now + self.window
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Bucket': 'messages',
+            'X-RateLimit-Reset-After': f'{reset_at - now:.3f}',
+        }
+        if remaining == 0:
+            self.rejected.append(label)
+            headers.update({'X-RateLimit-Remaining': '0', 'Retry-After': f'{reset_at - now:.3f}'})
+            return web.json_response({'global': False}, status=429, headers=headers)
+
+        remaining -= 1
+        self.buckets[channel] = (remaining, reset_at)
+        headers['X-RateLimit-Remaining'] = str(remaining)
+        return web.json_response({'label': label}, headers=headers)
+
+    def arrived(self, label):
+        return next(at for name, at in self.arrivals if name == label)
+
+    def order(self):
+        return [name for name, _ in self.arrivals]
+
+
+async def run_with_discord(fake, scenario, concurrency=4, reserve=1):
+    app = web.Application()
+    app.router.add_route('*', '/api/v10/channels/{channel}/messages', fake.handle)
+    app.router.add_route('*', '/api/v10/interactions/{id}/{token}/callback', fake.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    fake.url = f'http://127.0.0.1:{port}/api/v10'
+
+    scheduler = RestScheduler(concurrency=concurrency, reserve=reserve)
+    try:
+        async with ClientSession(trace_configs=[scheduler.trace_config()]) as session:
+            def job(path, label, method='POST', priority=PRIORITY_COSMETIC, key=None):
+                url = f'{fake.url}{path}'
+
+                async def request():
+                    async with session.request(method, url, params={'label': label}) as response:
+                        return response.status, (await response.json()).get('label')
+
+                return scheduler.submit(request, priority, route_key(method, url)[0], key)
+
+            await scenario(scheduler, job)
+    finally:
+        await runner.cleanup()
+
+
+def hold_worker(scheduler):
+    """Занимает единственный слот планировщика, пока не будет установлено событие"""
+    release = asyncio.Event()
+
+    async def blocker():
+        await release.wait()
+
+    return scheduler.submit(blocker, PRIORITY_INTERACTION), release
+
+
+def test_exhausted_bucket_waits_for_reset_while_other_routes_proceed():
+    fake = FakeDiscord(limit=1, window=0.4)
+
+    async def scenario(scheduler, job):
+        await job('/channels/1/messages', 'first')
+        started = time.monotonic()
+        held = job('/channels/1/messages', 'held')
+        other = job('/channels/2/messages', 'other')
+
+        assert await other == (200, 'other')
+        assert time.monotonic() - started < 0.2
+        assert await held == (200, 'held')
+
+    asyncio.run(run_with_discord(fake, scenario))
+
+    assert fake.rejected == []
+    assert fake.arrived('other') < fake.arrived('held')
+    assert fake.arrived('held') - fake.arrived('first') >= 0.35
+
+
+def test_interaction_overtakes_queued_cosmetic_jobs():
+    fake = FakeDiscord(limit=50)
+
+    async def scenario(scheduler, job):
+        blocker, release = hold_worker(scheduler)
+        await asyncio.sleep(0)
+        cosmetic = [job(f'/channels/{n}/messages', f'cosmetic-{n}') for n in range(3)]
+        now_playing = job('/channels/7/messages', 'now-playing', priority=PRIORITY_NOW_PLAYING)
+        answer = job('/interactions/1/token/callback', 'answer', priority=PRIORITY_INTERACTION)
+        release.set()
+        await asyncio.gather(blocker, answer, now_playing, *cosmetic)
+
+    asyncio.run(run_with_discord(fake, scenario, concurrency=1))
+
+    assert fake.order() == ['answer', 'now-playing', 'cosmetic-0', 'cosmetic-1', 'cosmetic-2']
+
+
+def test_keyed_job_replaces_unsent_predecessor():
+    fake = FakeDiscord(limit=50)
+
+    async def scenario(scheduler, job):
+        blocker, release = hold_worker(scheduler)
+        await asyncio.sleep(0)
+        stale = job('/channels/3/messages', 'panel-old', method='PATCH', key='admin_panel')
+        fresh = job('/channels/3/messages', 'panel-new', method='PATCH', key='admin_panel')
+        release.set()
+        await blocker
+
+        assert await stale == (200, 'panel-new')
+        assert await fresh == (200, 'panel-new')
+        assert stale is fresh
+
+    asyncio.run(run_with_discord(fake, scenario, concurrency=1))
+
+    assert fake.order() == ['panel-new']
+
+
+def test_cosmetic_jobs_leave_reserve_for_interactions():
+    fake = FakeDiscord(limit=3, window=0.5)
+
+    async def scenario(scheduler, job):
+        await job('/channels/4/messages', 'cosmetic-1')
+        await job('/channels/4/messages', 'cosmetic-2')
+        # В лимите остался один запрос - это запас, косметика его не трогает
+        deferred = job('/channels/4/messages', 'cosmetic-3')
+        await asyncio.sleep(0.1)
+        urgent = job('/channels/4/messages', 'vote-reply', priority=PRIORITY_INTERACTION)
+
+        assert await urgent == (200, 'vote-reply')
+        assert await deferred == (200, 'cosmetic-3')
+
+    asyncio.run(run_with_discord(fake, scenario, reserve=1))
+
+    assert fake.rejected == []
+    assert fake.order() == ['cosmetic-1', 'cosmetic-2', 'vote-reply', 'cosmetic-3']
+    assert fake.arrived('cosmetic-3') - fake.arrived('cosmetic-1') >= 0.45
+
+
+def test_global_429_stalls_everything_but_interactions():
+    fake = FakeDiscord(limit=50, retry_after=0.4)
+
+    async def scenario(scheduler, job):
+        fake.global_429 = 1
+        assert await job('/channels/5/messages', 'limited') == (429, None)
+
+        stalled = job('/channels/6/messages', 'stalled', priority=PRIORITY_NOW_PLAYING)
+        answer = job('/interactions/2/token/callback', 'answer', priority=PRIORITY_COSMETIC)
+
+        assert await answer == (200, 'answer')
+        assert not stalled.done()
+        assert await stalled == (200, 'stalled')
+
+    asyncio.run(run_with_discord(fake, scenario))
+
+    assert fake.order() == ['limited', 'answer', 'stalled']
+    assert fake.arrived('stalled') - fake.arrived('limited') >= 0.35
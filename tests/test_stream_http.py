@@ -0,0 +1,111 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from icy_ingest import IcyStream
+from station_health import probe_url
+from stream_http import open_stream, open_stream_async, parse_response_head
+
+METAINT = 8
+AUDIO = b'abcdefgh' * 4
+TITLE_BLOCK = b"StreamTitle='Artist - Song';".ljust(32, b'\x00')
+
+
+def icy_body():
+    # Метаданные после каждых METAINT байт аудио: длина блока в единицах по 16 байт и сам блок
+    body = b''
+    for offset in range(0, len(AUDIO), METAINT):
+        body += AUDIO[offset:offset + METAINT]
+        body += bytes([len(TITLE_BLOCK) // 16]) + TITLE_BLOCK if offset == 0 else b'\x00'
+    return body
+
+
+@pytest.fixture
+def station():
+    """SHOUTcast-подобный сервер: /old перенаправляет на /live, /live отвечает "ICY 200 OK" """
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    requests = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                head = b''
+                while b'\r\n\r\n' not in head:
+                    chunk = conn.recv(1024)
+                    if not chunk:
+                        break
+                    head += chunk
+                requests.append(head.decode('latin-1'))
+                if head.startswith(b'GET /old'):
+                    conn.sendall(b'HTTP/1.0 302 Found\r\nLocation: /live\r\n\r\n')
+                elif b'Icy-MetaData: 1' in head:
+                    conn.sendall(b'ICY 200 OK\r\nicy-metaint: %d\r\n\r\n' % METAINT + icy_body())
+                else:
+                    conn.sendall(b'ICY 200 OK\r\nicy-name: Test\r\n\r\n' + AUDIO)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{port}', requests
+    server.close()
+
+
+def test_parse_response_head_accepts_icy_status_line():
+    status, headers = parse_response_head([b'ICY 200 OK\r\n', b'icy-metaint: 16000\r\n', b'Content-Type:audio/mpeg\r\n'])
+
+    assert status == 200
+    assert headers == {'icy-metaint': '16000', 'content-type': 'audio/mpeg'}
+
+
+def test_open_stream_follows_redirect(station):
+    base, requests = station
+
+    sock, reader, status, headers = open_stream(base + '/old', 5)
+    with sock:
+        assert status == 200
+        assert headers['icy-name'] == 'Test'
+        assert reader.read() == AUDIO
+    assert [request.split()[1] for request in requests] == ['/old', '/live']
+
+
+def test_open_stream_async_follows_redirect(station):
+    base, requests = station
+
+    async def open_and_read():
+        reader, writer, status, headers = await open_stream_async(base + '/old', 5)
+        try:
+            return status, await reader.read()
+        finally:
+            writer.close()
+
+    assert asyncio.run(open_and_read()) == (200, AUDIO)
+    assert 'Icy-MetaData: 0' in requests[-1]
+
+
+def test_probe_and_icy_stream_share_connect(station):
+    base, _ = station
+    titles = []
+
+    # Тестовая станция отдает конечный поток - проверка доходит до аудио и видит обрыв
+    result = asyncio.run(probe_url(base + '/old', timeout=5, sample_seconds=1))
+    assert result['ttfb'] is not None
+    assert result['bytes'] == len(AUDIO)
+    assert result['error'] == 'поток оборвался'
+
+    stream = IcyStream(base + '/old', on_title=titles.append, timeout=5)
+    data = b''
+    while True:
+        chunk = stream.read(1024)
+        if not chunk:
+            break
+        data += chunk
+    stream.close()
+
+    assert data == AUDIO
+    assert titles == ['Artist - Song']
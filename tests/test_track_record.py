@@ -0,0 +1,36 @@
+import pytest
+
+from track_record import TrackRecord
+
+
+def test_unset_fields_index_as_none():
+    # Так yt-dlp отдает трансляции и прямые ссылки
+    record = TrackRecord.from_dict({
+        'title': 'Эфир',
+        'url': 'https://example.com/live',
+        'duration': None,
+        'acodec': None,
+        'thumbnail': None,
+    })
+
+    assert record['duration'] is None
+    assert record['acodec'] is None
+    assert record['thumbnail'] is None
+    assert 'duration' not in record
+    assert record.get('duration', 0) == 0
+    assert 'duration' not in record.to_dict()
+
+
+def test_unknown_field_raises_key_error():
+    record = TrackRecord(title='Песня')
+    with pytest.raises(KeyError):
+        record['formats']
+
+
+def test_filled_fields_behave_like_dict():
+    record = TrackRecord(title='Песня', duration=215, acodec='opus')
+
+    assert record['duration'] == 215
+    assert record['acodec'] == 'opus'
+    assert 'acodec' in record
+    assert 'acodec' not in record.to_storage()
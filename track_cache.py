@@ -0,0 +1,258 @@
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Awaitable
+from urllib.parse import urlparse, parse_qs
+
+import metrics
+
+# ⚙️ НАСТРОЙКИ КЕША РЕЗОЛВЕРА - ЭКОНОМИМ СЕКУНДЫ НА КАЖДОМ ЗАПРОСЕ!!! ⚙️
+RESOLVER_CACHE_SIZE = int(os.getenv('RESOLVER_CACHE_SIZE', '512'))
+# Время жизни записи, если в ссылке нет параметра expire= (в секундах)
+RESOLVER_CACHE_DEFAULT_TTL = int(os.getenv('RESOLVER_CACHE_DEFAULT_TTL', '1800'))
+# Запас до истечения подписанной ссылки, чтобы не отдавать почти мертвый URL
+RESOLVER_CACHE_EXPIRY_MARGIN = int(os.getenv('RESOLVER_CACHE_EXPIRY_MARGIN', '120'))
+
+_YOUTUBE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+_EXPIRE_PATH_RE = re.compile(r'/expire/(\d+)')
+
+
+def extract_youtube_id(query: str) -> Optional[str]:
+    """Извлекает ID видео YouTube из ссылки
+
+    Args:
+        query: Ссылка или поисковый запрос
+
+    Returns:
+        ID видео или None, если это не ссылка на видео YouTube
+    """
+    try:
+        parsed = urlparse(query.strip())
+    except ValueError:
+        return None
+
+    host = (parsed.netloc or '').lower()
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+
+    video_id = None
+    if host == 'youtu.be':
+        video_id = parsed.path.lstrip('/').split('/')[0]
+    elif host in ('youtube.com', 'music.youtube.com'):
+        if parsed.path == '/watch':
+            video_id = parse_qs(parsed.query).get('v', [None])[0]
+        elif parsed.path.startswith(('/shorts/', '/embed/', '/live/')):
+            video_id = parsed.path.split('/')[2]
+
+    if video_id and _YOUTUBE_ID_RE.match(video_id):
+        return video_id
+    return None
+
+
+def normalize_query(query: str) -> str:
+    """Нормализует запрос в ключ кеша
+
+    Ссылки на видео YouTube сводятся к ID видео, остальные запросы
+    приводятся к нижнему регистру с схлопнутыми пробелами.
+
+    Args:
+        query: Ссылка или поисковый запрос
+
+    Returns:
+        Ключ кеша
+    """
+    video_id = extract_youtube_id(query)
+    if video_id:
+        return f"yt:{video_id}"
+    return "q:" + " ".join(query.lower().split())
+
+
+def get_url_expiry(url: str) -> Optional[float]:
+    """Возвращает время истечения подписанной ссылки на поток
+
+    Ссылки googlevideo содержат unix-время истечения либо в параметре
+    expire=, либо в сегменте пути /expire/<ts>/.
+
+    Args:
+        url: Ссылка на аудиопоток
+
+    Returns:
+        Unix-время истечения или None, если оно неизвестно
+    """
+    if not url:
+        return None
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+
+    expire = parse_qs(parsed.query).get('expire', [None])[0]
+    if expire is None:
+        match = _EXPIRE_PATH_RE.search(parsed.path)
+        expire = match.group(1) if match else None
+
+    try:
+        return float(expire) if expire is not None else None
+    except ValueError:
+        return None
+
+
+class ResolverCache:
+    """LRU-кеш результатов yt-dlp с истечением по подписанной ссылке"""
+
+    def __init__(self, max_size: int = RESOLVER_CACHE_SIZE,
+                 default_ttl: int = RESOLVER_CACHE_DEFAULT_TTL,
+                 expiry_margin: int = RESOLVER_CACHE_EXPIRY_MARGIN):
+        """Инициализация кеша
+
+        Args:
+            max_size: Максимальное количество записей
+            default_ttl: Время жизни записи без expire= в ссылке (в секундах)
+            expiry_margin: Запас до истечения ссылки (в секундах)
+        """
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.expiry_margin = expiry_margin
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Получение информации о треке из кеша
+
+        Args:
+            query: Ссылка или поисковый запрос
+
+        Returns:
+            Копия информации о треке или None, если записи нет или она истекла
+        """
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry['expires_at'] <= time.time():
+            self._evict(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry['track'])
+
+    def put(self, query: str, track: Dict[str, Any]) -> None:
+        """Сохранение информации о треке в кеш
+
+        Запись сохраняется под ключом запроса и, если известен, под ID видео,
+        чтобы поиск и прямая ссылка на одно видео разделяли результат.
+
+        Args:
+            query: Ссылка или поисковый запрос
+            track: Информация о треке (title, url, thumbnail, source, ...)
+        """
+        expires_at = self.expires_at(track)
+        if expires_at <= time.time():
+            return
+
+        entry = {'track': dict(track), 'expires_at': expires_at}
+        keys = {normalize_query(query)}
+        if track.get('id') and _YOUTUBE_ID_RE.match(str(track['id'])):
+            keys.add(f"yt:{track['id']}")
+
+        for key in keys:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def expires_at(self, track: Dict[str, Any]) -> float:
+        """Момент, после которого запись о треке считается устаревшей
+
+        Args:
+            track: Информация о треке
+
+        Returns:
+            Unix-время истечения с учетом запаса
+        """
+        expiry = get_url_expiry(track.get('url'))
+        if expiry is None:
+            return time.time() + self.default_ttl
+        return expiry - self.expiry_margin
+
+    def invalidate(self, query: str) -> None:
+        """Удаление записи из кеша (например, если ссылка перестала работать)
+
+        Args:
+            query: Ссылка или поисковый запрос
+        """
+        self._evict(normalize_query(query))
+
+    def _evict(self, key: str) -> None:
+        """Удаляет запись и все ее псевдонимы"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for alias in [k for k, v in self._entries.items() if v is entry]:
+            del self._entries[alias]
+
+    def stats(self) -> Dict[str, int]:
+        """Статистика кеша
+
+        Returns:
+            Словарь с размером кеша и счетчиками попаданий/промахов
+        """
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+
+class SingleFlight:
+    """Объединение одновременных одинаковых запросов
+
+    Пока запрос по ключу выполняется, повторные вызовы с тем же ключом
+    не запускают новую работу, а ждут общий результат.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.coalesced = metrics.counter('resolve_coalesced')
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет запрос или присоединяется к уже выполняющемуся
+
+        Args:
+            key: Ключ запроса (нормализованный)
+            factory: Функция, создающая корутину запроса
+
+        Returns:
+            Результат запроса (общий для всех ожидающих)
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced.inc()
+        else:
+            # Запрос выполняется отдельной задачей: отмена первого вызвавшего не отменяет его для остальных
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def in_flight(self) -> int:
+        """Количество выполняющихся запросов"""
+        return len(self._in_flight)
+
+
+# 🌍 ОБЩИЙ КЕШ ДЛЯ ВСЕХ СЕРВЕРОВ - ОДИН НА ВЕСЬ ПРОЦЕСС!!! 🌍
+resolver_cache = ResolverCache()
+
+# 🤝 ОДИНАКОВЫЕ ЗАПРОСЫ С РАЗНЫХ СЕРВЕРОВ ВЫПОЛНЯЮТСЯ ОДИН РАЗ!!! 🤝
+resolve_flights = SingleFlight()
@@ -0,0 +1,168 @@
+import random
+import threading
+from collections import deque
+from itertools import islice
+from typing import Dict, Any, List, Optional, Iterable, Iterator, Union
+
+
+class TrackQueue:
+    """Очередь треков плеера на основе deque
+
+    Переход к следующему треку и добавление в конец - O(1), вставка,
+    удаление и перемещение по индексу не копируют всю очередь, а
+    перемешивание выполняется за O(n). Каждое изменение увеличивает
+    version, поэтому читатели (веб-интерфейс, сообщения) могут дешево
+    проверить, изменилась ли очередь, прежде чем снимать копию.
+
+    Изменения защищены блокировкой: веб-сервер читает очередь из своего потока.
+    """
+
+    def __init__(self, tracks: Optional[Iterable[Dict[str, Any]]] = None):
+        """Инициализация очереди
+
+        Args:
+            tracks: Начальные треки
+        """
+        self._tracks = deque(tracks or ())
+        self._lock = threading.RLock()
+        self.version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __bool__(self) -> bool:
+        return bool(self._tracks)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        # Итерация по копии - очередь может измениться, пока по ней идут
+        return iter(self.snapshot())
+
+    def __getitem__(self, index: Union[int, slice]):
+        with self._lock:
+            if isinstance(index, slice):
+                start, stop, step = index.indices(len(self._tracks))
+                return list(islice(self._tracks, start, stop, step))
+            return self._tracks[index]
+
+    def append(self, track: Dict[str, Any]) -> None:
+        """Добавление трека в конец очереди"""
+        with self._lock:
+            self._tracks.append(track)
+            self._changed()
+
+    def extend(self, tracks: Iterable[Dict[str, Any]]) -> None:
+        """Добавление нескольких треков в конец очереди"""
+        with self._lock:
+            self._tracks.extend(tracks)
+            self._changed()
+
+    def insert(self, index: int, track: Dict[str, Any]) -> None:
+        """Вставка трека на позицию
+
+        Args:
+            index: Позиция (0 - следующий трек)
+            track: Информация о треке
+        """
+        with self._lock:
+            self._tracks.insert(index, track)
+            self._changed()
+
+    def popleft(self) -> Dict[str, Any]:
+        """Извлечение следующего трека за O(1)
+
+        Returns:
+            Информация о треке
+
+        Raises:
+            IndexError: Если очередь пуста
+        """
+        with self._lock:
+            track = self._tracks.popleft()
+            self._changed()
+            return track
+
+    def pop(self, index: int = -1) -> Dict[str, Any]:
+        """Извлечение трека по индексу
+
+        Args:
+            index: Позиция трека
+
+        Returns:
+            Информация о треке
+
+        Raises:
+            IndexError: Если индекс вне очереди
+        """
+        with self._lock:
+            if index == 0:
+                track = self._tracks.popleft()
+            elif index == -1:
+                track = self._tracks.pop()
+            else:
+                track = self._tracks[index]
+                del self._tracks[index]
+            self._changed()
+            return track
+
+    def remove_at(self, index: int) -> Optional[Dict[str, Any]]:
+        """Удаление трека по индексу без исключения для неверного индекса
+
+        Args:
+            index: Позиция трека
+
+        Returns:
+            Удаленный трек или None, если индекс вне очереди
+        """
+        with self._lock:
+            if index < 0 or index >= len(self._tracks):
+                return None
+            return self.pop(index)
+
+    def move(self, source: int, destination: int) -> bool:
+        """Перемещение трека на другую позицию
+
+        Args:
+            source: Текущая позиция трека
+            destination: Новая позиция трека
+
+        Returns:
+            True, если трек перемещен
+        """
+        with self._lock:
+            size = len(self._tracks)
+            if not (0 <= source < size and 0 <= destination < size):
+                return False
+            if source != destination:
+                track = self._tracks[source]
+                del self._tracks[source]
+                self._tracks.insert(destination, track)
+                self._changed()
+            return True
+
+    def shuffle(self) -> None:
+        """Перемешивание очереди за O(n)"""
+        with self._lock:
+            # Случайный доступ к deque - O(n), поэтому перемешиваем список и заменяем содержимое
+            tracks = list(self._tracks)
+            random.shuffle(tracks)
+            self._tracks.clear()
+            self._tracks.extend(tracks)
+            self._changed()
+
+    def clear(self) -> None:
+        """Очистка очереди"""
+        with self._lock:
+            self._tracks.clear()
+            self._changed()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Копия очереди для чтения из других потоков
+
+        Returns:
+            Список треков
+        """
+        with self._lock:
+            return list(self._tracks)
@@ -0,0 +1,120 @@
+import sys
+from typing import Dict, Any, Optional, Iterator, Mapping
+
+
+class TrackRecord:
+    """Компактная запись о треке в очереди
+
+    Вместо словаря на каждый трек - объект со __slots__: без __dict__ на
+    экземпляр, повторяющиеся значения (источник, обложки альбомов и плейлистов)
+    хранятся одной строкой. Для Lavalink хранится только закодированный трек
+    (encoded), а живой объект wavelink создается непосредственно перед
+    воспроизведением.
+
+    Поддерживает доступ как к словарю (track['title'], track.get('url'),
+    'artist' in track), поэтому код, работавший со словарями, не меняется.
+    Незаполненное поле по индексу дает None, как ключ со значением None в
+    словаре yt-dlp (duration у трансляций, acodec у прямых ссылок), а in и
+    keys() его не видят. KeyError - только для неизвестных полей.
+    """
+
+    FIELDS = (
+        'title', 'artist', 'url', 'webpage_url', 'id', 'thumbnail', 'duration',
+        'source', 'acodec', 'encoded', 'spotify_id', 'isrc', 'stream_title',
+        'loudness'
+    )
+    # Поля, значения которых часто повторяются между треками
+    INTERNED_FIELDS = ('source', 'thumbnail', 'acodec')
+    # Поля, которые имеют смысл только до истечения ссылки (не сохраняются в плейлисты)
+    TRANSIENT_FIELDS = ('acodec', 'stream_title')
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields: Any):
+        for name in self.FIELDS:
+            object.__setattr__(self, name, None)
+        for name, value in fields.items():
+            self[name] = value
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'TrackRecord':
+        """Создание записи из словаря (неизвестные ключи отбрасываются)
+
+        Args:
+            data: Информация о треке
+
+        Returns:
+            Запись о треке
+        """
+        if isinstance(data, TrackRecord):
+            return data.copy()
+        return cls(**{key: value for key, value in data.items() if key in cls.__slots__})
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name in self.INTERNED_FIELDS and isinstance(value, str):
+            value = sys.intern(value)
+        object.__setattr__(self, name, value)
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        self[key] = None
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def __repr__(self) -> str:
+        return f"TrackRecord(title={self.title!r}, source={self.source!r})"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def keys(self):
+        return [name for name in self.FIELDS if getattr(self, name) is not None]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def update(self, data: Optional[Mapping[str, Any]] = None, **fields: Any) -> None:
+        """Обновление полей (как dict.update)"""
+        for source in (data or {}, fields):
+            for key, value in source.items():
+                self[key] = value
+
+    def copy(self) -> 'TrackRecord':
+        """Копия записи"""
+        record = TrackRecord.__new__(TrackRecord)
+        for name in self.FIELDS:
+            object.__setattr__(record, name, getattr(self, name))
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Словарь с заполненными полями (для JSON и веб-интерфейса)"""
+        return dict(self.items())
+
+    def to_storage(self) -> Dict[str, Any]:
+        """Словарь для долговременного хранения (плейлисты)
+
+        Вместо подписанной ссылки на поток сохраняется ссылка на страницу трека.
+
+        Returns:
+            Словарь без полей, устаревающих вместе со ссылкой
+        """
+        data = self.to_dict()
+        for name in self.TRANSIENT_FIELDS:
+            data.pop(name, None)
+        if self.webpage_url:
+            data['url'] = self.webpage_url
+        return data
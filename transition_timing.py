@@ -0,0 +1,102 @@
+import time
+from typing import Dict, Any, Optional
+
+import metrics
+
+# Этапы перехода между треками в порядке прохождения:
+#   track_end   - аудиопоток discord.py сообщил об окончании трека
+#   callback    - корутина следующего трека начала выполняться в цикле событий
+#   resolve     - ссылка на поток получена (или подтверждена)
+#   spawn       - процесс FFmpeg запущен
+#   first_frame - первый кадр нового трека отправлен в Discord
+STAGES = ('track_end', 'callback', 'resolve', 'spawn', 'first_frame')
+
+
+def _histogram_name(stage: str, guild_id: Optional[int] = None) -> str:
+    if guild_id is None:
+        return f"transition.{stage}"
+    return f"transition.guild.{guild_id}.{stage}"
+
+
+class TransitionSpan:
+    """Отметки времени одного перехода между треками
+
+    Отметки можно ставить из любого потока. Каждый этап записывается как
+    время от предыдущего отмеченного этапа, поэтому видно, где именно
+    тратится время (например, callback - ожидание занятого цикла событий).
+    """
+
+    __slots__ = ('guild_id', 'started', 'marks', 'finished')
+
+    def __init__(self, guild_id: int):
+        """Начало перехода (этап track_end)
+
+        Args:
+            guild_id: ID сервера
+        """
+        self.guild_id = guild_id
+        self.started = time.perf_counter()
+        self.marks: Dict[str, float] = {'track_end': self.started}
+        self.finished = False
+
+    def mark(self, stage: str) -> None:
+        """Отмечает прохождение этапа (повторная отметка игнорируется)
+
+        Args:
+            stage: Название этапа из STAGES
+        """
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter()
+
+    def finish(self) -> float:
+        """Завершает переход и записывает этапы в гистограммы (общие и сервера)
+
+        Returns:
+            Полное время перехода в секундах
+        """
+        if self.finished:
+            return 0.0
+        self.finished = True
+
+        previous = self.started
+        for stage in STAGES[1:]:
+            moment = self.marks.get(stage)
+            if moment is None:
+                continue
+            for guild_id in (None, self.guild_id):
+                metrics.histogram(_histogram_name(stage, guild_id)).observe(moment - previous)
+            previous = moment
+
+        total = previous - self.started
+        for guild_id in (None, self.guild_id):
+            metrics.histogram(_histogram_name('total', guild_id)).observe(total)
+        return total
+
+
+def get_transition_stats(guild_id: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Процентили длительности этапов перехода
+
+    Args:
+        guild_id: ID сервера или None для всех серверов вместе
+
+    Returns:
+        Словарь этап -> {count, p50, p95, p99, max} (в секундах)
+    """
+    stats = {}
+    for stage in STAGES[1:] + ('total',):
+        stats[stage] = metrics.histogram(_histogram_name(stage, guild_id)).snapshot()
+    return stats
+
+
+def forget_guild(guild_id: int) -> int:
+    """Удаляет гистограммы переходов сервера из реестра метрик
+
+    Общие гистограммы остаются; гистограммы сервера создадутся заново при следующем переходе.
+
+    Args:
+        guild_id: ID сервера
+
+    Returns:
+        Количество удаленных гистограмм
+    """
+    return metrics.remove_prefix(f"transition.guild.{guild_id}.")
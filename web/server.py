@@ -45,6 +45,7 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # Глобальные переменные для хранения состояния
 current_guild_players = {}
 queue_cache = {}
+queue_versions = {}
 current_track_cache = {}
 
 # Интервал обновления кеша (в секундах)
@@ -86,16 +87,20 @@ def update_cache_thread():
                     current_guild_players[guild_id] = {
                         "is_playing": player.is_playing,
                         "is_paused": player.is_paused,
+                        "suspended": getattr(player, 'suspended', False),
                         "connected": player.voice_client is not None if hasattr(player, 'voice_client') else player.player is not None,
+                        "position": getattr(player, 'position', 0),
                         "current_radio": BOT_INSTANCE.current_radio
                     }
                     
                     # Обновление текущего трека
                     if player.current_track:
-                        current_track_cache[guild_id] = player.current_track
+                        current_track_cache[guild_id] = player.current_track.to_dict()
                     
-                    # Обновление очереди
-                    queue_cache[guild_id] = player.queue
+                    # Обновление очереди - копию снимаем, только если версия очереди изменилась
+                    if queue_versions.get(guild_id) != player.queue.version:
+                        queue_cache[guild_id] = [track.to_dict() for track in player.queue.snapshot()]
+                        queue_versions[guild_id] = player.queue.version
         except Exception as e:
             logger.error(f"Ошибка при обновлении кеша: {e}")
         
@@ -589,6 +594,8 @@ def get_player_status(guild_id):
         "connected": False,
         "is_playing": False,
         "is_paused": False,
+        "suspended": False,
+        "position": 0,
         "current_track": None,
         "current_radio": None
     }
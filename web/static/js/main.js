@@ -263,7 +263,7 @@ function updateCurrentTrack(trackData) {
             </div>
             <div class="col-md-6">
                 <h5 class="track-title">${escapeHTML(trackData.title)}</h5>
-                <p class="track-author text-light-emphasis">Прямой эфир</p>
+                <p class="track-author text-light-emphasis">${escapeHTML(trackData.stream_title || 'Прямой эфир')}</p>
                 <div class="d-flex align-items-center mt-4">
                     <div class="me-2">
                         <div class="radio-wave">